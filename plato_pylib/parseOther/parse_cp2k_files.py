@@ -3,6 +3,9 @@
 import itertools as it
 import re
 import types
+
+import numpy as np
+
 from plato_pylib.shared.ucell_class import UnitCell
 from plato_pylib.shared.energies_class import EnergyVals
 
@@ -61,9 +64,20 @@ def _getCoordsFromPyCp2kObj(pyCp2kObj):
 		outCoords.append(currCoord)
 	return scaled,outCoords
 
-def parseCpout(outFile, ThrowIfTerminateFlagMissing=True):
-	fileAsList = _getFileAsListFromInpFile(outFile)
-	parser = _getStandardCpoutParser()
+def parseCpout(outFile, ThrowIfTerminateFlagMissing=True, streaming=False, trajectory=False):
+	""" Parse a CP2K output file (e.g. outfile.cpout in cp2k.sopt -o outfile.cpout *.inp)
+	
+	Args:
+		outFile: (str) Path to the output file
+		ThrowIfTerminateFlagMissing: (Bool) If True raise an error when the file lacks the PROGRAM ENDED line (e.g. for a running/crashed job)
+		streaming: (Bool) If True read the file line-by-line rather than loading it all at once. Peak memory then scales with the largest single section rather than the file size; useful for multi-GB MD/geo-opt outputs
+		trajectory: (Bool) If True also keep the values from EVERY energy/forces/charges/CELL| section (normally only the final ones survive). These go in outDict["trajectory"], with row i of every array belonging to the i-th energy evaluation; see CpoutTrajectoryCollector.getArrays for the keys
+			 
+	Returns
+		outDict: (dict) Parsed values
+ 
+	"""
+	parser = _getStandardCpoutParser(trajectory=trajectory)
 
 	#TODO: Some way to maintain the ACTUAL terminate flag may be nice
 	if ThrowIfTerminateFlagMissing is False:
@@ -72,24 +86,31 @@ def parseCpout(outFile, ThrowIfTerminateFlagMissing=True):
 		parser.finalStepsFunctions.append(_finalSetTerminateFlagToTrue)
 
 	try:
-		outDict = parser.getOutDictFromFileAsList(fileAsList)
+		if streaming:
+			with open(outFile,"rt") as f:
+				outDict = parser.getOutDictFromFileAsList( StreamedLines(f) )
+		else:
+			fileAsList = _getFileAsListFromInpFile(outFile)
+			outDict = parser.getOutDictFromFileAsList(fileAsList)
 	except Exception as e:
 	    raise errorHelp.PlatoPylibParseFileError("Something went wrong when parsing the current CP2K output file {}".format(outFile)) from e
 	return outDict
 
-def _getStandardCpoutParser():
+def _getStandardCpoutParser(trajectory=False):
 	outParser = CpoutFileParser()
-	_addSearchWordAndFunctToParserObj("OVERLAP MATRIX CONDITION NUMBER AT GAMMA POINT", _parseOverlapCondSection, outParser)
-	_addSearchWordAndFunctToParserObj("BSSE RESULTS", _parseBSSESection, outParser)
-	_addSearchWordAndFunctToParserObj("Core Hamiltonian energy", _parseEnergiesSection, outParser)
-	_addSearchWordAndFunctToParserObj("T I M I N G", _parseTimingSection, outParser)
-	_addSearchWordAndFunctToParserObj("Total number of message passing", _parseNumbProcsSection, outParser)
-	_addSearchWordAndFunctToParserObj("CP2K| version string", _parseCompileInfoSection, outParser)
-	_addSearchWordAndFunctToParserObj("BSSE CALCULATION", _parseBSSEFragmentsInfo, outParser, handleParsedDictFunct=_handleParsedBSSEFragsInfo)
-	_addSearchWordAndFunctToParserObj("Hirshfeld Charges", _parseHirshfeldChargesSection, outParser, handleParsedDictFunct=_handleHirshfeldChargesInfo)
-	_addSearchWordAndFunctToParserObj("Mulliken Population Analysis", _parseHirshfeldChargesSection, outParser, handleParsedDictFunct=_handleMullikenChargesInfo)
-	_addSearchWordAndFunctToParserObj("ATOMIC FORCES in [a.u.]", _parseAtomicForcesSection, outParser, handleParsedDictFunct=_handleAtomicForcesSection)
+	_addSearchWordAndFunctToParserObj("OVERLAP MATRIX CONDITION NUMBER AT GAMMA POINT", _parseOverlapCondSection, outParser, sectionEndMarker="Number of electrons")
+	_addSearchWordAndFunctToParserObj("BSSE RESULTS", _parseBSSESection, outParser, sectionEndMarker="BSSE-free interaction energy")
+	_addSearchWordAndFunctToParserObj("Core Hamiltonian energy", _parseEnergiesSection, outParser, sectionEndMarker="Total energy:")
+	_addSearchWordAndFunctToParserObj("T I M I N G", _parseTimingSection, outParser, sectionEndMarker="The number of warnings")
+	_addSearchWordAndFunctToParserObj("Total number of message passing", _parseNumbProcsSection, outParser, sectionEndMarker="This output is from")
+	_addSearchWordAndFunctToParserObj("CP2K| version string", _parseCompileInfoSection, outParser, sectionEndMarker="is freely available from")
+	_addSearchWordAndFunctToParserObj("BSSE CALCULATION", _parseBSSEFragmentsInfo, outParser, handleParsedDictFunct=_handleParsedBSSEFragsInfo, sectionEndMarker="-----------------------------")
+	_addSearchWordAndFunctToParserObj("Hirshfeld Charges", _parseHirshfeldChargesSection, outParser, handleParsedDictFunct=_handleHirshfeldChargesInfo, sectionEndMarker="!-----")
+	_addSearchWordAndFunctToParserObj("Mulliken Population Analysis", _parseHirshfeldChargesSection, outParser, handleParsedDictFunct=_handleMullikenChargesInfo, sectionEndMarker="!-----")
+	_addSearchWordAndFunctToParserObj("ATOMIC FORCES in [a.u.]", _parseAtomicForcesSection, outParser, handleParsedDictFunct=_handleAtomicForcesSection, sectionEndMarker="SUM OF ATOMIC FORCES")
 	outParser.finalStepsFunctions.append(_parseBSSEFragmentsFinalStepFunct)
+	if trajectory:
+		_addTrajectoryCollectionToParserObj(outParser)
 	return outParser
 
 def _getFileAsListFromInpFile(inpFile):
@@ -98,19 +119,20 @@ def _getFileAsListFromInpFile(inpFile):
 	return fileAsList
 
 
-def _addSearchWordAndFunctToParserObj(searchWord, funct, parserObj, handleParsedDictFunct=None):
-	decoObj = getDecoToAttachSectionParserToCpoutParser(searchWord, funct, handleParsedDictFunct=handleParsedDictFunct)
+def _addSearchWordAndFunctToParserObj(searchWord, funct, parserObj, handleParsedDictFunct=None, sectionEndMarker=None):
+	decoObj = getDecoToAttachSectionParserToCpoutParser(searchWord, funct, handleParsedDictFunct=handleParsedDictFunct, sectionEndMarker=sectionEndMarker)
 	decoObj(parserObj)
 
 #Want to introduce a way to add a new section to parse without directly modifying the parse source code
 #(justified by open-closed principle)
-def getDecoToAttachSectionParserToCpoutParser(pattern, parseFunction, handleParsedDictFunct=None):
+def getDecoToAttachSectionParserToCpoutParser(pattern, parseFunction, handleParsedDictFunct=None, sectionEndMarker=None):
 	""" Attaches a function to inpCls (which should be CpoutFileParser INSTANCE) for parsing a section of the output file
 	
 	Args:
 		pattern: (str) The pattern to search for in a single line of a cpout file. Finding the pattern should trigger the parse function
 		parseFunction: Function with interface parsedDict, lineIdx = parseFunction(fileAsList, lineIdx). lineIdx is the index in the file where the initial arg is passed (when inp-arg) and where the section is over (when it appears as outArg). ParsedDict is simply a dictionary containing key:val pairs for this section; this is used to update the main dictionary the parser outputs.
 		handleParsedDictFunct: f(instance, parsedDict) Default of None means we simply update the output dict with the dict parsed from this section (usual desired behaviour). But setting this function explicitly allows for things such as parsing a series of values (e.g. temperature at each MD step) and saving ALL of them into the outptu dict (instance.outDict)
+		sectionEndMarker: (Optional, str) String found in the last line of the section. Only used when following a file still being written (CpoutTailParser); the section isnt parsed until a line containing this has been written
  
 	Returns
 		parseSectionDeco: Decorator for attaching this section parser to the overall CpoutFileParser. After calling parseSectionDeco(CpoutFileParser) any parser instances should be apply "parseFunction" upon finding "pattern" in any file its passed. Thus, this is essentially acting as a hook function for the parser behaviour.
@@ -120,19 +142,124 @@ def getDecoToAttachSectionParserToCpoutParser(pattern, parseFunction, handlePars
 		inpCls.extraSingleLinePatterns.append(pattern)
 		inpCls.extraFunctsToParseFromSingleLine.append(parseFunction)
 		inpCls.extraHandleParsedOutputFuncts.append(handleParsedDictFunct)
+		if hasattr(inpCls, "extraSectionEndMarkers"):
+			inpCls.extraSectionEndMarkers.append(sectionEndMarker)
+		if hasattr(inpCls, "_linePatternMatcher"):
+			inpCls._linePatternMatcher = None #Forces the combined matcher to be rebuilt with the new pattern
 	return decoFunct
 
 
+class StreamedLines():
+	""" Adapter giving list-like (fileAsList[lineIdx]) access to a line iterator (e.g. an open file) while only holding a window of lines in memory. Lines are read on demand, and lines before the main parsers position are dropped once released with releaseLinesBefore. Lets the section parsers (which take fileAsList, lineIdx) work unchanged on streamed input
+
+	NOTE: len() returns the total number of lines once the end of the input has been reached. Before that it returns a lower bound which is always at least lookAhead lines past the last line accessed; this keeps the "lineIdx < len(fileAsList)" checks used by section parsers valid provided they dont jump forward by more than lookAhead lines without accessing any
+
+	"""
+	def __init__(self, lineIter, lookAhead=16):
+		self._lineIter = iter(lineIter)
+		self._lines = list()
+		self._offset = 0 #Absolute index of self._lines[0]
+		self._maxIdxAccessed = -1
+		self._eofReached = False
+		self.lookAhead = lookAhead
+
+	def __getitem__(self, idx):
+		if idx < self._offset:
+			raise IndexError("Line {} has already been released (first available line is {})".format(idx,self._offset))
+		self._readUpToIdx(idx)
+		if idx >= self._offset + len(self._lines):
+			raise IndexError("Line index {} out of range; input only has {} lines".format(idx, self._offset+len(self._lines)))
+		self._maxIdxAccessed = max(idx, self._maxIdxAccessed)
+		return self._lines[idx-self._offset]
+
+	def __len__(self):
+		self._readUpToIdx(self._maxIdxAccessed + self.lookAhead)
+		return self._offset + len(self._lines)
+
+	def releaseLinesBefore(self, idx):
+		""" Signal that lines before idx wont be accessed again, so they can be dropped from memory """
+		nRelease = min(idx-self._offset, len(self._lines))
+		if nRelease > 0:
+			del self._lines[:nRelease]
+			self._offset += nRelease
+
+	def _readUpToIdx(self, idx):
+		while (not self._eofReached) and (self._offset+len(self._lines) <= idx):
+			try:
+				self._lines.append( next(self._lineIter) )
+			except StopIteration:
+				self._eofReached = True
+
+
+class LinePatternMatcher():
+	""" Finds which of a set of (plain string) patterns are present in a line. A single combined regex is used to reject the (vast majority of) lines which contain none of the patterns in one scan, and a second (with one named group per pattern) finds all patterns present in the rest in one more scan
+
+	"""
+	def __init__(self, patterns, hooks=None):
+		""" Initializer
+		
+		Args:
+			patterns: (iter of str) The patterns to search for
+			hooks: (Optional, iter) One object per pattern; getMatchingHooks(line) returns those for the patterns present in line
+				 
+		"""
+		self.patterns = [str(x) for x in patterns]
+		self.hooks = [None for x in self.patterns] if hooks is None else list(hooks)
+		if len(self.hooks) != len(self.patterns):
+			raise ValueError("{} hooks given for {} patterns".format(len(self.hooks), len(self.patterns)))
+
+		uniquePatterns = sorted(set(self.patterns), key=len, reverse=True)
+		if len(uniquePatterns) == 0:
+			self._combinedRegex, self._groupRegex, self._groupToIndices = None, None, dict()
+			return
+
+		self._combinedRegex = re.compile( "|".join([re.escape(x) for x in uniquePatterns]) )
+
+		#The lookahead gives a (zero-width) match at every position a pattern starts, with the longest pattern at that position in its group. Any pattern contained within the matched one must also be present
+		groupNames = ["g{}".format(idx) for idx in range(len(uniquePatterns))]
+		self._groupRegex = re.compile( "(?=(?:" + "|".join(["(?P<{}>{})".format(name,re.escape(x)) for name,x in zip(groupNames,uniquePatterns)]) + "))" )
+		self._groupToIndices = dict()
+		for name, groupPattern in zip(groupNames, uniquePatterns):
+			self._groupToIndices[name] = [idx for idx,pattern in enumerate(self.patterns) if pattern in groupPattern]
+
+	def lineMayMatch(self, line):
+		""" False if no pattern is present in line; True means at least one pattern is present """
+		if self._combinedRegex is None:
+			return False
+		return self._combinedRegex.search(line) is not None
+
+	def getMatchingIndices(self, line):
+		""" Indices (into self.patterns, in ascending order) of all patterns present in line """
+		if not self.lineMayMatch(line):
+			return list()
+		outIndices = set()
+		for match in self._groupRegex.finditer(line):
+			outIndices.update( self._groupToIndices[match.lastgroup] )
+		return sorted(outIndices)
+
+	def getMatchingHooks(self, line):
+		""" Hooks for all patterns present in line, in the same order as self.patterns """
+		return [self.hooks[idx] for idx in self.getMatchingIndices(line)]
+
+
 #Parse from single line has the interface outDict, lineIdx = parseSectionStartFromLine(fileAsList, lineIdx)
 class CpoutFileParser():
 	"""Class used to parse CP2K files; NOT meant to be called directly in code; At time of writing _getStandardCpoutParser() is the most sensible way to create this object while the parseCpout function is the best way to parse a CP2K output file
 
 	"""
+	#Patterns handled directly in _getOutDictFromFileAsList; needed so the combined line matcher can skip lines containing none of them
+	_builtInSingleLinePatterns = ["CELL|", "Number of atoms:", "PROGRAM STARTED AT", "OPTIMIZATION STEP", "PROGRAM ENDED"]
+
 	def __init__(self):
 		self.extraSingleLinePatterns = list() #Search strings that trigger us to parse a section
 		self.extraFunctsToParseFromSingleLine = list() #Functions to parse the relevant sections and return a dictionary AND lineIdx (so we dont re-read lines in this section) 
 		self.extraHandleParsedOutputFuncts = list() #These functions map the parsed-dicts to the "global" self.outDict. If set to None then we simply do self.outDict.update(parsedDict) for each section.
+		self.extraSectionEndMarkers = list() #Strings marking the last line of each section; used to tell if a section has finished being written when deferIncompleteSections is set
 		self.finalStepsFunctions = list()
+		self.trajectory = None #Optional CpoutTrajectoryCollector; gets every CELL| section (the other sections are collected via handle functions)
+		self.deferIncompleteSections = False #If True, stop parsing (rather than store partial values) when the end of a section isnt in the lines given; used when following a file still being written
+		self._linePatternMatcher = None
+		self._incompleteSectionScan = None #(sectionStartIdx, endMarker, idx of first line not yet searched for endMarker) for the last section found to be incomplete
 
 	def getOutDictFromFileAsList(self, fileAsList):
 		try:
@@ -142,60 +269,144 @@ class CpoutFileParser():
 		return outDict
 
 	def _getOutDictFromFileAsList(self, fileAsList):
-		self.outDict = self._getInitCp2kOutDict() #Attach to class so we can access it with hook functions
-		lineIdx=0
-
-		while lineIdx < len(fileAsList):
-			currLine = fileAsList[lineIdx].strip()
-			if currLine.find("CELL|") != -1:
-				self.outDict["unitCell"], lineIdx = parseCellSectionCpout(fileAsList,lineIdx)
-			elif currLine.find("Number of atoms:") != -1:
-				self.outDict["numbAtoms"] += int( currLine.split()[-1]  ) 
-				lineIdx += 1
-			elif currLine.find("PROGRAM STARTED AT") !=-1: #Reset certain counters every time we find a new start of file
-				self.outDict = self._getInitCp2kOutDict()
-				lineIdx += 1
-			elif currLine.find("OPTIMIZATION STEP") != -1:
-				self.outDict["multiple_geom_present"] = True
-				lineIdx += 1
-			elif currLine.find("PROGRAM ENDED") != -1:
-				self.outDict["terminate_flag_found"] = True
-				lineIdx += 1
-			elif self._patternInExtraSingleLinePatterns(currLine):
-				lineIdx = self._updateDictBasedOnFindingSingleLinePatterns(fileAsList, lineIdx, self.outDict)
-			else:
-				lineIdx +=1
-
-
+		self._startNewParse()
+		self._parseLinesFromIdx(fileAsList, 0)
 		self._applyFinalStepsFunctions()
 
 		if self.outDict["terminate_flag_found"] is False:
 			raise ValueError("Termination flag not found in current cp2k output file")
 
-	
 		return self.outDict
 
+	def _startNewParse(self):
+		self.outDict = self._getInitCp2kOutDict() #Attach to class so we can access it with hook functions
+		self._resetTrajectory()
+
+	def _parseLinesFromIdx(self, fileAsList, lineIdx):
+		""" Parse lines from lineIdx onwards, updating self.outDict. Returns the index of the first line NOT parsed; this is len(fileAsList) unless deferIncompleteSections is set and the end of a section isnt in fileAsList """
+		lineMatcher = self._getLinePatternMatcher()
+
+		#For streamed input we periodically let go of lines already parsed. One line before lineIdx is kept since section parsers can return lineIdx-1
+		releaseLines = getattr(fileAsList, "releaseLinesBefore", None)
+		releaseBlockSize, nextReleaseIdx = 1024, 1024
+
+		while lineIdx < len(fileAsList):
+			if (releaseLines is not None) and (lineIdx >= nextReleaseIdx):
+				releaseLines(lineIdx-1)
+				nextReleaseIdx = lineIdx + releaseBlockSize
+
+			#Most lines match nothing; a single regex scan lets us skip them without checking each pattern in turn
+			if not lineMatcher.lineMayMatch(fileAsList[lineIdx]):
+				lineIdx += 1
+				continue
+
+			currLine = fileAsList[lineIdx].strip()
+			extraHooks = [hook for hook in lineMatcher.getMatchingHooks(currLine) if hook is not None] #Built-in patterns have no hook
+			try:
+				lineIdx = self._parseLineMatchingPatterns(fileAsList, lineIdx, currLine, extraHooks)
+			except _IncompleteSectionError:
+				return lineIdx
+
+		return lineIdx
+
+	def _parseLineMatchingPatterns(self, fileAsList, lineIdx, currLine, extraHooks):
+		if currLine.find("CELL|") != -1:
+			unitCell, lineIdx = self._parseSection(parseCellSectionCpout, fileAsList, lineIdx, endMarker=_isEndOfCellSection)
+			self.outDict["unitCell"] = unitCell
+			if self.trajectory is not None:
+				self.trajectory.addUnitCell(unitCell)
+		elif currLine.find("Number of atoms:") != -1:
+			self.outDict["numbAtoms"] += int( currLine.split()[-1]  ) 
+			lineIdx += 1
+		elif currLine.find("PROGRAM STARTED AT") !=-1: #Reset certain counters every time we find a new start of file
+			self._startNewParse()
+			lineIdx += 1
+		elif currLine.find("OPTIMIZATION STEP") != -1:
+			self.outDict["multiple_geom_present"] = True
+			lineIdx += 1
+		elif currLine.find("PROGRAM ENDED") != -1:
+			self.outDict["terminate_flag_found"] = True
+			lineIdx += 1
+		elif len(extraHooks) > 0:
+			lineIdx = self._updateDictBasedOnFindingSingleLinePatterns(fileAsList, lineIdx, self.outDict, hooks=extraHooks)
+		else:
+			lineIdx +=1
+		return lineIdx
+
+	def _parseSection(self, parseFunct, fileAsList, lineIdx, endMarker=None):
+		""" Calls parsedVals, lineIdx = parseFunct(fileAsList, lineIdx). If deferIncompleteSections is set then a section whose end (endMarker; a string in the last line, or a function f(line) returning True for it) isnt in fileAsList yet raises _IncompleteSectionError (before anything is stored) so it can be parsed once more lines are available. Errors from parseFunct are always raised """
+		if not self.deferIncompleteSections:
+			return parseFunct(fileAsList, lineIdx)
+
+		if endMarker is not None:
+			self._checkSectionEndPresent(fileAsList, lineIdx, endMarker)
+			return parseFunct(fileAsList, lineIdx)
+
+		#Without an end marker we can only tell the section is incomplete if it runs to the end of the lines available
+		parsedVals, outLineIdx = parseFunct(fileAsList, lineIdx)
+		if outLineIdx >= len(fileAsList):
+			raise _IncompleteSectionError()
+		return parsedVals, outLineIdx
+
+	def _checkSectionEndPresent(self, fileAsList, lineIdx, endMarker):
+		#Lines already searched for the end of this section (on a previous call with fewer lines) arent searched again
+		scanIdx = lineIdx
+		if (self._incompleteSectionScan is not None) and (self._incompleteSectionScan[:2] == (lineIdx,endMarker)):
+			scanIdx = self._incompleteSectionScan[2]
+
+		isEndLine = endMarker if callable(endMarker) else (lambda line: endMarker in line)
+		while scanIdx < len(fileAsList):
+			if isEndLine(fileAsList[scanIdx]):
+				self._incompleteSectionScan = None
+				return
+			scanIdx += 1
+
+		self._incompleteSectionScan = (lineIdx, endMarker, scanIdx)
+		raise _IncompleteSectionError()
+
+	def _shiftIncompleteSectionScan(self, shift):
+		""" Call when fileAsList is trimmed (or extended) at the start, so stored line indices refer to the same lines on the next call """
+		if self._incompleteSectionScan is not None:
+			startIdx, endMarker, scanIdx = self._incompleteSectionScan
+			self._incompleteSectionScan = (startIdx+shift, endMarker, scanIdx+shift)
+
+	def _getLinePatternMatcher(self):
+		""" Matcher for all patterns; hooks for the extra patterns are (parseFunct, pattern, handleFunct, endMarker) while built-in ones have None. Rebuilt only if any pattern/hook has changed since the last call """
+		allPatterns = [str(x) for x in self._builtInSingleLinePatterns + list(self.extraSingleLinePatterns)]
+		allHooks = [None for x in self._builtInSingleLinePatterns] + self._getExtraHooks()
+		if (self._linePatternMatcher is None) or (self._linePatternMatcher.patterns != allPatterns) or (self._linePatternMatcher.hooks != allHooks):
+			self._linePatternMatcher = LinePatternMatcher(allPatterns, hooks=allHooks)
+		return self._linePatternMatcher
+
+	def _getExtraHooks(self):
+		return list( it.zip_longest(self.extraFunctsToParseFromSingleLine,self.extraSingleLinePatterns, self.extraHandleParsedOutputFuncts, self.extraSectionEndMarkers) )
+
+	def _resetTrajectory(self):
+		if self.trajectory is not None:
+			self.trajectory.reset()
+
 	def _applyFinalStepsFunctions(self):
 		for funct in self.finalStepsFunctions:
 			funct(self)
 
-	def _patternInExtraSingleLinePatterns(self, currLine):
-		for x in self.extraSingleLinePatterns:
-			if currLine.find(x) != -1:
-				return True
-		return False
-
 	#TODO: Add the ability to change the update function from outside (needed for getting lists)
 	#Should work with multiple parse-functions on the same input pattern; though unlikely that would ever be a good idea (and returned lineIdx will just be that of the LAST matching pattern)
-	def _updateDictBasedOnFindingSingleLinePatterns(self, fileAsList, lineIdx, inpDict):
+	def _updateDictBasedOnFindingSingleLinePatterns(self, fileAsList, lineIdx, inpDict, hooks=None):
+		""" hooks: (Optional, iter) (parseFunct, pattern, handleFunct, endMarker) for the extra patterns known to be in this line (see _getLinePatternMatcher); saves searching the line for every pattern again """
 		outLineIdx = lineIdx
-		for funct,pattern,handleFunct in it.zip_longest(self.extraFunctsToParseFromSingleLine,self.extraSingleLinePatterns, self.extraHandleParsedOutputFuncts):
-			if fileAsList[lineIdx].find(pattern) != -1:
-				updateDict, outLineIdx = funct(fileAsList, lineIdx)
-				if handleFunct is None:
-					inpDict.update(updateDict)
-				else:
-					handleFunct(self, updateDict)
+		useHooks = self._getExtraHooks() if hooks is None else hooks
+		#All sections are parsed before any are stored; means an incomplete section cant leave a partial update behind
+		parsedSections = list()
+		for funct,pattern,handleFunct,endMarker in useHooks:
+			if (hooks is not None) or (fileAsList[lineIdx].find(pattern) != -1):
+				updateDict, outLineIdx = self._parseSection(funct, fileAsList, lineIdx, endMarker=endMarker)
+				parsedSections.append( (handleFunct,updateDict) )
+
+		for handleFunct, updateDict in parsedSections:
+			if handleFunct is None:
+				inpDict.update(updateDict)
+			else:
+				handleFunct(self, updateDict)
 		return outLineIdx
 
 
@@ -206,6 +417,217 @@ class CpoutFileParser():
 		outDict["terminate_flag_found"] = False
 		return outDict
 
+class CpoutTrajectoryCollector():
+	""" Stores values from every step (e.g. each MD/geo-opt energy evaluation) in columnar numpy arrays. Each quantity has its own array, with row i of every array belonging to step i; steps with no value for a quantity are NaN. Storage is preallocated and doubled whenever it fills, so memory use is at most ~2x that of the final arrays (and the per-step shape is fixed by the first value added)
+
+	Call startNewStep() at each energy evaluation; values added after that belong to that step (values added before the first step belong to the first step). The unit cell recorded for a step is the last one added before the step started
+
+	"""
+	def __init__(self, initCapacity=64):
+		self.initCapacity = initCapacity
+		self.reset()
+
+	def reset(self):
+		self._arrays = dict()
+		self.numbSteps = 0
+		self._currCellVals = None
+
+	def startNewStep(self):
+		self.numbSteps += 1
+		if self._currCellVals is not None:
+			for key, values in self._currCellVals.items():
+				self.addValues(key, values)
+
+	def addValues(self, key, values):
+		""" Set the values (a scalar or array with the same shape every time) of quantity key for the current step """
+		values = np.asarray(values, dtype=float)
+		stepIdx = max(self.numbSteps-1, 0)
+		if key not in self._arrays:
+			self._arrays[key] = np.full( (max(self.initCapacity,stepIdx+1),) + values.shape, np.nan )
+
+		currArray = self._arrays[key]
+		if values.shape != currArray.shape[1:]:
+			raise ValueError("Shape {} for {} doesnt match shape of previous steps {}".format(values.shape, key, currArray.shape[1:]))
+		currArray = self._growArrayToFitIdx(key, stepIdx)
+		currArray[stepIdx] = values
+
+	def addUnitCell(self, unitCell):
+		self._currCellVals = {"lattParams": [float(x) for x in unitCell.getLattParamsList()],
+		                      "lattAngles": [float(x) for x in unitCell.getLattAnglesList()]}
+
+	def getArrays(self):
+		""" Get the collected values
+		
+		Returns
+			outArrays: (dict) Keys are quantities found at least once; values are numpy arrays with shape (nSteps,...), where row i of each array is from step i. Possible keys are energy, dispersion, entropy, fermi_energy (nSteps), forces (nSteps,nAtoms,3), hirshfeld_charges, mulliken_charges (nSteps,nAtoms) and lattParams, lattAngles (nSteps,3). Values missing for a step are NaN
+ 
+		"""
+		nSteps = max(self.numbSteps, 1) if len(self._arrays)>0 else 0
+		return {key:self._growArrayToFitIdx(key, nSteps-1)[:nSteps].copy() for key in self._arrays.keys()}
+
+	def _growArrayToFitIdx(self, key, idx):
+		currArray = self._arrays[key]
+		if idx >= currArray.shape[0]:
+			newArray = np.full( (max(2*currArray.shape[0],idx+1),) + currArray.shape[1:], np.nan )
+			newArray[:currArray.shape[0]] = currArray
+			self._arrays[key] = currArray = newArray
+		return currArray
+
+
+def _addTrajectoryCollectionToParserObj(parserObj):
+	""" Wraps the handle functions for energies/forces/charges sections so values from every section are also stored in parserObj.trajectory. Sections must already be attached to parserObj """
+	parserObj.trajectory = CpoutTrajectoryCollector()
+	trajHandlers = {"Core Hamiltonian energy":_collectEnergiesTrajectory,
+	                "ATOMIC FORCES in [a.u.]":_collectAtomicForcesTrajectory,
+	                "Hirshfeld Charges":_getCollectChargesTrajectoryFunct("hirshfeld_charges"),
+	                "Mulliken Population Analysis":_getCollectChargesTrajectoryFunct("mulliken_charges")}
+
+	for pattern, collectFunct in trajHandlers.items():
+		_addExtraHandleStepToParserObj(pattern, _getTrajectoryHandleFunct(collectFunct), parserObj)
+
+	parserObj.finalStepsFunctions.append(_addTrajectoryToOutDictFinalStepFunct)
+
+
+def _addExtraHandleStepToParserObj(pattern, extraFunct, parserObj):
+	""" Makes extraFunct(parserInstance, parsedDict) get called after the usual handle function for any section attached with the given pattern """
+	for idx,currPattern in enumerate(parserObj.extraSingleLinePatterns):
+		if currPattern == pattern:
+			origFunct = parserObj.extraHandleParsedOutputFuncts[idx]
+			parserObj.extraHandleParsedOutputFuncts[idx] = _getHandleFunctWithExtraStep(origFunct, extraFunct)
+
+
+def _getHandleFunctWithExtraStep(origFunct, extraFunct):
+	def _handleFunct(parserInstance, outDict):
+		if origFunct is None:
+			parserInstance.outDict.update(outDict)
+		else:
+			origFunct(parserInstance, outDict)
+		extraFunct(parserInstance, outDict)
+	return _handleFunct
+
+
+def _getTrajectoryHandleFunct(collectFunct):
+	def _handleFunct(parserInstance, outDict):
+		collectFunct(parserInstance.trajectory, outDict)
+	return _handleFunct
+
+
+def _collectEnergiesTrajectory(collector, outDict):
+	energies = outDict["energies"]
+	collector.startNewStep()
+	collector.addValues("energy", outDict["energy"])
+	for key,val in [("dispersion",energies.dispersion), ("entropy",energies.entropy), ("fermi_energy",outDict.get("fermi_energy",None))]:
+		collector.addValues(key, np.nan if val is None else val)
+
+
+def _collectAtomicForcesTrajectory(collector, outDict):
+	collector.addValues("forces", outDict["forces"])
+
+
+def _getCollectChargesTrajectoryFunct(key):
+	def _collectFunct(collector, outDict):
+		if outDict.get("charges",None) is not None:
+			collector.addValues(key, outDict["charges"])
+	return _collectFunct
+
+
+def _addTrajectoryToOutDictFinalStepFunct(parserInstance):
+	parserInstance.outDict["trajectory"] = parserInstance.trajectory.getArrays()
+
+
+class CpoutTailParser():
+	""" Follows a CP2K output file which may still be written to (e.g. a running job). Each call to update() parses only the bytes appended since the previous call, so the cost of polling scales with the amount of new output rather than the file size
+
+	Lines are only parsed once complete, and a section (e.g. energies) is only parsed once its end marker has been written; until then its lines are held and the next update() carries on searching for the end marker from where it stopped. If the file shrinks (e.g. the job was restarted and the output overwritten) parsing restarts from the beginning
+
+	"""
+	def __init__(self, outFile, trajectory=False, maxPendingLines=100000):
+		""" Initializer
+		
+		Args:
+			outFile: (str) Path to the CP2K output file
+			trajectory: (Bool) If True collect values from every step; see parseCpout
+			maxPendingLines: (int) Maximum number of lines to hold while waiting for the end of one section (e.g. in case the end marker never gets written). Past this the section is parsed from the lines available, and any error raised
+				 
+		"""
+		self.outFile = outFile
+		self.trajectory = trajectory
+		self.maxPendingLines = maxPendingLines
+		self._resetState()
+
+	def _resetState(self):
+		self._parser = _getStandardCpoutParser(trajectory=self.trajectory)
+		_addExtraHandleStepToParserObj("Core Hamiltonian energy", _incrementEnergyEvalCount, self._parser)
+		self._parser.deferIncompleteSections = True
+		self._parser._startNewParse()
+		self.byteOffset = 0
+		self._partialLine = b"" #Bytes after the last newline found
+		self._pendingLines = list() #Complete lines from a section which hadnt finished being written
+
+	def update(self):
+		""" Parse any output appended to the file since the last call
+		
+		Returns
+			outDict: (dict) Partial results from the file so far (see getCurrentOutDict)
+ 
+		"""
+		with open(self.outFile,"rb") as f:
+			f.seek(0,2)
+			if f.tell() < self.byteOffset:
+				self._resetState()
+			f.seek(self.byteOffset)
+			newBytes = f.read()
+		self.byteOffset += len(newBytes)
+
+		allBytes = self._partialLine + newBytes
+		endIdx = allBytes.rfind(b"\n") + 1
+		self._partialLine = allBytes[endIdx:]
+		newLines = allBytes[:endIdx].decode("utf-8", errors="replace").splitlines(keepends=True)
+
+		fileAsList = self._pendingLines + newLines
+		self._parser.deferIncompleteSections = len(self._pendingLines) <= self.maxPendingLines
+		try:
+			parsedUpToIdx = self._parser._parseLinesFromIdx(fileAsList, 0)
+		except Exception as e:
+			raise errorHelp.PlatoPylibParseFileError("Something went wrong when parsing the current CP2K output file {}".format(self.outFile)) from e
+		finally:
+			self._parser.deferIncompleteSections = True
+		self._pendingLines = fileAsList[parsedUpToIdx:]
+		self._parser._shiftIncompleteSectionScan(-parsedUpToIdx)
+
+		return self.getCurrentOutDict()
+
+	def getCurrentOutDict(self):
+		""" Get results parsed so far. These are the same values parseCpout would give (with ThrowIfTerminateFlagMissing=False, except "terminate_flag_found" is the real value) if the file ended at the last fully-written section. "numb_energy_evals" also gives the number of energy sections parsed (i.e. steps completed in a geometry optimisation or MD run)
+		
+		Returns
+			outDict: (dict) Copy of the parsed values so far
+ 
+		"""
+		currDict = self._parser.outDict
+		self._parser.outDict = dict(currDict)
+		self._parser.outDict.setdefault("numb_energy_evals", 0)
+		try:
+			self._parser._applyFinalStepsFunctions()
+			outDict = self._parser.outDict
+		finally:
+			self._parser.outDict = currDict
+		return outDict
+
+
+def _incrementEnergyEvalCount(parserInstance, outDict):
+	parserInstance.outDict["numb_energy_evals"] = parserInstance.outDict.get("numb_energy_evals",0) + 1
+
+
+class _IncompleteSectionError(Exception):
+	""" Raised when the end of a section isnt in the lines available (and we want to wait for more lines rather than parse what we have) """
+	pass
+
+
+def _isEndOfCellSection(line):
+	return "CELL|" not in line
+
+
 def parseCellSectionCpout(fileAsList, lineIdx):
 	lattParams = list()
 	lattAngles = list()
@@ -1,9 +1,11 @@
 
 import itertools as it
+import json
+import os
 
 import numpy as np
 
-def parseCubeFile(inpPath):
+def parseCubeFile(inpPath, dataGridAsList=False):
 	""" Parses the input cube file. Specification for a cube file format is given here:
 
 	https://h5cube-spec.readthedocs.io/en/latest/cubeformat.html
@@ -13,15 +15,25 @@ def parseCubeFile(inpPath):
 	
 	Args:
 		inpPath: (str) Path to the input *.cube file
+		dataGridAsList: (Bool) If True outDict["data_grid"] is a nested list (the old behaviour) rather than a numpy array. The list is MUCH slower to create and uses far more memory for large grids
 			 
 	Returns
-		outDict: (dict) All info in a dict format.
+		outDict: (dict) All info in a dict format. outDict["data_grid"] is an (n_x, n_y, n_z) numpy array (unless dataGridAsList=True)
  
 	"""
 	fileAsList = _readFileIntoList(inpPath)
-	outDict = dict()
+	outDict, endGeomLine = _parseCubeHeader(fileAsList)
+
+	#Parse the data grid part; z varies fastest in the file, which matches C-ordering for an (n_x,n_y,n_z) array
+	gridShape = (outDict["n_x"],outDict["n_y"],outDict["n_z"])
+	outGrid = _getGridFromDataLines(fileAsList[endGeomLine:], gridShape)
+	outDict["data_grid"] = outGrid.tolist() if dataGridAsList else outGrid
+
+	return outDict
+
 
-	#Parse the header
+def _parseCubeHeader(fileAsList):
+	outDict = dict()
 	outDict["header_a"], outDict["header_b"] = fileAsList[0].strip(), fileAsList[1].strip()
 	outDict["n_atoms"] = int( fileAsList[2].strip().split()[0] )
 	outDict["origin"] = [ float(x) for x in fileAsList[2].strip().split()[1:] ] 
@@ -43,27 +55,158 @@ def parseCubeFile(inpPath):
 		outDict["atomic_charges"].append( float(splitLine[1]) )
 		outDict["atomic_coords"].append( [float(x) for x in splitLine[2:]] ) 
 
-	#Parse the data grid part
-	#Step 1 = get all the numbers in order
-	finalLineIdx = len(fileAsList)
-	gridNumbersOneDim = list()
+	return outDict, endGeomLine
 
-	for line in fileAsList[endGeomLine:finalLineIdx]:
-		currVals = [float(x) for x in line.strip().split()]
-		gridNumbersOneDim.extend(currVals)
 
-	#Step 2 = put them in a grid
-	outGrid = np.zeros( (outDict["n_x"],outDict["n_y"],outDict["n_z"]) )
+def _getGridFromDataLines(dataLines, gridShape):
+	""" Convert all numbers in dataLines into an array of shape gridShape with one bulk conversion (rather than float-by-float) """
+	gridVals = np.fromstring(" ".join(dataLines), sep=" ")
+	expNumbVals = int(np.prod(gridShape))
+	if len(gridVals) != expNumbVals:
+		raise ValueError("Expected {} values for a {} grid, but found {}".format(expNumbVals, gridShape, len(gridVals)))
+	return gridVals.reshape(gridShape)
 
-	totalIdx = 0
-	for xIdx in range(outDict["n_x"]):
-		for yIdx in range(outDict["n_y"]):
-			for zIdx in range(outDict["n_z"]):
-				outGrid[xIdx][yIdx][zIdx] = gridNumbersOneDim[totalIdx]
-				totalIdx += 1
-	outDict["data_grid"] = outGrid.tolist() 
 
-	return outDict
+def writeCubeFile(outPath, cubeData, dataGrid=None, fmt="%13.5E", chunkSize=2**18):
+	""" Write a cube file. Grid values are written 6 per line (with a new line after each set of n_z values), formatting a chunk of many values per call rather than one value at a time
+	
+	Args:
+		outPath: (str) Path to write the *.cube file to
+		cubeData: (dict or MemmappedCubeGrid) Output from parseCubeFile (or openCubeGridCache). A header-only dict (same keys but no "data_grid") can be used along with dataGrid
+		dataGrid: (Optional, n_x x n_y x n_z array) Grid values to write instead of those in cubeData (e.g. a difference density)
+		fmt: (str) printf-style format for each grid value (printf-style formatting is notably faster than str.format for this)
+		chunkSize: (int) Approximate number of grid values formatted at once. Larger values use more memory but fewer calls
+ 
+	"""
+	header = cubeData.header if hasattr(cubeData,"header") else cubeData
+	if dataGrid is None:
+		dataGrid = cubeData.grid if hasattr(cubeData,"grid") else cubeData["data_grid"]
+	dataGrid = np.asarray(dataGrid, dtype=float)
+	if dataGrid.ndim != 3:
+		raise ValueError("dataGrid needs 3 dimensions, but has shape {}".format(dataGrid.shape))
+
+	with open(outPath,"wt") as f:
+		f.write( _getCubeHeaderStr(header, dataGrid.shape) )
+		nX, nY, nZ = dataGrid.shape
+		if nZ == 0:
+			return
+		rowFmt = "".join( [(fmt*len(range(idx,min(idx+6,nZ))))+"\n" for idx in range(0,nZ,6)] )
+		dataRows = dataGrid.reshape(-1,nZ)
+		rowsPerChunk = max(1, chunkSize//nZ)
+		for startIdx in range(0, len(dataRows), rowsPerChunk):
+			currRows = dataRows[startIdx:startIdx+rowsPerChunk]
+			f.write( (rowFmt*len(currRows)) % tuple(currRows.ravel().tolist()) )
+
+
+def _getCubeHeaderStr(header, gridShape):
+	atomicNumbers, atomicCoords = header.get("atomic_numbers",list()), header.get("atomic_coords",list())
+	atomicCharges = header.get("atomic_charges", [0.0 for x in atomicNumbers])
+	outLines = [ header.get("header_a",""), header.get("header_b","") ]
+	outLines.append( "{:5d}".format(len(atomicNumbers)) + "".join(["{:12.6f}".format(x) for x in header["origin"]]) )
+	for nPoints, stepKey in zip(gridShape, ["step_x","step_y","step_z"]):
+		outLines.append( "{:5d}".format(nPoints) + "".join(["{:12.6f}".format(x) for x in header[stepKey]]) )
+	for atomicNumber, charge, coords in zip(atomicNumbers, atomicCharges, atomicCoords):
+		outLines.append( "{:5d}{:12.6f}".format(atomicNumber, charge) + "".join(["{:12.6f}".format(x) for x in coords]) )
+	return "\n".join(outLines) + "\n"
+
+
+def writeCubeGridCache(cubeDict, cachePrefix, planeAxis=2):
+	""" Write the output of parseCubeFile to a binary cache (cachePrefix + ".npy" for the grid, cachePrefix + ".json" for everything else), which can be re-opened near-instantly with openCubeGridCache
+	
+	Args:
+		cubeDict: (dict) Output from parseCubeFile
+		cachePrefix: (str) Path to write the cache files to, minus the extensions
+		planeAxis: (int) The grid is stored so that planes perpendicular to this axis (0,1,2 for x,y,z) are contiguous on disk. Reading a single plane along this axis then only touches that planes data
+
+	"""
+	headerDict = {k:v for k,v in cubeDict.items() if k!="data_grid"}
+	headerDict["plane_axis"] = planeAxis
+	diskOrder = _getDiskAxisOrderForPlaneAxis(planeAxis)
+	np.save( cachePrefix + ".npy", np.ascontiguousarray( np.moveaxis(np.asarray(cubeDict["data_grid"],dtype=float), diskOrder, [0,1,2]) ) )
+	with open(cachePrefix + ".json", "wt") as f:
+		json.dump(headerDict, f)
+
+
+def openCubeGridCache(cachePrefix):
+	""" Open a cache written by writeCubeGridCache; the grid is memory-mapped rather than loaded
+	
+	Args:
+		cachePrefix: (str) Path to the cache files, minus the extensions
+			 
+	Returns
+		cubeGrid: (MemmappedCubeGrid)
+ 
+	"""
+	with open(cachePrefix + ".json", "rt") as f:
+		headerDict = json.load(f)
+	diskGrid = np.load(cachePrefix + ".npy", mmap_mode="r")
+	return MemmappedCubeGrid(headerDict, diskGrid)
+
+
+def parseCubeFileWithCache(inpPath, cachePrefix=None, planeAxis=2):
+	""" Get a MemmappedCubeGrid for a cube file, parsing the cube file and writing the cache only if the cache is missing or older than the cube file
+	
+	Args:
+		inpPath: (str) Path to the input *.cube file
+		cachePrefix: (Optional, str) Path for the cache files, minus extensions. Default is inpPath + ".gridcache"
+		planeAxis: (int) See writeCubeGridCache; only used when the cache is (re)written
+			 
+	Returns
+		cubeGrid: (MemmappedCubeGrid)
+ 
+	"""
+	cachePrefix = inpPath + ".gridcache" if cachePrefix is None else cachePrefix
+	cachePaths = [cachePrefix + ".npy", cachePrefix + ".json"]
+	cubeMTime = os.path.getmtime(inpPath)
+	if not all([os.path.exists(x) and (os.path.getmtime(x) >= cubeMTime) for x in cachePaths]):
+		writeCubeGridCache( parseCubeFile(inpPath), cachePrefix, planeAxis=planeAxis )
+	return openCubeGridCache(cachePrefix)
+
+
+class MemmappedCubeGrid():
+	""" Read-only, memory-mapped cube file data. Only the parts of the grid accessed are read from disk
+
+	Attributes:
+		header: (dict) Same keys/values as parseCubeFile output, except "data_grid" (plus "plane_axis")
+		grid: (n_x x n_y x n_z read-only array) Memory-mapped view of the full grid; indexing this only reads the values needed
+
+	"""
+	def __init__(self, header, diskGrid):
+		self.header = header
+		self._diskGrid = diskGrid
+		self.grid = np.moveaxis(diskGrid, [0,1,2], _getDiskAxisOrderForPlaneAxis(header["plane_axis"]))
+
+	@property
+	def shape(self):
+		return self.grid.shape
+
+	def getPlane(self, axis, idx):
+		""" Get the 2-d slice at index idx along axis (0,1,2 for x,y,z) as an in-memory array. Fastest for axis == header["plane_axis"] """
+		return np.array( np.take(self.grid, idx, axis=axis) )
+
+	def getZPlane(self, idx):
+		return self.getPlane(2, idx)
+
+	def getSlab(self, axis, start, stop):
+		""" Get planes start:stop along axis as an in-memory array (keeping all 3 dimensions) """
+		slices = [slice(None)]*3
+		slices[axis] = slice(start,stop)
+		return np.array( self.grid[tuple(slices)] )
+
+	def getSubBlock(self, xRange, yRange, zRange):
+		""" Get grid[x0:x1, y0:y1, z0:z1] as an in-memory array, where each range is a (start,stop) pair """
+		return np.array( self.grid[xRange[0]:xRange[1], yRange[0]:yRange[1], zRange[0]:zRange[1]] )
+
+	def getLineProfile(self, axis, idxA, idxB):
+		""" Get the 1-d line of values along axis, with the other two indices (in x,y,z order) given by idxA/idxB """
+		slices = [idxA, idxB]
+		slices.insert(axis, slice(None))
+		return np.array( self.grid[tuple(slices)] )
+
+
+def _getDiskAxisOrderForPlaneAxis(planeAxis):
+	""" The grid axis stored as each on-disk axis; planeAxis is first so planes along it are contiguous """
+	return [planeAxis] + [x for x in range(3) if x!=planeAxis]
 
 
 def _readFileIntoList(inpPath):
@@ -3,6 +3,8 @@ import os
 import pathlib
 import re
 
+import numpy as np
+
 from ..shared import ucell_class as uCell
 
 def parseXyzFile(xyzFile):
@@ -24,15 +26,101 @@ def parseXyzFile(xyzFile):
 	return _parseStandardXyzFile(fileAsList)
 
 
+def parseXyzFileAsGeometry(xyzFile):
+	""" Fast alternative to parseXyzFile; the numeric block is parsed in one go and no UnitCell is created unless asked for
+	
+	Args:
+		xyzFile: (str) Path to the .xyz file
+			 
+	Returns
+		 outGeom: (XyzGeometry) Contains elementList and cartCoords (nx3 numpy array). outGeom.unitCell gives the same UnitCell as parseXyzFile
+ 
+	"""
+	fileAsList = _loadFileIntoList(xyzFile)
+	fileAsList = fileAsList[:2] + [x for x in fileAsList[2:] if x.strip()!=""]
+	return _parseStandardXyzFileAsGeometry(fileAsList)
+
+
+class XyzGeometry():
+	""" Lightweight record for a single xyz geometry. The UnitCell (from lattVects if set, else a 50x50x50 cube as used by parseXyzFile) is only built when first accessed through .unitCell
+
+	Attributes:
+		elementList: (len-n list of str) Element symbol for each atom
+		cartCoords: (nx3 numpy array) Cartesian co-ordinates
+		commentLine: (str) The comment (2nd) line of the frame
+		lattVects: (3x3 numpy array or None) Lattice vectors (e.g. from the Lattice key in extended xyz files)
+		info: (dict) Per-frame key/values (e.g. {"energy":-2.5, "step":4} from an extended xyz comment line)
+		atomProps: (dict) Per-atom properties other than species/positions; keys are names (e.g. "forces") and values are arrays with len-n first dimension
+
+	"""
+	_defaultLattVects = [ [50.0,  0.0 ,  0.0],
+	                      [ 0.0, 50.0 ,  0.0],
+	                      [ 0.0,  0.0 , 50.0] ]
+
+	def __init__(self, elementList, cartCoords, commentLine="", lattVects=None, info=None, atomProps=None):
+		self.elementList = elementList
+		self.cartCoords = cartCoords
+		self.commentLine = commentLine
+		self.lattVects = None if lattVects is None else np.array(lattVects, dtype=float)
+		self.info = dict() if info is None else info
+		self.atomProps = dict() if atomProps is None else atomProps
+		self._unitCell = None
+
+	@classmethod
+	def fromUnitCell(cls, inpCell, info=None, atomProps=None):
+		elementList = [x[-1] for x in inpCell.fractCoords]
+		return cls(elementList, np.array(inpCell.cartCoordsArray), lattVects=np.array(inpCell.lattVectsArray), info=info, atomProps=atomProps)
+
+	@property
+	def nAtoms(self):
+		return len(self.elementList)
+
+	@property
+	def unitCell(self):
+		""" (UnitCell, array storage) Built on first access then cached """
+		if self._unitCell is None:
+			self._unitCell = self.toUnitCell()
+		return self._unitCell
+
+	def toUnitCell(self, lattVects=None):
+		""" Build a new UnitCell containing this geometry; lattVects default to self.lattVects, or a 50x50x50 cube if thats not set """
+		if lattVects is None:
+			lattVects = self._defaultLattVects if self.lattVects is None else self.lattVects
+		outCell = uCell.UnitCell.fromLattVects(lattVects, useArrayStorage=True)
+		#Fractional co-ords come from the input vectors, since fromLattVects may re-orient the cell
+		fractCoords = np.array(self.cartCoords, dtype=float).reshape(-1,3) @ np.linalg.inv(np.array(lattVects, dtype=float))
+		outCell.setFractCoordsFromArrays(fractCoords, self.elementList)
+		return outCell
+
+
+def _parseStandardXyzFileAsGeometry(fileAsList):
+	expNumbAtoms = int( fileAsList[0].strip() )
+	commentLine = fileAsList[1].rstrip("\r\n") if len(fileAsList)>1 else ""
+	elementList, cartCoords = _parseXyzAtomLinesToArrays(fileAsList[2:])
+	actNumbAtoms = len(elementList)
+	assert expNumbAtoms==actNumbAtoms, "xyz file contains {} atoms but expected {}".format(actNumbAtoms, expNumbAtoms)
+	return XyzGeometry(elementList, cartCoords, commentLine=commentLine)
+
+
+def _parseXyzAtomLinesToArrays(atomLines):
+	""" Parse lines of "Element x y z [extra columns]" into (elementList, nx3 float array). All tokens are split/converted in single calls rather than line by line """
+	nAtoms = len(atomLines)
+	if nAtoms == 0:
+		return list(), np.zeros((0,3))
+	allTokens = " ".join(atomLines).split()
+	nCols, remainder = divmod(len(allTokens), nAtoms)
+	if (remainder != 0) or (nCols < 4):
+		raise ValueError("Atom lines in xyz frame have inconsistent/too few columns")
+	tokenArray = np.array(allTokens, dtype=object).reshape(nAtoms, nCols)
+	return tokenArray[:,0].tolist(), tokenArray[:,1:4].astype(float)
+
+
 def _parseStandardXyzFile(fileAsList):
 
 	expNumbAtoms = int( fileAsList[0].strip() )
 
-	allCoords = list()
-	for line in fileAsList[2:]:
-		atom, *coords = line.strip().split()
-		currCoords = [float(x) for x in coords] + [atom]
-		allCoords.append( currCoords )
+	elementList, cartCoords = _parseXyzAtomLinesToArrays(fileAsList[2:])
+	allCoords = [ coords + [atom] for coords,atom in zip(cartCoords.tolist(), elementList) ]
 
 	outCell =   uCell.UnitCell.fromLattVects( [ [50.0,  0.0 ,  0.0],
 	                                            [ 0.0, 50.0 ,  0.0],
@@ -47,6 +135,293 @@ def _parseStandardXyzFile(fileAsList):
 
 
 
+class XyzTrajectoryReader():
+	""" Random-access reader for multi-frame xyz files (e.g. CP2K *-pos-1.xyz trajectories). An index of the byte offset of each frame is built on creation (or loaded from disk), after which single frames, slices and strided iteration only read the frames requested
+
+	An incomplete final frame (e.g. from a running job) is ignored. Frames are returned as XyzGeometry objects
+
+	"""
+	def __init__(self, inpPath, persistIndex=False, indexPath=None):
+		""" Initializer
+		
+		Args:
+			inpPath: (str) Path to the xyz file
+			persistIndex: (Bool) If True the frame index is saved to indexPath, and loaded from there next time (provided the xyz file size/modification time are unchanged)
+			indexPath: (Optional, str) Where to save the frame index. Default is inpPath + ".frameidx.npz"
+				 
+		"""
+		self.inpPath = inpPath
+		self.indexPath = inpPath + ".frameidx.npz" if indexPath is None else indexPath
+		self.persistIndex = persistIndex
+		self._loadOrBuildFrameIndex()
+
+	def __len__(self):
+		return len(self.frameStarts)
+
+	def __getitem__(self, key):
+		if isinstance(key, slice):
+			return list( self.iterFrames(*key.indices(len(self))) )
+		return self.getFrame(key)
+
+	def __iter__(self):
+		return self.iterFrames()
+
+	def getFrame(self, frameIdx):
+		""" Get a single frame; only this frame is read from the file """
+		frameIdx = self._getPositiveFrameIdx(frameIdx)
+		with open(self.inpPath,"rb") as f:
+			return self._readFrame(f, frameIdx)
+
+	def iterFrames(self, start=0, stop=None, step=1):
+		""" Iterate over frames self[start:stop:step] (negative start/stop count from the end, as for slicing), keeping the file open throughout """
+		with open(self.inpPath,"rb") as f:
+			for frameIdx in self._getFrameIndices(start, stop, step):
+				yield self._readFrame(f, frameIdx)
+
+	def getCartCoordsArray(self, start=0, stop=None, step=1):
+		""" Get an (nFrames x nAtoms x 3) array of co-ordinates for frames self[start:stop:step]. All these frames must have the same number of atoms """
+		frameIndices = self._getFrameIndices(start, stop, step)
+		nAtoms = set( [int(self.frameNumbAtoms[idx]) for idx in frameIndices] )
+		if len(nAtoms) > 1:
+			raise ValueError("Frames have different numbers of atoms ({}); cant stack co-ordinates".format(sorted(nAtoms)))
+		outArray = np.zeros( (len(frameIndices), nAtoms.pop() if len(nAtoms)>0 else 0, 3) )
+		for outIdx,frame in enumerate(self.iterFrames(start,stop,step)):
+			outArray[outIdx] = frame.cartCoords
+		return outArray
+
+	def getUnitCell(self, frameIdx):
+		""" Get frame frameIdx as a UnitCell (with the same 50x50x50 cubic cell _parseStandardXyzFile uses) """
+		return self.getFrame(frameIdx).unitCell
+
+	def _getFrameIndices(self, start, stop, step):
+		return range( *slice(start,stop,step).indices(len(self)) )
+
+	def _getPositiveFrameIdx(self, frameIdx):
+		outIdx = frameIdx + len(self) if frameIdx < 0 else frameIdx
+		if (outIdx < 0) or (outIdx >= len(self)):
+			raise IndexError("Frame index {} out of range for trajectory with {} frames".format(frameIdx, len(self)))
+		return outIdx
+
+	def _readFrame(self, fileObj, frameIdx):
+		fileObj.seek( self.frameStarts[frameIdx] )
+		frameBytes = fileObj.read( self.frameEnds[frameIdx] - self.frameStarts[frameIdx] )
+		return _parseStandardXyzFileAsGeometry( frameBytes.decode("utf-8").splitlines() )
+
+	def _loadOrBuildFrameIndex(self):
+		fileStats = os.stat(self.inpPath)
+		fileStamp = np.array([fileStats.st_size, fileStats.st_mtime_ns], dtype=np.int64)
+		if self.persistIndex and os.path.exists(self.indexPath):
+			with np.load(self.indexPath) as savedIndex:
+				if np.array_equal(savedIndex["fileStamp"], fileStamp):
+					self.frameStarts, self.frameEnds, self.frameNumbAtoms = savedIndex["frameStarts"], savedIndex["frameEnds"], savedIndex["frameNumbAtoms"]
+					return None
+
+		self.frameStarts, self.frameEnds, self.frameNumbAtoms = _getXyzFrameByteOffsets(self.inpPath)
+		if self.persistIndex:
+			with open(self.indexPath,"wb") as f:
+				np.savez(f, fileStamp=fileStamp, frameStarts=self.frameStarts, frameEnds=self.frameEnds, frameNumbAtoms=self.frameNumbAtoms)
+
+
+def _getXyzFrameByteOffsets(inpPath):
+	""" Returns (start offsets, end offsets, number of atoms) arrays for each complete frame in an xyz file. Blank lines between frames are skipped. Lines are only complete once their newline has been written, so a partly-written final frame is dropped """
+	frameStarts, frameEnds, frameNumbAtoms = list(), list(), list()
+	with open(inpPath,"rb") as f:
+		while True:
+			startOffset = f.tell()
+			currLine = f.readline()
+			if not currLine.endswith(b"\n"):
+				break
+			if currLine.strip() == b"":
+				continue
+			nAtoms = int(currLine)
+			linesRead = 0
+			while (linesRead < nAtoms+1) and f.readline().endswith(b"\n"):
+				linesRead += 1
+			if linesRead < nAtoms+1:
+				break
+			frameStarts.append(startOffset)
+			frameEnds.append(f.tell())
+			frameNumbAtoms.append(nAtoms)
+	return np.array(frameStarts, dtype=np.int64), np.array(frameEnds, dtype=np.int64), np.array(frameNumbAtoms, dtype=np.int64)
+
+
+def parseExtendedXyzFile(inpPath):
+	""" Parse all frames from an extended xyz file; see iterExtendedXyzFrames
+	
+	Args:
+		inpPath: (str) Path to input *.exyz/*.xyz file
+			 
+	Returns
+		outFrames: (list of XyzGeometry objects)
+
+	"""
+	return list( iterExtendedXyzFrames(inpPath) )
+
+
+def iterExtendedXyzFrames(inpPath):
+	""" Iterate over frames in an extended xyz file, reading one frame at a time. The comment line is parsed for Lattice, Properties and any other key=value pairs (which go in frame.info). Columns other than species/pos named in Properties go in frame.atomProps
+
+	Args:
+		inpPath: (str) Path to input *.exyz/*.xyz file
+
+	Yields
+		frame: (XyzGeometry) One per frame in the file
+
+	"""
+	with open(inpPath,"rt") as f:
+		while True:
+			nAtomsLine = f.readline()
+			if nAtomsLine == "":
+				break
+			if nAtomsLine.strip() == "":
+				continue
+			nAtoms = int(nAtomsLine)
+			commentLine = f.readline().rstrip("\r\n")
+			atomLines = [f.readline() for idx in range(nAtoms)]
+			if (nAtoms > 0) and (atomLines[-1].strip() == ""):
+				raise ValueError("Frame in {} has fewer than the {} atoms expected".format(inpPath, nAtoms))
+			yield _parseExtendedXyzFrame(commentLine, atomLines)
+
+
+def dumpExtendedXyzFile(outPath, frames, fmt="{:.8f}", bufferSize=2**20):
+	""" Write an extended xyz file containing any number of frames. Each frame is formatted with a single string operation (rather than one per atom) and output is written through a large buffer
+
+	Args:
+		outPath: (str) Path to write the file to
+		frames: (iter of XyzGeometry or UnitCell objects) The geometries to write. Lattice vectors, info and atomProps (e.g. forces, charges) of XyzGeometry frames are written too
+		fmt: (str) Format for float values
+		bufferSize: (int) Size of the write buffer in bytes
+
+	"""
+	outFolder = os.path.split(outPath)[0]
+	if outFolder != "":
+		pathlib.Path(outFolder).mkdir(parents=True, exist_ok=True)
+	with open(outPath, "wt", buffering=bufferSize) as f:
+		for frame in frames:
+			frame = frame if isinstance(frame, XyzGeometry) else XyzGeometry.fromUnitCell(frame)
+			f.write( _getExtendedXyzFrameStr(frame, fmt) )
+
+
+_EXYZ_TYPE_TO_DTYPE = {"S":object, "R":float, "I":int, "L":bool}
+
+
+def _parseExtendedXyzFrame(commentLine, atomLines):
+	info = _parseExtendedXyzKeyVals(commentLine)
+	lattVects = info.pop("Lattice", None)
+	if lattVects is not None:
+		lattVects = np.array(lattVects, dtype=float).reshape(3,3)
+	propDefs = _parsePropertiesStr( info.pop("Properties","species:S:1:pos:R:3") )
+
+	nAtoms = len(atomLines)
+	nCols = sum([x[2] for x in propDefs])
+	allTokens = " ".join(atomLines).split()
+	if len(allTokens) != nAtoms*nCols:
+		raise ValueError("Expected {} columns per atom from Properties string, but found {} values for {} atoms".format(nCols, len(allTokens), nAtoms))
+	tokenArray = np.array(allTokens, dtype=object).reshape(nAtoms, nCols)
+
+	elementList, cartCoords, atomProps = None, None, dict()
+	startCol = 0
+	for name, dataType, nCurrCols in propDefs:
+		currVals = tokenArray[:, startCol:startCol+nCurrCols]
+		startCol += nCurrCols
+		if dataType == "L":
+			currVals = np.isin(currVals, ["T","True","true"])
+		else:
+			currVals = currVals.astype(_EXYZ_TYPE_TO_DTYPE[dataType])
+		currVals = currVals[:,0] if nCurrCols==1 else currVals
+
+		if name == "species":
+			elementList = currVals.tolist()
+		elif name == "pos":
+			cartCoords = currVals
+		else:
+			atomProps[name] = currVals
+
+	return XyzGeometry(elementList, cartCoords, commentLine=commentLine, lattVects=lattVects, info=info, atomProps=atomProps)
+
+
+def _parsePropertiesStr(propStr):
+	splitStr = propStr.split(":")
+	if len(splitStr)%3 != 0:
+		raise ValueError("Invalid Properties string {}".format(propStr))
+	return [ (splitStr[idx], splitStr[idx+1], int(splitStr[idx+2])) for idx in range(0,len(splitStr),3) ]
+
+
+def _parseExtendedXyzKeyVals(commentLine):
+	""" Parse key=value (or key="multi word value", or bare key) pairs into a dict. Values become int/float/bool or lists of floats where possible """
+	outDict = dict()
+	for key, quotedVal, plainVal in re.findall(r'([^\s=]+)(?:=(?:"([^"]*)"|(\S+)))?', commentLine):
+		if quotedVal == "" and plainVal == "":
+			outDict[key] = True
+		else:
+			outDict[key] = _convertExtendedXyzValStr(quotedVal if quotedVal!="" else plainVal)
+	return outDict
+
+
+def _convertExtendedXyzValStr(valStr):
+	boolStrs = {"T":True, "True":True, "F":False, "False":False}
+	splitVals = valStr.split()
+	if (len(splitVals) > 0) and all([x in boolStrs for x in splitVals]):
+		convVals = [boolStrs[x] for x in splitVals]
+		return convVals[0] if len(convVals)==1 else convVals
+	for convFunct in [int, float]:
+		try:
+			convVals = [convFunct(x) for x in splitVals]
+		except ValueError:
+			continue
+		return convVals[0] if len(convVals)==1 else convVals
+	return valStr
+
+
+def _getExtendedXyzFrameStr(frame, fmt):
+	nAtoms = frame.nAtoms
+
+	#Comment line
+	commentParts = list()
+	if frame.lattVects is not None:
+		commentParts.append( "Lattice=\"{}\"".format( " ".join([fmt.format(x) for x in np.array(frame.lattVects).flatten()]) ) )
+	propNames, propCols = ["species:S:1", "pos:R:3"], [np.array(frame.elementList,dtype=object).reshape(nAtoms,1), np.array(frame.cartCoords,dtype=float).reshape(nAtoms,3)]
+	propFmts = ["{}"] + [fmt]*3
+	for name, vals in frame.atomProps.items():
+		vals = np.asarray(vals)
+		currCols = vals.reshape(nAtoms,-1)
+		dataType = _getExtendedXyzTypeStr(vals)
+		propNames.append( "{}:{}:{}".format(name, dataType, currCols.shape[1]) )
+		propCols.append( np.where(currCols,"T","F").astype(object) if dataType=="L" else currCols )
+		propFmts.extend( [fmt if dataType=="R" else "{}"]*currCols.shape[1] )
+	commentParts.append( "Properties=" + ":".join(propNames) )
+	for key, val in frame.info.items():
+		commentParts.append( "{}={}".format(key, _getExtendedXyzValStr(val, fmt)) )
+
+	#Atom lines; formatted all at once
+	rowFmt = " ".join(propFmts) + "\n"
+	allVals = np.concatenate([np.asarray(x,dtype=object) for x in propCols], axis=1) if nAtoms>0 else list()
+	atomsStr = (rowFmt*nAtoms).format( *np.asarray(allVals).flatten().tolist() )
+	return "{}\n{}\n{}".format(nAtoms, " ".join(commentParts), atomsStr)
+
+
+def _getExtendedXyzTypeStr(vals):
+	if vals.dtype == bool:
+		return "L"
+	elif np.issubdtype(vals.dtype, np.integer):
+		return "I"
+	elif np.issubdtype(vals.dtype, np.floating):
+		return "R"
+	return "S"
+
+
+def _getExtendedXyzValStr(val, fmt):
+	if isinstance(val, (bool,np.bool_)):
+		return "T" if val else "F"
+	elif isinstance(val, (int,np.integer)):
+		return str(val)
+	elif isinstance(val, (float,np.floating)):
+		return fmt.format(val)
+	elif isinstance(val, str):
+		return "\"{}\"".format(val) if ((" " in val) or (val=="")) else val
+	return "\"{}\"".format( " ".join([_getExtendedXyzValStr(x,fmt) for x in val]) )
+
+
 def parseExtendedXyzFile_singleGeom(inpPath):
 	""" Parses the first geometry from an extended xyz file
 	
@@ -42,6 +42,67 @@ class testAttachExtraCommandToParser(unittest.TestCase):
 		self.assertEqual( testFunct, self.testClsA.extraFunctsToParseFromSingleLine[-1] )
 		self.assertEqual( testHandleDict, self.testClsA.extraHandleParsedOutputFuncts[-1] )
 
+class TestLinePatternMatcher(unittest.TestCase):
+
+	def setUp(self):
+		self.patterns = ["CELL|", "T I M I N G", "CELL| Vector"]
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		self.testObjA = tCode.LinePatternMatcher(self.patterns)
+
+	def testNoMatchForIrrelevantLine(self):
+		self.assertFalse( self.testObjA.lineMayMatch(" SCF WAVEFUNCTION OPTIMIZATION") )
+		self.assertEqual( list(), self.testObjA.getMatchingIndices(" SCF WAVEFUNCTION OPTIMIZATION") )
+
+	def testAllOverlappingPatternsFound(self):
+		self.assertEqual( [0,2], self.testObjA.getMatchingIndices(" CELL| Vector a [angstrom]: 1.0") )
+
+	def testRegexSpecialCharsTreatedLiterally(self):
+		self.assertFalse( self.testObjA.lineMayMatch("CELL") )
+
+	def testPartiallyOverlappingPatternsFound(self):
+		self.patterns = ["AB", "BC", "AB"]
+		self.createTestObjs()
+		self.assertEqual( [0,1,2], self.testObjA.getMatchingIndices("xABCx") )
+
+	def testGetMatchingHooks(self):
+		self.testObjA = tCode.LinePatternMatcher(self.patterns, hooks=["hookA","hookB","hookC"])
+		self.assertEqual( ["hookA","hookC"], self.testObjA.getMatchingHooks(" CELL| Vector a [angstrom]: 1.0") )
+		self.assertEqual( ["hookB"], self.testObjA.getMatchingHooks(" T I M I N G") )
+
+
+class TestCpoutParserHookDispatch(unittest.TestCase):
+
+	def setUp(self):
+		self.fileAsList = ["PROGRAM STARTED AT\n", "hook pattern A\n", "nothing here\n", "hook pattern A pattern B\n", "PROGRAM ENDED\n"]
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		self.parserA = tCode.CpoutFileParser()
+		tCode.getDecoToAttachSectionParserToCpoutParser("pattern A", self._parseFunctA, handleParsedDictFunct=self._handleA)(self.parserA)
+
+	def _parseFunctA(self, fileAsList, lineIdx):
+		return {"idx":lineIdx}, lineIdx+1
+
+	def _parseFunctB(self, fileAsList, lineIdx):
+		return {"idx_b":lineIdx}, lineIdx+1
+
+	def _handleA(self, instance, parsedDict):
+		instance.outDict.setdefault("all_idx", list()).append(parsedDict["idx"])
+
+	def testHookCalledOnlyForMatchingLines(self):
+		outDict = self.parserA.getOutDictFromFileAsList(self.fileAsList)
+		self.assertEqual([1,3], outDict["all_idx"])
+
+	def testHookAttachedAfterParseIsUsed(self):
+		self.parserA.getOutDictFromFileAsList(self.fileAsList)
+		tCode.getDecoToAttachSectionParserToCpoutParser("pattern B", self._parseFunctB)(self.parserA)
+		outDict = self.parserA.getOutDictFromFileAsList(self.fileAsList)
+		self.assertEqual([1,3], outDict["all_idx"])
+		self.assertEqual(3, outDict["idx_b"])
+
+
 #Tests related to parsing of the output file (e.g. outfile.cpout in cp2k.sopt -o outfile.cpout *.inp)
 class testCPoutParsing(unittest.TestCase):
 
@@ -93,6 +154,207 @@ class testCPoutParsing(unittest.TestCase):
 		actLattParams = tCode.parseCpout(self.fullFilePathB)["unitCell"].getLattParamsList()
 		[self.assertAlmostEqual(exp,act) for exp,act in itertools.zip_longest(expectedLattParams,actLattParams)]
 
+	def testStreamingModeMatchesDefault(self):
+		for filePath in [self.fullFilePathA, self.fullFilePathB]:
+			expDict = tCode.parseCpout(filePath)
+			actDict = tCode.parseCpout(filePath, streaming=True)
+			self.assertEqual( sorted(expDict.keys()), sorted(actDict.keys()) )
+			for key in ["unitCell", "energies", "numbAtoms", "multiple_geom_present", "terminate_flag_found"]:
+				self.assertEqual(expDict[key], actDict[key])
+
+	def testTrajectoryModeFinalValuesMatchDefault(self):
+		expDict = tCode.parseCpout(self.fullFilePathB)
+		actTraj = tCode.parseCpout(self.fullFilePathB, trajectory=True)["trajectory"]
+		self.assertEqual( (6,), actTraj["energy"].shape )
+		self.assertEqual( (6,3), actTraj["lattParams"].shape )
+		self.assertAlmostEqual( expDict["energy"], actTraj["energy"][-1] )
+		self.assertTrue( np.allclose(np.array(expDict["forces_final"]), actTraj["forces"][-2]) ) #No forces for the final energy evaluation
+		self.assertTrue( np.allclose(expDict["unitCell"].getLattParamsList(), actTraj["lattParams"][-1]) )
+		self.assertTrue( np.all(np.isnan(actTraj["dispersion"])) )
+
+	def testTrajectoryArraysAlignedByStep(self):
+		actTraj = tCode.parseCpout(self.fullFilePathB, trajectory=True)["trajectory"]
+		nSteps = actTraj["energy"].shape[0]
+		for key,val in actTraj.items():
+			self.assertEqual(nSteps, val.shape[0], msg="key={}".format(key))
+		self.assertFalse( np.any(np.isnan(actTraj["lattParams"])) )
+		self.assertFalse( np.any(np.isnan(actTraj["forces"][:-1])) )
+		self.assertTrue( np.all(np.isnan(actTraj["forces"][-1])) ) #Final energy evaluation has no forces printed
+
+	def testTrajectoryKeyAbsentByDefault(self):
+		self.assertTrue( "trajectory" not in tCode.parseCpout(self.fullFilePathB) )
+
+
+class TestCpoutTrajectoryCollector(unittest.TestCase):
+
+	def setUp(self):
+		self.initCapacity = 2
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		self.testObjA = tCode.CpoutTrajectoryCollector(initCapacity=self.initCapacity)
+
+	def testArraysGrowPastInitialCapacity(self):
+		expForces = np.arange(5*2*3, dtype=float).reshape(5,2,3)
+		for currForces in expForces:
+			self.testObjA.startNewStep()
+			self.testObjA.addValues("forces", currForces)
+		actForces = self.testObjA.getArrays()["forces"]
+		self.assertTrue( np.allclose(expForces, actForces) )
+
+	def testRaisesForInconsistentShape(self):
+		self.testObjA.addValues("charges", [1.0, 2.0])
+		with self.assertRaises(ValueError):
+			self.testObjA.addValues("charges", [1.0, 2.0, 3.0])
+
+	def testRowsAlignedWithStepsAndMissingValsNan(self):
+		cellA, cellB = _createFakeUnitCell(2.0), _createFakeUnitCell(3.0)
+		self.testObjA.addUnitCell(cellA)
+		for stepIdx in range(4):
+			self.testObjA.startNewStep()
+			self.testObjA.addValues("energy", stepIdx)
+			if stepIdx in [1,3]:
+				self.testObjA.addValues("charges", [stepIdx, stepIdx])
+			if stepIdx == 1:
+				self.testObjA.addUnitCell(cellB) #Should apply from the next step on
+		actArrays = self.testObjA.getArrays()
+		self.assertTrue( np.allclose([0,1,2,3], actArrays["energy"]) )
+		self.assertTrue( np.all(np.isnan(actArrays["charges"][[0,2]])) )
+		self.assertTrue( np.allclose([[1,1],[3,3]], actArrays["charges"][[1,3]]) )
+		self.assertTrue( np.allclose([2,2,3,3], actArrays["lattParams"][:,0]) )
+
+	def testResetClearsValues(self):
+		self.testObjA.addValues("energy", 2.0)
+		self.testObjA.reset()
+		self.assertEqual(dict(), self.testObjA.getArrays())
+
+
+def _createFakeUnitCell(lattParam):
+	return uCellHelp.UnitCell(lattParams=[lattParam]*3, lattAngles=[90,90,90])
+
+
+class TestStreamedLines(unittest.TestCase):
+
+	def setUp(self):
+		self.inpLines = ["line_{}\n".format(idx) for idx in range(10)]
+		self.lookAhead = 2
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		self.testObjA = tCode.StreamedLines(iter(self.inpLines), lookAhead=self.lookAhead)
+
+	def testIndexAccess(self):
+		self.assertEqual(self.inpLines[3], self.testObjA[3])
+		self.assertEqual(self.inpLines[1], self.testObjA[1])
+
+	def testLenIsLowerBoundBeforeEndOfInput(self):
+		self.testObjA[0]
+		self.assertEqual(3, len(self.testObjA))
+
+	def testLenExactAfterEndOfInput(self):
+		self.testObjA[9]
+		self.assertEqual(10, len(self.testObjA))
+
+	def testRaisesIndexErrorPastEnd(self):
+		with self.assertRaises(IndexError):
+			self.testObjA[10]
+
+	def testReleasedLinesNotAvailable(self):
+		self.testObjA[5]
+		self.testObjA.releaseLinesBefore(4)
+		self.assertEqual(self.inpLines[4], self.testObjA[4])
+		with self.assertRaises(IndexError):
+			self.testObjA[3]
+
+	def testStandardLoopReadsAllLines(self):
+		actLines, lineIdx = list(), 0
+		while lineIdx < len(self.testObjA):
+			actLines.append( self.testObjA[lineIdx] )
+			self.testObjA.releaseLinesBefore(lineIdx)
+			lineIdx += 1
+		self.assertEqual(self.inpLines, actLines)
+
+
+class TestCpoutTailParser(unittest.TestCase):
+
+	def setUp(self):
+		self.fullFileStr = _getCP2KFullFileStr_fccOpt()
+		self.nChunks = 50
+		self.tailFilePath = os.path.join( os.getcwd(), "tail_parser_test_file.cpout" )
+		self.fullFilePath = createCP2KFullFile_fccOpt()
+		self.createTestObjs()
+
+	def tearDown(self):
+		os.remove(self.tailFilePath)
+		os.remove(self.fullFilePath)
+
+	def createTestObjs(self):
+		with open(self.tailFilePath,"wt") as f:
+			pass
+		self.testObjA = tCode.CpoutTailParser(self.tailFilePath)
+
+	def _appendToTailFile(self, inpStr):
+		with open(self.tailFilePath,"at") as f:
+			f.write(inpStr)
+
+	def _getOutDictsWhenWritingInChunks(self):
+		chunkSize = len(self.fullFileStr)//self.nChunks + 1
+		outDicts = list()
+		for startIdx in range(0, len(self.fullFileStr), chunkSize):
+			self._appendToTailFile( self.fullFileStr[startIdx:startIdx+chunkSize] )
+			outDicts.append( self.testObjA.update() )
+		return outDicts
+
+	def testFinalValuesMatchFullParse(self):
+		expDict = tCode.parseCpout(self.fullFilePath)
+		actDict = self._getOutDictsWhenWritingInChunks()[-1]
+		for key in ["unitCell", "energies", "numbAtoms", "multiple_geom_present", "terminate_flag_found", "forces_final"]:
+			self.assertEqual(expDict[key], actDict[key])
+		self.assertAlmostEqual(expDict["timings"].CP2K_total, actDict["timings"].CP2K_total)
+
+	def testPartialResultsBeforeFileFinished(self):
+		allDicts = self._getOutDictsWhenWritingInChunks()
+		midDict = allDicts[len(allDicts)//2]
+		self.assertFalse( midDict["terminate_flag_found"] )
+		self.assertTrue( 0 < midDict["numb_energy_evals"] < allDicts[-1]["numb_energy_evals"] )
+		self.assertEqual(6, allDicts[-1]["numb_energy_evals"])
+
+	def testUpdateWithNoNewOutput(self):
+		expDict = self._getOutDictsWhenWritingInChunks()[-1]
+		expOffset = self.testObjA.byteOffset
+		actDict = self.testObjA.update()
+		self.assertEqual(expOffset, self.testObjA.byteOffset)
+		self.assertEqual(expDict["numb_energy_evals"], actDict["numb_energy_evals"])
+
+	def testRestartsWhenFileOverwritten(self):
+		self._getOutDictsWhenWritingInChunks()
+		with open(self.tailFilePath,"wt") as f:
+			f.write( self.fullFileStr[:len(self.fullFileStr)//2] )
+		actDict = self.testObjA.update()
+		self.assertFalse( actDict["terminate_flag_found"] )
+		self.assertTrue( actDict["numb_energy_evals"] < 6 )
+
+	def testSectionParsedOnceAfterEndMarkerWritten(self):
+		hookIdx = self.testObjA._parser.extraSingleLinePatterns.index("Core Hamiltonian energy")
+		parseFunct = mock.Mock(side_effect=self.testObjA._parser.extraFunctsToParseFromSingleLine[hookIdx])
+		self.testObjA._parser.extraFunctsToParseFromSingleLine[hookIdx] = parseFunct
+
+		self._appendToTailFile("  Core Hamiltonian energy:    0.48619741993392\n")
+		for unused in range(3):
+			self._appendToTailFile("  Hartree energy:     1.02122004110676\n")
+			self.assertEqual(0, self.testObjA.update()["numb_energy_evals"])
+		self._appendToTailFile("  Total energy:    -0.87976787980010\n\n")
+		actDict = self.testObjA.update()
+
+		self.assertEqual(1, parseFunct.call_count)
+		self.assertEqual(1, actDict["numb_energy_evals"])
+		self.assertAlmostEqual(-0.87976787980010*tCode.HART_TO_EV, actDict["energy"])
+
+	def testErrorInCompleteSectionRaised(self):
+		self._appendToTailFile("  Core Hamiltonian energy:    0.48619741993392\n  Total energy:    not_a_number\n\n")
+		with self.assertRaises(errorHelp.PlatoPylibParseFileError):
+			self.testObjA.update()
+
 
 class testMOInfoParsing(unittest.TestCase):
 
@@ -1,9 +1,12 @@
 
 import os
 import itertools as it
+import tempfile
 import unittest
 import unittest.mock as mock
 
+import numpy as np
+
 import plato_pylib.shared.ucell_class as uCellHelp
 import plato_pylib.parseOther.parse_xyz_files as tCode
 
@@ -83,5 +86,193 @@ class TestDumpExyzForSingleUnitCell(unittest.TestCase):
 		self.assertEqual(expCell,actCell)
 
 
+class TestParseXyzAsGeometry(unittest.TestCase):
+
+	def setUp(self):
+		self.fileAsListA = _loadTestFileStrA().split("\n")
+
+	def testMatchesStandardParser(self):
+		expCell = tCode._parseStandardXyzFile(self.fileAsListA)
+		actGeom = tCode._parseStandardXyzFileAsGeometry(self.fileAsListA)
+		self.assertEqual(["Mg","O","O"], actGeom.elementList)
+		self.assertTrue( np.allclose(np.array([x[:3] for x in expCell.cartCoords]), actGeom.cartCoords) )
+		self.assertEqual(expCell, actGeom.unitCell)
+
+	def testUnitCellBuiltLazily(self):
+		with mock.patch("plato_pylib.parseOther.parse_xyz_files.uCell.UnitCell") as mockedUnitCell:
+			actGeom = tCode._parseStandardXyzFileAsGeometry(self.fileAsListA)
+			mockedUnitCell.fromLattVects.assert_not_called()
+		self.assertTrue( actGeom.unitCell is actGeom.unitCell )
+
+	def testExtraColumnsIgnored(self):
+		fileAsList = ["2", "comment", "Mg 1.0 2.0 3.0 0.1 0.2", "O 4.0 5.0 6.0 0.3 0.4"]
+		actGeom = tCode._parseStandardXyzFileAsGeometry(fileAsList)
+		self.assertTrue( np.allclose([[1,2,3],[4,5,6]], actGeom.cartCoords) )
+
+	def testRaisesIfNumbAtomsDoesntEqualFirstLine(self):
+		self.fileAsListA[0] = "4"
+		with self.assertRaises(AssertionError):
+			tCode._parseStandardXyzFileAsGeometry(self.fileAsListA)
+
+
+class TestXyzTrajectoryReader(unittest.TestCase):
+
+	def setUp(self):
+		self.fileStr = "\n".join( [_getTrajFrameStr(idx) for idx in range(5)] ) + "\n\n"
+		self.tempDir = tempfile.mkdtemp(prefix=os.path.basename(__file__))
+		self.inpPath = os.path.join(self.tempDir, "traj.xyz")
+		self.persistIndex = False
+		with open(self.inpPath,"wt") as f:
+			f.write(self.fileStr)
+		self.createTestObjs()
+
+	def tearDown(self):
+		for fileName in os.listdir(self.tempDir):
+			os.remove( os.path.join(self.tempDir,fileName) )
+		os.rmdir(self.tempDir)
+
+	def createTestObjs(self):
+		self.testObjA = tCode.XyzTrajectoryReader(self.inpPath, persistIndex=self.persistIndex)
+
+	def testExpectedLen(self):
+		self.assertEqual(5, len(self.testObjA))
+
+	def testSingleFrameAccess(self):
+		expCartCoords = np.array( [[3.0, 0.0, 1.5], [0.0, 3.0, 0.5]] )
+		actFrame = self.testObjA[3]
+		self.assertEqual(["Mg","O"], actFrame.elementList)
+		self.assertTrue( np.allclose(expCartCoords, actFrame.cartCoords) )
+		self.assertEqual(" i = 3, E = -3.0", actFrame.commentLine)
+
+	def testNegativeIndexAndSlicing(self):
+		self.assertEqual( self.testObjA[4].commentLine, self.testObjA[-1].commentLine )
+		actComments = [x.commentLine for x in self.testObjA[1::2]]
+		self.assertEqual( [" i = 1, E = -1.0", " i = 3, E = -3.0"], actComments )
+
+	def testRaisesForOutOfRangeIndex(self):
+		with self.assertRaises(IndexError):
+			self.testObjA[5]
+
+	def testCartCoordsArrayStrided(self):
+		actArray = self.testObjA.getCartCoordsArray(start=0, step=2)
+		self.assertEqual( (3,2,3), actArray.shape )
+		self.assertTrue( np.allclose([4.0, 0.0, 2.0], actArray[-1][0]) )
+
+	def testIncompleteFinalFrameIgnored(self):
+		with open(self.inpPath,"at") as f:
+			f.write("2\n i = 5, E = -5.0\nMg 1.0 1.0 1.0\n")
+		self.createTestObjs()
+		self.assertEqual(5, len(self.testObjA))
+
+	def testFinalFrameCutMidNumberIgnored(self):
+		with open(self.inpPath,"at") as f:
+			f.write("2\n i = 5, E = -5.0\nMg 1.0 1.0 1.0\nO 1.0 1.0 0.")
+		self.createTestObjs()
+		self.assertEqual(5, len(self.testObjA))
+		self.assertEqual(" i = 4, E = -4.0", self.testObjA[-1].commentLine)
+
+	def testPartlyWrittenAtomCountLineIgnored(self):
+		with open(self.inpPath,"at") as f:
+			f.write("1")
+		self.createTestObjs()
+		self.assertEqual(5, len(self.testObjA))
+
+	def testNegativeStartForIterFramesAndCartCoordsArray(self):
+		actComments = [x.commentLine for x in self.testObjA.iterFrames(start=-2)]
+		self.assertEqual( [" i = 3, E = -3.0", " i = 4, E = -4.0"], actComments )
+		actArray = self.testObjA.getCartCoordsArray(start=-2)
+		self.assertEqual( (2,2,3), actArray.shape )
+		self.assertTrue( np.allclose([4.0, 0.0, 2.0], actArray[-1][0]) )
+
+	def testUnitCellMatchesStandardParser(self):
+		expCell = tCode._parseStandardXyzFile( _getTrajFrameStr(2).split("\n") )
+		actCell = self.testObjA.getUnitCell(2)
+		self.assertEqual(expCell, actCell)
+
+	def testPersistedIndexReusedUntilFileChanges(self):
+		self.persistIndex = True
+		self.createTestObjs()
+		self.assertTrue( os.path.exists(self.testObjA.indexPath) )
+		with mock.patch("plato_pylib.parseOther.parse_xyz_files._getXyzFrameByteOffsets") as mockedIndexer:
+			self.createTestObjs()
+			mockedIndexer.assert_not_called()
+		self.assertEqual(5, len(self.testObjA))
+
+		with open(self.inpPath,"at") as f:
+			f.write( _getTrajFrameStr(5) + "\n" )
+		self.createTestObjs()
+		self.assertEqual(6, len(self.testObjA))
+
+
+class TestExtendedXyzMultiFrame(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp(prefix=os.path.basename(__file__))
+		self.outPath = os.path.join(self.tempDir, "traj.exyz")
+		self.nFrames = 3
+		self.createTestObjs()
+
+	def tearDown(self):
+		for fileName in os.listdir(self.tempDir):
+			os.remove( os.path.join(self.tempDir,fileName) )
+		os.rmdir(self.tempDir)
+
+	def createTestObjs(self):
+		self.framesA = list()
+		for idx in range(self.nFrames):
+			cartCoords = np.array( [[0.0, 0.0, 0.1*idx], [1.0, 1.5, 2.0]] )
+			atomProps = {"forces":np.array([[0.1, 0.2, 0.3], [-0.1, -0.2, -0.3]])*idx, "charges":np.array([0.5, -0.5])}
+			info = {"energy":-2.5*idx, "step":idx}
+			self.framesA.append( tCode.XyzGeometry(["Mg","O"], cartCoords, lattVects=[[4,0,0],[0,5,0],[0,0,6]], info=info, atomProps=atomProps) )
+
+	def _dumpAndParse(self):
+		tCode.dumpExtendedXyzFile(self.outPath, self.framesA)
+		return tCode.parseExtendedXyzFile(self.outPath)
+
+	def testDumpAndParseConsistent(self):
+		actFrames = self._dumpAndParse()
+		self.assertEqual( len(self.framesA), len(actFrames) )
+		for expFrame, actFrame in zip(self.framesA, actFrames):
+			self.assertEqual(expFrame.elementList, actFrame.elementList)
+			self.assertTrue( np.allclose(expFrame.cartCoords, actFrame.cartCoords) )
+			self.assertTrue( np.allclose(expFrame.lattVects, actFrame.lattVects) )
+			self.assertEqual( sorted(expFrame.atomProps.keys()), sorted(actFrame.atomProps.keys()) )
+			for key in expFrame.atomProps.keys():
+				self.assertTrue( np.allclose(expFrame.atomProps[key], actFrame.atomProps[key]) )
+			self.assertEqual(expFrame.info["step"], actFrame.info["step"])
+			self.assertAlmostEqual(expFrame.info["energy"], actFrame.info["energy"])
+
+	def testReadsSingleGeomFileWrittenByOldWriter(self):
+		expCell = uCellHelp.UnitCell(lattParams=[10,11,12], lattAngles=[90,90,90])
+		expCell.cartCoords = [ [0,1,1,"X"], [0,2,3,"Y"] ]
+		tCode.dumpExtendedXyzFile_singleGeom(self.outPath, expCell)
+		actFrames = tCode.parseExtendedXyzFile(self.outPath)
+		self.assertEqual(1, len(actFrames))
+		self.assertEqual(expCell, actFrames[0].unitCell)
+
+	def testUnitCellsCanBeWritten(self):
+		expCell = self.framesA[1].unitCell
+		tCode.dumpExtendedXyzFile(self.outPath, [expCell])
+		actCell = tCode.parseExtendedXyzFile(self.outPath)[0].unitCell
+		self.assertEqual(expCell, actCell)
+
+	def testCommentLineKeyValsParsed(self):
+		commentLine = 'Lattice="1 0 0 0 2 0 0 0 3" Properties=species:S:1:pos:R:3 energy=-1.5 step=3 pbc="T T F" label="two words" isFinal'
+		actDict = tCode._parseExtendedXyzKeyVals(commentLine)
+		expDict = {"Lattice":[1,0,0,0,2,0,0,0,3], "Properties":"species:S:1:pos:R:3", "energy":-1.5, "step":3,
+		           "pbc":[True,True,False], "label":"two words", "isFinal":True}
+		self.assertEqual(expDict, actDict)
+
+	def testRaisesForTruncatedFrame(self):
+		tCode.dumpExtendedXyzFile(self.outPath, self.framesA)
+		with open(self.outPath,"rt") as f:
+			fileAsList = f.readlines()
+		with open(self.outPath,"wt") as f:
+			f.write( "".join(fileAsList[:-1]) )
+		with self.assertRaises(ValueError):
+			tCode.parseExtendedXyzFile(self.outPath)
+
 
+def _getTrajFrameStr(frameIdx):
+	return "2\n i = {0}, E = -{0}.0\nMg {1} 0.0 {2}\nO 0.0 {1} 0.5".format(frameIdx, float(frameIdx), 0.5*frameIdx)
 
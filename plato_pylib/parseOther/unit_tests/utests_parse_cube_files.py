@@ -1,5 +1,8 @@
 
 
+import os
+import shutil
+import tempfile
 import unittest
 import unittest.mock as mock
 
@@ -50,6 +53,26 @@ class TestParseCubeFiles(unittest.TestCase):
 		mockReadFileIntoList.assert_called_with(self.inpPath)
 		self._checkExpAndActDictMatch(expDict, actDict)
 
+	@mock.patch("plato_pylib.parseOther.parse_cube_files._readFileIntoList")
+	def testDataGridIsArrayByDefault(self, mockReadFileIntoList):
+		mockReadFileIntoList.side_effect = lambda *args,**kwargs: self.fileAsListA
+		actGrid = self._runTestFunct()["data_grid"]
+		self.assertTrue( isinstance(actGrid,np.ndarray) )
+		self.assertEqual( (2,2,3), actGrid.shape )
+
+	@mock.patch("plato_pylib.parseOther.parse_cube_files._readFileIntoList")
+	def testDataGridAsListCompatFlag(self, mockReadFileIntoList):
+		mockReadFileIntoList.side_effect = lambda *args,**kwargs: self.fileAsListA
+		expGrid = self._loadExpDictA()["data_grid"]
+		actGrid = tCode.parseCubeFile(self.inpPath, dataGridAsList=True)["data_grid"]
+		self.assertTrue( isinstance(actGrid,list) )
+		self.assertTrue( np.allclose(np.array(expGrid), np.array(actGrid)) )
+
+	@mock.patch("plato_pylib.parseOther.parse_cube_files._readFileIntoList")
+	def testRaisesForWrongNumberOfGridValues(self, mockReadFileIntoList):
+		mockReadFileIntoList.side_effect = lambda *args,**kwargs: self.fileAsListA[:-1]
+		with self.assertRaises(ValueError):
+			self._runTestFunct()
 
 	def _checkExpAndActDictMatch(self, expDict, actDict):
 		directCmpAttrs = ["header_a", "header_b", "n_atoms", "n_x", "n_y", "n_z", "atomic_numbers"]
@@ -68,6 +91,121 @@ class TestParseCubeFiles(unittest.TestCase):
 
 
 
+class TestCubeGridCache(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp(prefix=os.path.basename(__file__))
+		self.cubePath = os.path.join(self.tempDir, "test_file.cube")
+		self.planeAxis = 2
+		with open(self.cubePath,"wt") as f:
+			f.write( "\n".join(_loadFileAsListA()) + "\n" )
+		self.createTestObjs()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def createTestObjs(self):
+		self.expDict = tCode.parseCubeFile(self.cubePath)
+		self.cachePrefix = os.path.join(self.tempDir, "test_cache")
+
+	def _writeAndOpen(self):
+		tCode.writeCubeGridCache(self.expDict, self.cachePrefix, planeAxis=self.planeAxis)
+		return tCode.openCubeGridCache(self.cachePrefix)
+
+	def testHeaderAndGridConsistent(self):
+		actObj = self._writeAndOpen()
+		for key in ["n_x", "n_y", "n_z", "atomic_numbers", "header_a"]:
+			self.assertEqual(self.expDict[key], actObj.header[key])
+		self.assertTrue( isinstance(actObj.grid, np.memmap) or isinstance(actObj.grid.base, np.memmap) )
+		self.assertTrue( np.allclose(self.expDict["data_grid"], actObj.grid) )
+
+	def testPlanesAndSlabsForAllStorageAxes(self):
+		expGrid = self.expDict["data_grid"]
+		for planeAxis in range(3):
+			self.planeAxis = planeAxis
+			actObj = self._writeAndOpen()
+			self.assertTrue( np.allclose(expGrid[:,:,1], actObj.getZPlane(1)) )
+			self.assertTrue( np.allclose(expGrid[1,:,:], actObj.getPlane(0,1)) )
+			self.assertTrue( np.allclose(expGrid[:,:,1:3], actObj.getSlab(2,1,3)) )
+			self.assertTrue( np.allclose(expGrid[0:1,1:2,0:2], actObj.getSubBlock((0,1),(1,2),(0,2))) )
+			self.assertTrue( np.allclose(expGrid[1,0,:], actObj.getLineProfile(2,1,0)) )
+
+	def testPlaneAlongStorageAxisIsContiguousOnDisk(self):
+		actObj = self._writeAndOpen()
+		self.assertTrue( actObj._diskGrid[1].flags["C_CONTIGUOUS"] )
+		self.assertTrue( np.allclose(self.expDict["data_grid"][:,:,1], actObj._diskGrid[1]) )
+
+	def testCacheOnlyWrittenOnce(self):
+		tCode.parseCubeFileWithCache(self.cubePath, cachePrefix=self.cachePrefix)
+		with mock.patch("plato_pylib.parseOther.parse_cube_files.parseCubeFile") as mockedParser:
+			actObj = tCode.parseCubeFileWithCache(self.cubePath, cachePrefix=self.cachePrefix)
+			mockedParser.assert_not_called()
+		self.assertTrue( np.allclose(self.expDict["data_grid"], actObj.grid) )
+
+
+class TestWriteCubeFile(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp(prefix=os.path.basename(__file__))
+		self.inpPath = os.path.join(self.tempDir, "inp_file.cube")
+		self.outPath = os.path.join(self.tempDir, "out_file.cube")
+		self.chunkSize = 2**18
+		with open(self.inpPath,"wt") as f:
+			f.write( "\n".join(_loadFileAsListA()) + "\n" )
+		self.createTestObjs()
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def createTestObjs(self):
+		self.expDict = tCode.parseCubeFile(self.inpPath)
+
+	def _runTestFunct(self, cubeData=None, dataGrid=None):
+		cubeData = self.expDict if cubeData is None else cubeData
+		tCode.writeCubeFile(self.outPath, cubeData, dataGrid=dataGrid, chunkSize=self.chunkSize)
+		return tCode.parseCubeFile(self.outPath)
+
+	def _checkHeadersMatch(self, expDict, actDict):
+		for key in ["header_a", "header_b", "n_atoms", "n_x", "n_y", "n_z", "atomic_numbers"]:
+			self.assertEqual(expDict[key], actDict[key])
+		for key in ["origin", "step_x", "step_y", "step_z", "atomic_coords", "atomic_charges"]:
+			self.assertTrue( np.allclose(expDict[key], actDict[key]) )
+
+	def testRoundTrip(self):
+		actDict = self._runTestFunct()
+		self._checkHeadersMatch(self.expDict, actDict)
+		self.assertTrue( np.allclose(self.expDict["data_grid"], actDict["data_grid"]) )
+
+	def testRoundTripWithSmallChunks(self):
+		self.chunkSize = 1
+		actDict = self._runTestFunct()
+		self.assertTrue( np.allclose(self.expDict["data_grid"], actDict["data_grid"]) )
+
+	def testSixValuesPerLineAndNewLineAfterEachZRow(self):
+		nZ = 8
+		headerDict = {k:v for k,v in self.expDict.items() if k!="data_grid"}
+		tCode.writeCubeFile(self.outPath, headerDict, dataGrid=np.ones((2,3,nZ)))
+		with open(self.outPath,"rt") as f:
+			gridLines = f.readlines()[6+self.expDict["n_atoms"]:]
+		expNumbVals = [6,2]*(2*3)
+		actNumbVals = [len(x.split()) for x in gridLines]
+		self.assertEqual(expNumbVals, actNumbVals)
+
+	def testHeaderPlusDifferentGrid(self):
+		headerDict = {k:v for k,v in self.expDict.items() if k!="data_grid"}
+		expGrid = -2*np.array(self.expDict["data_grid"])
+		actDict = self._runTestFunct(cubeData=headerDict, dataGrid=expGrid)
+		self._checkHeadersMatch(self.expDict, actDict)
+		self.assertTrue( np.allclose(expGrid, actDict["data_grid"]) )
+
+	def testFromMemmappedGrid(self):
+		cachePrefix = os.path.join(self.tempDir, "test_cache")
+		tCode.writeCubeGridCache(self.expDict, cachePrefix, planeAxis=0)
+		actDict = self._runTestFunct(cubeData=tCode.openCubeGridCache(cachePrefix))
+		self._checkHeadersMatch(self.expDict, actDict)
+		self.assertTrue( np.allclose(self.expDict["data_grid"], actDict["data_grid"]) )
+
+
 #NOTE: Im not 100% sure on the newlines in the grid data. But read-only implementations shouldnt care about that particularly
 def _loadFileAsListA():
 	outList = list()
@@ -69,11 +69,10 @@ class InvSKAllData:
 		if bondType is not None:
 			valType = self._modValTypeBasedOnBondType(valType,bondType)
 
-		orbIdStrFormat = "{} {}" #used to find instances with same shells/ang mom involved
-		orbIdStr = orbIdStrFormat.format(int(shellA),int(shellB))
+		#Compare shell indices directly (rather than via formatted strings); nothing is cached, so changes to self.invSKObjs are always picked up
+		orbPair = ( int(shellA),int(shellB) )
 		for obj in self.invSKObjs:
-			idStr = obj.getOrbRepStr(fmt=orbIdStrFormat)
-			if idStr==orbIdStr:
+			if (obj.shellA,obj.shellB) == orbPair:
 				rVsValType.append(   (obj.dist,obj.__getattribute__(valType))   )
 		return rVsValType
 
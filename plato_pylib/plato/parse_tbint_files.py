@@ -2,11 +2,15 @@
 
 '''Purpose of these functions are to help parse the *.adt/*.bdt etc. that come from tbint'''
 
+import glob
 import itertools
+import json
 import os
 import re
+import uuid
 
 import numpy as np
+import scipy.interpolate
 
 from .parse_bas_files import parseBasFile
 
@@ -72,23 +76,46 @@ def getFormatTypeBdtFile(inpBdtPath):
 		raise ValueError("{} is neither format_3 or format_4 type of *.bdt file".format(inpBdtPath))
 
 
-def parseBdtForm4(inpBdtFile: str):
-
-	with open(inpBdtFile) as f:
-		fileAsStr = f.read()
-
+def parseBdtForm4(inpBdtFile: str, intTypes=None):
+	""" Parse a format 4 *.bdt file. The file is read once, and a single pass builds an index of where each integral section starts; tables are then parsed straight from those positions
+	
+	Args:
+		inpBdtFile: (str) Path to the *.bdt file
+		intTypes: (Optional, iter of str) Integral types to parse (keys of the output dict, case-insensitive) e.g. ["hopping","overlap"]. Default is to parse all types
+			 
+	Returns
+		outDict: (dict) Keys are integral types (e.g. "hopping"); values are lists of TbintIntegrals objects (or None if not in the file). If intTypes is set, only those keys are present
+ 
+	"""
 	with open(inpBdtFile) as f:
 		fileAsList = f.readlines()
 
-	if fileAsStr.find('format_4') == -1:
+	if not any(['format_4' in x for x in fileAsList]):
 		raise ValueError("File {} is not a format4 bdt file".format(inpBdtFile))
 
 	#Remove comment lines
 	fileAsList = [x for x in fileAsList if not x.startswith('#')]
 
+	#Figure out which sections we need (xc crystal field is derived from the total and non-xc parts)
+	if intTypes is None:
+		outKeys = [BDT_KEYS_TO_PARSER_KEYS[key] for key in BDT_FORM4_INT_TYPES]
+	else:
+		outKeys = list()
+		for intType in intTypes:
+			try:
+				outKeys.append( BDT_KEYS_TO_PARSER_KEYS[ PARSER_TO_BDT_KEYS[intType.lower()] ] )
+			except KeyError:
+				raise ValueError("{} is not a valid integral type".format(intType))
+	parseKeys = [BDT_KEYS_TO_PARSER_KEYS[key] for key in BDT_FORM4_INT_TYPES if BDT_KEYS_TO_PARSER_KEYS[key] in outKeys]
+	if "crystalFieldXc" in outKeys:
+		parseKeys.extend( [x for x in ["crystalFieldNonXc", "crystalFieldTotal"] if x not in parseKeys] )
+
+	sectionIdxs = _getBdtForm4SectionIndex(fileAsList)
 	outDict = dict()
-	for key in BDT_FORM4_INT_TYPES:
-		outDict[BDT_KEYS_TO_PARSER_KEYS[key]] = parseIntegralSetInBdtFormat4(key, fileAsList, BDT_FORM4_INT_TYPES[key])
+	for key in parseKeys:
+		bdtKey = PARSER_TO_BDT_KEYS[key.lower()]
+		startIdx = sectionIdxs.get(bdtKey, None)
+		outDict[key] = None if startIdx is None else _parseIntegralSetFromStartIdxBdtFormat4(fileAsList, startIdx, BDT_FORM4_INT_TYPES[bdtKey])
 
 	#Add the pathname and atom names to each
 	atomA, atomB = getAtomNamesFromInpBdtFile(inpBdtFile)
@@ -100,33 +127,43 @@ def parseBdtForm4(inpBdtFile: str):
 				val.inpFilePath = inpBdtFile
 
 	#Subtract non-xc xtal field from total to get the xc contribution
-	if (outDict["crystalFieldNonXc"] is not None) and (outDict["crystalFieldTotal"] is not None):
+	if (outDict.get("crystalFieldNonXc") is not None) and (outDict.get("crystalFieldTotal") is not None):
 		xcXtal = list()
 		for totXtal, vnaXtal in itertools.zip_longest( outDict["crystalFieldTotal"], outDict["crystalFieldNonXc"]):
 			xcXtal.append( comboSimilarIntegrals(totXtal, vnaXtal, "sub") )
 		outDict["crystalFieldXc"] = xcXtal
 
-	return outDict
+	return {k:v for k,v in outDict.items() if k in outKeys}
 
 
+def _getBdtForm4SectionIndex(fileAsList:list):
+	""" Get a dict mapping each keyword in BDT_FORM4_INT_TYPES to the index of the line it is on; found in a single pass over fileAsList. Raises ValueError if a keyword is present more than once """
+	regExp = re.compile( r'\b(' + "|".join(BDT_FORM4_INT_TYPES.keys()) + r')\b' )
+	outDict = dict()
+	for idx,currLine in enumerate(fileAsList):
+		for key in set(regExp.findall(currLine.lower())):
+			if key in outDict:
+				raise ValueError("keyword {} found more than once in bdt file".format(key))
+			outDict[key] = idx
+	return outDict
+
 
 def parseIntegralSetInBdtFormat4(key:str, fileAsList:list, orbType:str):
 	#Figure out starting Position for these integrals
 	regExp = re.compile( r'\b' + key.lower() + r'\b')
 	startIdx = [idx for idx,currLine in enumerate(fileAsList) if re.search(regExp,currLine.lower())]
 
-#	startIdx = [idx for idx,currLine in enumerate(fileAsList) if key.lower() in currLine.lower()]
-
-
-
-
 	if len(startIdx) == 0:
 		return None #Integrals not found in this case
 	elif len(startIdx) > 1:
-		raise ValueError("keyword {} found more than once in bdt file", key)
-	print("The value of key = {}".format(key))
+		raise ValueError("keyword {} found more than once in bdt file".format(key))
+
+	return _parseIntegralSetFromStartIdxBdtFormat4(fileAsList, int(startIdx[0]), orbType)
+
+
+def _parseIntegralSetFromStartIdxBdtFormat4(fileAsList:list, startIdx:int, orbType:str):
 	#Figure out how mnay tables we need
-	currPos = int(startIdx[0])
+	currPos = startIdx
 	nTables = int(fileAsList[currPos + 1].strip().split()[0])
 	if nTables == 0:
 		return None
@@ -390,6 +427,23 @@ def parseAtomBasedIntegrals(inpFileList, currLineIdx):
 
 def parseNextIntegralSet(inpFileList, currLineIdx, numbPoints):
 	numbCols = len( inpFileList[currLineIdx].strip().split() )
+	endLineIdx = currLineIdx + numbPoints
+
+	#Convert the whole block in one call; only fall back to the value-by-value parse for ragged/malformed blocks. Every row length is checked
+	#(rather than just the total number of values) so a ragged block cant be silently reshaped into the wrong rows
+	intLines = inpFileList[currLineIdx:endLineIdx]
+	if (len(intLines) == numbPoints) and all([len(x.split())==numbCols for x in intLines]):
+		try:
+			intVals = np.fromstring(" ".join(intLines), sep=" ")
+		except ValueError:
+			intVals = np.array(list())
+		if intVals.size == numbPoints*numbCols:
+			return intVals.reshape(numbPoints,numbCols), endLineIdx
+
+	return _parseNextIntegralSetByValue(inpFileList, currLineIdx, numbPoints, numbCols)
+
+
+def _parseNextIntegralSetByValue(inpFileList, currLineIdx, numbPoints, numbCols):
 	intSet = np.ones(( numbPoints,numbCols )) * np.nan
 
 	for currRow in range(numbPoints):
@@ -408,6 +462,193 @@ def getBdtRcut(tbintFilePath):
 	return rcutAB
 
 
+#----------------------------------These functions deal with whole model directories------------------#
+
+_TBINT_INT_ATTRS = ["inpFilePath", "shellA", "shellB", "angMomA", "angMomB", "orbSubIdx", "atomAName", "atomBName", "intType"]
+
+def parseTbintModelDir(modelDir:str, inclPP=True):
+	""" Parse all files in a tbint model directory, reading model.dat and each *.adt/*.bas file only once (rather than once per *.bdt file as happens with getIntegralsFromBdt)
+	
+	Args:
+		modelDir: (str) Path to the directory
+		inclPP: (Bool) Passed to the format 3 *.bdt parser (see getIntegralsFromBdt); if True the non-local pseudopotential integrals are parsed, which needs the relevant *.bas files
+			 
+	Returns
+		modelDict: (dict) Keys are "modelParams" (parseModelFile output, or None if no model.dat), "adtInfo" (keys are element names, values are parseAdtFile output) and "integrals" (keys are bdt file names minus extension, e.g. "Mg_Mg"; values are the getIntegralsFromBdt output)
+ 
+	"""
+	modelDir = os.path.abspath(modelDir)
+	modelFilePath = os.path.join(modelDir, "model.dat")
+	modelParams = parseModelFile(modelFilePath) if os.path.exists(modelFilePath) else None
+
+	adtInfo = dict()
+	for adtPath in sorted( glob.glob(os.path.join(modelDir,"*.adt")) ):
+		adtInfo[ os.path.splitext(os.path.basename(adtPath))[0] ] = parseAdtFile(adtPath)
+
+	nlPPInfo, allIntegrals = dict(), dict()
+	for bdtPath in sorted( glob.glob(os.path.join(modelDir,"*.bdt")) ):
+		bdtKey = os.path.splitext(os.path.basename(bdtPath))[0]
+		if getFormatTypeBdtFile(bdtPath) == 4:
+			allIntegrals[bdtKey] = parseBdtForm4(bdtPath)
+			continue
+		atomA, atomB = getAtomNamesFromInpBdtFile(bdtPath)
+		if inclPP and (atomB not in nlPPInfo):
+			nlPPInfo[atomB] = parseBasFile( os.path.join(modelDir, atomB + ".bas") )["nlPP"]
+		allIntegrals[bdtKey] = parseBdtFile(bdtPath, adtInfo[atomA]["shellToAngMom"], adtInfo[atomB]["shellToAngMom"], modelParams,
+		                                    nlPPInfo=nlPPInfo.get(atomB, None))
+
+	return {"modelParams":modelParams, "adtInfo":adtInfo, "integrals":allIntegrals}
+
+
+def writeTbintModelCache(modelDict:dict, cachePrefix:str, sourceStamps=None, inclPP=True):
+	""" Write the output of parseTbintModelDir to a binary cache; all integral tables are stored in one array (cachePrefix + ".<unique token>.npy") with everything else in a manifest (cachePrefix + ".json") which names the array file. Re-open with openTbintModelCache
+	
+	Args:
+		modelDict: (dict) Output from parseTbintModelDir
+		cachePrefix: (str) Path to write the cache files to, minus the extensions
+		sourceStamps: (Optional, dict) Keys are file names, values are modification times (ns); used by parseTbintModelDirWithCache to check if the cache is out of date
+		inclPP: (Bool) The value used for parseTbintModelDir; stored so caches made with different values are not mixed up
+ 
+	"""
+	allArrays, intsManifest = list(), dict()
+	currOffset = 0
+	for bdtKey, bdtInts in modelDict["integrals"].items():
+		intsManifest[bdtKey] = dict()
+		for intType, intList in bdtInts.items():
+			if intList is None:
+				intsManifest[bdtKey][intType] = None
+				continue
+			intsManifest[bdtKey][intType] = list()
+			for intObj in intList:
+				currArray = np.asarray(intObj.integrals, dtype=float)
+				currEntry = {attr:getattr(intObj,attr) for attr in _TBINT_INT_ATTRS}
+				currEntry["offset"], currEntry["shape"] = currOffset, list(currArray.shape)
+				intsManifest[bdtKey][intType].append(currEntry)
+				allArrays.append(currArray.flatten())
+				currOffset += currArray.size
+
+	adtInfo = dict()
+	for key,val in modelDict["adtInfo"].items():
+		adtInfo[key] = dict(val)
+		adtInfo[key]["shellToAngMom"] = sorted( val["shellToAngMom"].items() ) #json would convert the int keys to str
+	#Each write uses a new array file, so an existing manifest always describes the array file it names
+	arrayFileName = os.path.basename(cachePrefix) + ".{}.npy".format(uuid.uuid4().hex)
+	manifest = {"modelParams":modelDict["modelParams"], "adtInfo":adtInfo, "integrals":intsManifest,
+	            "sourceStamps":sourceStamps, "inclPP":inclPP, "arrayFile":arrayFileName}
+
+	try:
+		oldArrayPath = _getTbintModelCacheArrayPath( cachePrefix, _loadTbintModelCacheManifest(cachePrefix) )
+	except (OSError, ValueError):
+		oldArrayPath = None
+
+	#Renaming the manifest into place is the only step which changes the cache seen by readers
+	allVals = np.concatenate(allArrays) if len(allArrays)>0 else np.zeros(0)
+	tempPaths = [_getTbintModelCacheArrayPath(cachePrefix, manifest), cachePrefix + ".json.tmp"]
+	try:
+		with open(tempPaths[0], "wb") as f:
+			np.save(f, allVals)
+		with open(tempPaths[1], "wt") as f:
+			json.dump(manifest, f)
+		os.replace(tempPaths[1], cachePrefix + ".json")
+	except BaseException:
+		for tempPath in tempPaths:
+			if os.path.exists(tempPath):
+				os.remove(tempPath)
+		raise
+
+	#Old array may still be open elsewhere (e.g. memory-mapped on windows); its fine to leave it behind in that case
+	if (oldArrayPath is not None) and os.path.exists(oldArrayPath):
+		try:
+			os.remove(oldArrayPath)
+		except OSError:
+			pass
+
+
+def openTbintModelCache(cachePrefix:str):
+	""" Open a cache written by writeTbintModelCache. The integral arrays are memory-mapped (copy-on-write, so modifying them never changes the cache)
+	
+	Args:
+		cachePrefix: (str) Path to the cache files, minus the extensions
+			 
+	Returns
+		modelDict: (dict) Same format as parseTbintModelDir output
+ 
+	"""
+	manifest = _loadTbintModelCacheManifest(cachePrefix)
+	allVals = np.load(_getTbintModelCacheArrayPath(cachePrefix, manifest), mmap_mode="c")
+
+	allIntegrals = dict()
+	for bdtKey, bdtInts in manifest["integrals"].items():
+		allIntegrals[bdtKey] = dict()
+		for intType, intList in bdtInts.items():
+			if intList is None:
+				allIntegrals[bdtKey][intType] = None
+				continue
+			allIntegrals[bdtKey][intType] = list()
+			for currEntry in intList:
+				nVals = int(np.prod(currEntry["shape"]))
+				currArray = allVals[currEntry["offset"]:currEntry["offset"]+nVals].reshape(currEntry["shape"])
+				currKwargs = {attr:currEntry[attr] for attr in _TBINT_INT_ATTRS}
+				allIntegrals[bdtKey][intType].append( TbintIntegrals(integrals=currArray, **currKwargs) )
+
+	adtInfo = dict()
+	for key,val in manifest["adtInfo"].items():
+		adtInfo[key] = dict(val)
+		adtInfo[key]["shellToAngMom"] = {k:v for k,v in val["shellToAngMom"]}
+
+	return {"modelParams":manifest["modelParams"], "adtInfo":adtInfo, "integrals":allIntegrals}
+
+
+def parseTbintModelDirWithCache(modelDir:str, cachePrefix=None, inclPP=True):
+	""" Get parseTbintModelDir output, loaded from the binary cache if it is up to date; else the directory is parsed and the cache (re)written. The cache is out of date if any model.dat/*.adt/*.bdt/*.bas file was added, removed or modified since it was written
+	
+	Args:
+		modelDir: (str) Path to the directory
+		cachePrefix: (Optional, str) Path for the cache files, minus extensions. Default is os.path.join(modelDir, "tbint_model_cache")
+		inclPP: (Bool) See parseTbintModelDir
+			 
+	Returns
+		modelDict: (dict) Same format as parseTbintModelDir output, with memory-mapped integral arrays
+ 
+	"""
+	cachePrefix = os.path.join(modelDir, "tbint_model_cache") if cachePrefix is None else cachePrefix
+	sourceStamps = _getTbintModelDirSourceStamps(modelDir)
+	try:
+		manifest = _loadTbintModelCacheManifest(cachePrefix)
+	except (OSError, ValueError):
+		manifest = None
+
+	cacheValid = (manifest is not None) and (manifest.get("sourceStamps")==sourceStamps) and (manifest.get("inclPP")==inclPP)
+	if cacheValid:
+		try:
+			return openTbintModelCache(cachePrefix)
+		except (OSError, ValueError):
+			pass
+
+	writeTbintModelCache( parseTbintModelDir(modelDir, inclPP=inclPP), cachePrefix, sourceStamps=sourceStamps, inclPP=inclPP )
+	return openTbintModelCache(cachePrefix)
+
+
+def _getTbintModelDirSourceStamps(modelDir):
+	outDict = dict()
+	for fileName in sorted(os.listdir(modelDir)):
+		if (fileName == "model.dat") or (os.path.splitext(fileName)[1] in [".adt", ".bdt", ".bas"]):
+			outDict[fileName] = os.stat( os.path.join(modelDir,fileName) ).st_mtime_ns
+	return outDict
+
+
+def _getTbintModelCacheArrayPath(cachePrefix, manifest):
+	""" Array file paths are stored relative to the cache directory, so the directory can be moved """
+	if manifest.get("arrayFile") is None:
+		raise ValueError("Manifest for tbint model cache {} doesnt name an array file".format(cachePrefix))
+	return os.path.join( os.path.dirname(cachePrefix), manifest["arrayFile"] )
+
+
+def _loadTbintModelCacheManifest(cachePrefix):
+	with open(cachePrefix + ".json", "rt") as f:
+		return json.load(f)
+
+
 #----------------------------------These functions write out relevant files------------------#
 
 #allInts is in the format output by the parsers
@@ -620,6 +861,26 @@ class TbintIntegrals:
 		return all(truthVals)
 
 
+	def evalAtDists(self, dists, deriv=0):
+		""" Evaluate the integrals at arbitrary distances using a cubic spline through the tabulated values. The spline coefficients are calculated on first use and reused until self.integrals changes
+		
+		Args:
+			dists: (float or iter of floats) Distances to evaluate the integrals at
+			deriv: (int) 0 to get values, 1 to get first derivatives (d/dr)
+				 
+		Returns
+			outVals: (array, same shape as dists) Interpolated values; these are zero for distances outside the tabulated range
+	 
+		"""
+		return _evalSplineAtDists(self._getSpline(), dists, deriv)
+
+	def _getSpline(self):
+		splineCache = getattr(self, "_splineCache", None)
+		if (splineCache is None) or (not np.array_equal(splineCache[0], self.integrals)):
+			intVals = np.array(self.integrals, dtype=float)
+			self._splineCache = (intVals, scipy.interpolate.CubicSpline(intVals[:,0], intVals[:,1]))
+		return self._splineCache[1]
+
 	# FORMAT 3 FILES ONLY AT THE MOMENT
 	def replaceIntsTbintFile(self, tbIntFile=None):
 		if tbIntFile is None:
@@ -692,6 +953,283 @@ class TbintIntegrals:
 
 
 
+class TbintIntegralsIndex():
+	""" Container for a set of TbintIntegrals (e.g. everything parsed from one *.bdt file), keyed on (intType, shellA, shellB, orbSubIdx) for constant-time lookup. intType is case-insensitive; atom-based integrals (e.g. pairPot) have shellA=shellB=None and orbSubIdx=1
+
+	Example:
+		intIndex = TbintIntegralsIndex.fromIntegralsDict( getIntegralsFromBdt("Mg_Mg.bdt") )
+		ppPiHop = intIndex.getIntegrals("hopping", 1, 1, orbSubIdx=2)
+		dists, hopVals, hopKeys = intIndex.getStackedIntegrals(intType="hopping")
+
+	"""
+	def __init__(self, intObjs=None):
+		""" Initializer
+		
+		Args:
+			intObjs: (Optional, iter of TbintIntegrals) Integrals to add; each needs its intType attribute set
+	 
+		"""
+		self._intDict = dict()
+		intObjs = list() if intObjs is None else intObjs
+		for intObj in intObjs:
+			self.addIntegrals(intObj)
+
+	@classmethod
+	def fromIntegralsDict(cls, intsDict:dict):
+		""" Create from a dict such as getIntegralsFromBdt output (keys are intType, values are lists of TbintIntegrals or None) """
+		outObj = cls()
+		for intType, intList in intsDict.items():
+			if intList is not None:
+				for intObj in intList:
+					outObj.addIntegrals(intObj, intType=intType)
+		return outObj
+
+	@staticmethod
+	def getKey(intType, shellA=None, shellB=None, orbSubIdx=1):
+		return (intType.lower(), shellA, shellB, orbSubIdx)
+
+	def addIntegrals(self, intObj, intType=None):
+		""" Add a TbintIntegrals object. intType defaults to intObj.intType; a ValueError is raised if that is None or the key is already present """
+		intType = intObj.intType if intType is None else intType
+		if intType is None:
+			raise ValueError("intType needs to be set to add integrals to a TbintIntegralsIndex")
+		key = self.getKey(intType, intObj.shellA, intObj.shellB, intObj.orbSubIdx)
+		if key in self._intDict:
+			raise ValueError("Integrals with key {} are already present".format(key))
+		self._intDict[key] = intObj
+
+	def getIntegrals(self, intType, shellA=None, shellB=None, orbSubIdx=1):
+		""" Get the TbintIntegrals object for a channel; raises KeyError if not present """
+		return self._intDict[ self.getKey(intType, shellA, shellB, orbSubIdx) ]
+
+	def keys(self, intType=None):
+		""" Set-like view of (intType, shellA, shellB, orbSubIdx) keys present, in the order added; optionally only those with a given intType """
+		if intType is None:
+			return self._intDict.keys()
+		return {k:None for k in self._intDict if k[0]==intType.lower()}.keys()
+
+	def getStackedIntegrals(self, keys=None, intType=None):
+		""" Stack the integral values for a set of channels into one contiguous array. All channels must share the same distance grid (else ValueError)
+		
+		Args:
+			keys: (Optional, iter) Keys of the channels to stack. Default is all channels (of intType, if set)
+			intType: (Optional, str) Only used if keys is None
+				 
+		Returns
+			dists: (len-n_dist array) The shared distances
+			intVals: (n_dist x n_channels array) Column i is the integral values for channel keys[i]
+			keys: (list) Keys for each column
+	 
+		"""
+		keys = list(self.keys(intType=intType)) if keys is None else [self.getKey(*x) for x in keys]
+		allTables = [ np.asarray(self._intDict[key].integrals, dtype=float) for key in keys ]
+		if len(allTables) == 0:
+			return np.zeros(0), np.zeros((0,0)), keys
+		dists = allTables[0][:,0]
+		if not all([np.array_equal(dists, x[:,0]) for x in allTables]):
+			raise ValueError("All integral tables need the same distances to be stacked")
+		intVals = np.empty( (len(dists),len(allTables)) )
+		for idx,table in enumerate(allTables):
+			intVals[:,idx] = table[:,1]
+		return dists, intVals, keys
+
+	def evalAtDists(self, dists, keys=None, intType=None, deriv=0):
+		""" Evaluate a set of channels at the same distances (see evalIntegralChannelsAtDists). keys/intType are as in getStackedIntegrals. Returns an (n_dist x n_channels) array """
+		keys = list(self.keys(intType=intType)) if keys is None else [self.getKey(*x) for x in keys]
+		return evalIntegralChannelsAtDists([self._intDict[key] for key in keys], dists, deriv=deriv)
+
+	def __getitem__(self, key):
+		return self._intDict[ self.getKey(*key) ]
+
+	def __contains__(self, key):
+		return self.getKey(*key) in self._intDict
+
+	def __iter__(self):
+		return iter(self._intDict)
+
+	def __len__(self):
+		return len(self._intDict)
+
+
+def evalIntegralChannelsAtDists(intObjs:"iter of TbintIntegrals", dists, deriv=0):
+	""" Evaluate a set of integral tables (e.g. all hopping channels of a bond, as in getIntegralsFromBdt(path)["hopping"]) at the same distances. Uses the cached spline coefficients of each object; channels sharing a distance grid are evaluated together in one call
+	
+	Args:
+		intObjs: (iter of TbintIntegrals)
+		dists: (iter of floats) Distances to evaluate the integrals at
+		deriv: (int) 0 to get values, 1 to get first derivatives (d/dr)
+			 
+	Returns
+		outVals: (n_dist x n_channels array) Column i contains values for intObjs[i]. Values are zero for distances outside the tabulated range
+ 
+	"""
+	dists = np.asarray(dists, dtype=float).reshape(-1)
+	allSplines = [x._getSpline() for x in intObjs]
+	if len(allSplines) == 0:
+		return np.zeros( (len(dists),0) )
+
+	if all([np.array_equal(allSplines[0].x, x.x) for x in allSplines]):
+		stackedSpline = scipy.interpolate.PPoly( np.stack([x.c for x in allSplines], axis=-1), allSplines[0].x )
+		return _evalSplineAtDists(stackedSpline, dists, deriv)
+
+	return np.array( [_evalSplineAtDists(x, dists, deriv) for x in allSplines] ).T
+
+
+def _evalSplineAtDists(spline, dists, deriv):
+	dists = np.asarray(dists, dtype=float)
+	outVals = np.asarray( spline(dists, nu=deriv) )
+	outOfRange = (dists < spline.x[0]) | (dists > spline.x[-1])
+	outVals[outOfRange] = 0.0
+	return outVals
+
+
+#Maps intType (lowercase) to the format 3 section its table is in and the column holding its values. Hopping is in column 1 if there are no overlap integrals
+_BDT_FORM3_INT_TYPE_TO_SECTION_AND_COL = { "overlap":("orbMain",1), "hopping":("orbMain",2), "kinetic":("orbMain",3),
+                                           "crystalfieldnonxc":("crystalField",1), "crystalfieldxc":("crystalField",2),
+                                           "pairpot":("pairPot",1), "pairfunct":("pairFunct",1), "nijints":("nijInts",1),
+                                           "snints":("snInts",1), "hop3b2c":("hop3B2C",1), "nonlocpp":("nonLocPP",1) }
+_BDT_FORM3_ATOM_BASED_SECTIONS = ["pairPot", "pairFunct", "nijInts"]
+
+def replaceIntsInBdtFileFormat3(intObjs:"iter of TbintIntegrals", bdtFilePath=None):
+	""" Replace many integral tables in a format 3 *.bdt file at once. The file (and model.dat/*.adt) are read once, all table positions are found in one pass, and the file is written once (via a temporary file which is then renamed, so the file is never left partly written). If any object cant be matched to a table a ValueError is raised before anything is written
+	
+	Args:
+		intObjs: (iter of TbintIntegrals) Integrals to write; intType must be set on each (as it is for getIntegralsFromBdt output). Orbital-based integrals must have the same distances as the table they replace; atom-based integrals (e.g. pairPot) replace the whole table
+		bdtFilePath: (Optional, str) Path to the *.bdt file. Default is the inpFilePath shared by all intObjs
+ 
+	"""
+	intObjs = list(intObjs)
+	if bdtFilePath is None:
+		allPaths = set([os.path.abspath(x.inpFilePath) for x in intObjs])
+		if len(allPaths) != 1:
+			raise ValueError("bdtFilePath needs to be set if intObjs do not all have the same inpFilePath")
+		bdtFilePath = allPaths.pop()
+
+	formType = getFormatTypeBdtFile(bdtFilePath)
+	if formType != 3:
+		raise ValueError("{} is a format {} *.bdt file; only format 3 files are supported".format(bdtFilePath, formType))
+
+	modelParams = parseModelFile( getModelFilePathFromBdt(bdtFilePath) )
+	adtFilePathA, adtFilePathB = getAdtFilePathsFromBdt(bdtFilePath)
+	shellToAngMomA, shellToAngMomB = parseAdtFile(adtFilePathA)["shellToAngMom"], parseAdtFile(adtFilePathB)["shellToAngMom"]
+	nlPPInfo = None
+	if any([str(x.intType).lower()=="nonlocpp" for x in intObjs]):
+		nlPPInfo = parseBasFile( adtFilePathB.replace(".adt",".bas") )["nlPP"]
+
+	with open(bdtFilePath,"rt") as f:
+		fileAsList = f.readlines()
+	tableLocations = _getBdtFormat3TableLocations(fileAsList + ["\n"], shellToAngMomA, shellToAngMomB, modelParams, nlPPInfo=nlPPInfo)
+
+	#Get all the new tables before touching the file
+	newTables = dict() #Keys are start line idx, values are (end line idx, table)
+	for intObj in intObjs:
+		intType = str(intObj.intType).lower()
+		if intType not in _BDT_FORM3_INT_TYPE_TO_SECTION_AND_COL:
+			raise ValueError("Replacing intType = {} is not supported".format(intObj.intType))
+		section, colIdx = _BDT_FORM3_INT_TYPE_TO_SECTION_AND_COL[intType]
+		if (intType == "hopping") and (modelParams["overlap"] == 0):
+			colIdx = 1
+
+		isAtomBased = section in _BDT_FORM3_ATOM_BASED_SECTIONS
+		key = (section, None, None, 1) if isAtomBased else (section, intObj.shellA, intObj.shellB, intObj.orbSubIdx)
+		if key not in tableLocations:
+			raise ValueError("Could not find integrals for intType={}, shellA={}, shellB={}, orbSubIdx={} in {}".format(intObj.intType, intObj.shellA, intObj.shellB, intObj.orbSubIdx, bdtFilePath))
+		startIdx, endIdx = tableLocations[key]
+
+		replacementInts = np.array(intObj.integrals, dtype=float)
+		if isAtomBased:
+			newTables[startIdx] = (endIdx, replacementInts)
+			continue
+
+		if startIdx not in newTables:
+			newTables[startIdx] = (endIdx, parseNextIntegralSet(fileAsList, startIdx+1, endIdx-startIdx-1)[0])
+		currTable = newTables[startIdx][1]
+		if (replacementInts.shape[0] != currTable.shape[0]) or (not np.allclose(replacementInts[:,0], currTable[:,0])):
+			raise ValueError("Distances for replacement {} integrals (shellA={}, shellB={}, orbSubIdx={}) dont match those in {}".format(intObj.intType, intObj.shellA, intObj.shellB, intObj.orbSubIdx, bdtFilePath))
+		currTable[:,colIdx] = replacementInts[:,1]
+
+	#Put the file back together with the new tables
+	outStrs, prevEndIdx = list(), 0
+	for startIdx in sorted(newTables.keys()):
+		endIdx, currTable = newTables[startIdx]
+		outStrs.append( "".join(fileAsList[prevEndIdx:startIdx]) )
+		outStrs.append( _getBdtFormat3TableStr(currTable) )
+		prevEndIdx = endIdx
+	outStrs.append( "".join(fileAsList[prevEndIdx:]) )
+
+	tempPath = bdtFilePath + ".tmp"
+	try:
+		with open(tempPath,"wt") as f:
+			f.write( "".join(outStrs) )
+		os.replace(tempPath, bdtFilePath)
+	except BaseException:
+		if os.path.exists(tempPath):
+			os.remove(tempPath)
+		raise
+
+
+def _getBdtFormat3TableLocations(fileAsList, shellToAngMomA, shellToAngMomB, modelParams, nlPPInfo=None):
+	""" Get a dict mapping (section, shellA, shellB, orbSubIdx) to the (start,end) line indices of each table in a format 3 file. start is the line with the number of points; atom-based tables have shellA=shellB=None and orbSubIdx=1. Section order follows parseBdtFile """
+	outDict = dict()
+	currLineIdx = _addOrbBasedTableLocations("orbMain", fileAsList, 1, shellToAngMomA, shellToAngMomB, outDict)
+	if modelParams["crystalField"] == 1:
+		currLineIdx = _addOrbBasedTableLocations("crystalField", fileAsList, currLineIdx, shellToAngMomA, shellToAngMomA, outDict)
+
+	atomSections = ["pairPot"] + [x for x in ["pairFunct","nijInts"] if modelParams[x]==1]
+	for section in atomSections:
+		endLineIdx = currLineIdx + 1 + int(fileAsList[currLineIdx].strip().split()[0])
+		outDict[(section,None,None,1)] = (currLineIdx, endLineIdx)
+		currLineIdx = endLineIdx
+
+	if modelParams["snInts"] == 1:
+		currLineIdx = _addOrbBasedTableLocations("snInts", fileAsList, currLineIdx, shellToAngMomA, shellToAngMomA, outDict)
+	if modelParams["hop3B2C"] == 1:
+		currLineIdx = _addOrbBasedTableLocations("hop3B2C", fileAsList, currLineIdx, shellToAngMomA, shellToAngMomB, outDict)
+	if nlPPInfo is not None:
+		shellToAngMomNlPP = {k:v for k,v in enumerate(nlPPInfo["lVals"])}
+		currLineIdx = _addOrbBasedTableLocations("nonLocPP", fileAsList, currLineIdx, shellToAngMomA, shellToAngMomNlPP, outDict)
+
+	return outDict
+
+
+#Same logic as parseOrbitalBasedIntegrals, but skips over the integral values rather than parsing them
+def _addOrbBasedTableLocations(section, fileAsList, currLineIdx, shellIdxToAngMomAtomA, shellIdxToAngMomAtomB, outDict):
+	loopCounter = 0
+	while True:
+		currLineLength = len( fileAsList[currLineIdx].strip().split() )
+		if currLineLength == 2:
+			shellA, shellB = [int(x) for x in fileAsList[currLineIdx].strip().split()]
+			orbSubIdx = 1
+			currLineIdx += 1
+		elif currLineLength == 1:
+			maxOrbSubIdx = min( shellIdxToAngMomAtomA[shellA], shellIdxToAngMomAtomB[shellB] ) + 1
+			if orbSubIdx < maxOrbSubIdx:
+				orbSubIdx += 1
+			else:
+				break
+		elif currLineLength == 0:
+			break
+		else:
+			raise ValueError("In _addOrbBasedTableLocations len of line {} = {}".format(fileAsList[currLineIdx], currLineLength) )
+
+		minNumberLoops = min( shellIdxToAngMomAtomA[0], shellIdxToAngMomAtomB[0] ) + 1
+		if (loopCounter>=minNumberLoops) and (shellA==0) and (shellB==0):
+			currLineIdx -= 1
+			break
+		loopCounter += 1
+
+		endLineIdx = currLineIdx + 1 + int(fileAsList[currLineIdx].strip().split()[0])
+		outDict[(section, shellA, shellB, orbSubIdx)] = (currLineIdx, endLineIdx)
+		currLineIdx = endLineIdx
+
+	return currLineIdx
+
+
+def _getBdtFormat3TableStr(intTable):
+	rowFmt = " ".join( ["{:17.10g}" for x in range(intTable.shape[1])] ) + "\n"
+	return str(intTable.shape[0]) + "\n" + (rowFmt*intTable.shape[0]).format( *intTable.flatten().tolist() )
+
+
 #-----------Non-Interface functions to replace integrals in FORMAT 3 FILES ONLY ------------------#
 
 def replaceAtomBasedInts(inpFileListForm, startLineIdx, replacementIntegrals:"np array", inpBdtFilePath):
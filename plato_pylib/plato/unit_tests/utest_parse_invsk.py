@@ -135,6 +135,28 @@ class testRemoveXtalTermsFromParsedObj(unittest.TestCase):
 		self.assertTrue( self.fakeParsedFileA==self.fakeParsedFileAWithoutXtal )
 
 
+class testGetAllValsOrbPairAfterModifyingParsedObj(unittest.TestCase):
+	def setUp(self):
+		self.fieldObjs = [tCode.InvSKField(dist=x, shellA=0, shellB=idx%2, hValSigma=2*x) for idx,x in enumerate([1.0,2.0,3.0])]
+		self.parsedObj = tCode.InvSKAllData(self.fieldObjs)
+
+	def testAppendedFieldIncluded(self):
+		self.assertEqual( [(1.0,2.0),(3.0,6.0)], self.parsedObj.getAllValsOrbPair("hValSigma",0,0) )
+		self.parsedObj.appendInvSKField( tCode.InvSKField(dist=4.0, shellA=0, shellB=0, hValSigma=8.0) )
+		self.assertEqual( [(1.0,2.0),(3.0,6.0),(4.0,8.0)], self.parsedObj.getAllValsOrbPair("hValSigma",0,0) )
+
+	def testReplacedListUsed(self):
+		self.parsedObj.getAllValsOrbPair("hValSigma",0,1)
+		self.parsedObj.invSKObjs = self.fieldObjs[:1]
+		self.assertEqual( list(), self.parsedObj.getAllValsOrbPair("hValSigma",0,1) )
+
+	def testInPlaceModificationKeepingLengthUsed(self):
+		self.parsedObj.getAllValsOrbPair("hValSigma",0,0)
+		self.parsedObj.invSKObjs[1] = tCode.InvSKField(dist=5.0, shellA=0, shellB=0, hValSigma=10.0)
+		self.parsedObj.invSKObjs.sort(key=lambda x:x.dist, reverse=True)
+		self.assertEqual( [(5.0,10.0),(3.0,6.0),(1.0,2.0)], self.parsedObj.getAllValsOrbPair("hValSigma",0,0) )
+
+
 #from a compressed hcp Mg
 def createPartialInvSKFileA():
 	fileName = "partialInvSK.csv"
@@ -3,8 +3,11 @@
 import copy
 import itertools
 import os
+import shutil
 import sys
+import tempfile
 import unittest
+import unittest.mock as mock
 import numpy as np
 
 
@@ -134,6 +137,46 @@ class TestParseTbintFiles(unittest.TestCase):
 
 
 
+class TestParseNextIntegralSet(unittest.TestCase):
+
+	def setUp(self):
+		self.fileAsList = ["header line\n", "0.0 1.0 2.0\n", "0.1 1.1E-1 -2.1\n", "0.2 1.2 2.2\n", "end\n"]
+		self.startIdx = 1
+		self.numbPoints = 3
+
+	def _runTestFunct(self):
+		return tCode.parseNextIntegralSet(self.fileAsList, self.startIdx, self.numbPoints)
+
+	def testExpectedValsAndEndIdx(self):
+		expInts = np.array( [[0.0,1.0,2.0], [0.1,0.11,-2.1], [0.2,1.2,2.2]] )
+		actInts, actEndIdx = self._runTestFunct()
+		self.assertEqual(4, actEndIdx)
+		self.assertTrue( np.allclose(expInts, actInts) )
+
+	def testRaggedRowsPaddedWithNan(self):
+		self.fileAsList[3] = "0.2 1.2\n"
+		actInts, unused = self._runTestFunct()
+		self.assertTrue( np.allclose([0.2,1.2], actInts[2,:2]) )
+		self.assertTrue( np.isnan(actInts[2,2]) )
+
+	def testRaggedRowsWithMatchingTotalNotReshaped(self):
+		self.fileAsList[1:4] = ["0.0 1.0\n", "0.1 1.1 2.1\n", "0.2\n"]
+		self.numbPoints = 3
+		with self.assertRaises(IndexError):
+			self._runTestFunct()
+
+	def testBalancedRaggedRowsNotReshaped(self):
+		self.fileAsList[1:4] = ["0 1 2\n", "3 4\n", "5 6 7 8\n", "9 10 11\n"]
+		self.numbPoints = 4
+		with self.assertRaises(IndexError):
+			self._runTestFunct()
+
+	def testRaisesForNonNumericVals(self):
+		self.fileAsList[2] = "0.1 fake 2.1\n"
+		with self.assertRaises(ValueError):
+			self._runTestFunct()
+
+
 class TestParseWithPairFunctNoOverlap(unittest.TestCase):
 	def setUp(self):
 		self.modFile = tData.createTestModelPairFunct_NoOverlapA()
@@ -190,6 +233,28 @@ class TestParseFormat4BdtFile(unittest.TestCase):
 		for key in expectedVals:
 			self.assertTrue( actualVals[key] == expectedVals[key] )
 
+	def testParseOnlyRequestedIntTypes(self):
+		expectedVals = tData.loadTestBdtFileAExpectedVals_format4()
+		actualVals = tCode.parseBdtForm4(self.bdtFile, intTypes=["hopping","OVERLAP"])
+		self.assertEqual( sorted(["hopping","overlap"]), sorted(actualVals.keys()) )
+		for key in actualVals:
+			self.assertTrue( actualVals[key] == expectedVals[key] )
+
+	def testXcCrystalFieldDerivedWhenRequestedAlone(self):
+		expectedVals = tData.loadTestBdtFileAExpectedVals_format4()
+		actualVals = tCode.parseBdtForm4(self.bdtFile, intTypes=["crystalFieldXc"])
+		self.assertEqual(["crystalFieldXc"], list(actualVals.keys()))
+		self.assertTrue( actualVals["crystalFieldXc"] == expectedVals["crystalFieldXc"] )
+
+	def testRaisesForInvalidIntType(self):
+		with self.assertRaises(ValueError):
+			tCode.parseBdtForm4(self.bdtFile, intTypes=["fake_int_type"])
+
+	def testSectionIndexRaisesForRepeatedKeyword(self):
+		fileAsList = ["format_4\n", "hopping\n", "0\n", "hopping\n", "0\n"]
+		with self.assertRaises(ValueError):
+			tCode._getBdtForm4SectionIndex(fileAsList)
+
 class TestWriteOutputBdtFiles(unittest.TestCase):
 	def setUp(self):
 		self.bdtFile = tData.createFormat4BdtFile_setAData() #I'm only doing this to get the filepath really
@@ -301,6 +366,77 @@ class testModIntegralsBdt(unittest.TestCase):
 			self.assertTrue( allInitInts[key] == newInts[key] )
 
 
+class TestBatchReplaceIntsBdtFormat3(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp(prefix="tbint_batch_replace")
+		createdPaths = [tData.createTestModelFileA(), tData.createTestBdtFileA(), tData.createTestAdtFileA()]
+		for currPath in createdPaths:
+			shutil.move(currPath, os.path.join(self.tempDir, os.path.basename(currPath)))
+		shutil.move(createPartialBasFileA(), os.path.join(self.tempDir, "Mg.bas"))
+		self.bdtPath = os.path.join(self.tempDir, "Mg_Mg.bdt")
+		self.allInitInts = tCode.getIntegralsFromBdt(self.bdtPath)
+		self.intIndex = tCode.TbintIntegralsIndex.fromIntegralsDict(self.allInitInts)
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def _checkFileMatchesInitInts(self):
+		#Total crystal field is derived from the non-xc/xc parts when parsing, so needs updating to reflect those
+		self.allInitInts["crystalFieldTotal"] = [tCode.comboSimilarIntegrals(a,b) for a,b in zip(self.allInitInts["crystalFieldNonXc"], self.allInitInts["crystalFieldXc"])]
+		newInts = tCode.getIntegralsFromBdt(self.bdtPath)
+		for key in newInts.keys():
+			self.assertTrue( self.allInitInts[key] == newInts[key] )
+
+	def testReplaceManyTablesInOneWrite(self):
+		self.intIndex["pairPot",].integrals = np.array(( [0.0,4.0], [1.0,3.0], [2.0,2.0], [3.0,1.0] ))
+		self.intIndex["hopping",1,1,2].integrals = np.array(( [0.0,2.0], [6.0,3.0], [12.0,5.0] ))
+		self.intIndex["hopping",0,1,1].integrals = np.array(( [0.0,3.0], [6.0,4.0], [12.0,9.2] ))
+		self.intIndex["overlap",0,1,1].integrals = np.array(( [0.0,0.1], [6.0,0.2], [12.0,0.3] ))
+		self.intIndex["crystalFieldXc",1,1,1].integrals = np.array(( [0.0,-0.1], [6.0,-0.2], [12.0,-0.3] ))
+		self.intIndex["nonLocPP",0,0,1].integrals[:,1] = 7.0
+		replaceObjs = [self.intIndex[key] for key in [("pairPot",), ("hopping",1,1,2), ("hopping",0,1,1), ("overlap",0,1,1), ("crystalFieldXc",1,1,1), ("nonLocPP",0,0,1)]]
+
+		with mock.patch("plato_pylib.plato.parse_tbint_files.os.replace", wraps=os.replace) as mockedReplace:
+			tCode.replaceIntsInBdtFileFormat3(replaceObjs)
+			mockedReplace.assert_called_once()
+		self._checkFileMatchesInitInts()
+
+	def testNothingWrittenIfAnyObjInvalid(self):
+		with open(self.bdtPath,"rt") as f:
+			expFileStr = f.read()
+		self.intIndex["pairPot",].integrals = np.array(( [0.0,4.0], [1.0,3.0] ))
+		self.intIndex["hopping",0,0,1].integrals = np.array(( [0.0,2.0], [5.0,3.0], [12.0,5.0] )) #Distances differ from file
+		with self.assertRaises(ValueError):
+			tCode.replaceIntsInBdtFileFormat3([self.intIndex["pairPot",], self.intIndex["hopping",0,0,1]])
+		with open(self.bdtPath,"rt") as f:
+			actFileStr = f.read()
+		self.assertEqual(expFileStr, actFileStr)
+
+	def testRaisesForMissingChannel(self):
+		missingObj = tCode.TbintIntegrals(intType="hopping", shellA=3, shellB=3, integrals=np.array(([0.0,1.0],)))
+		with self.assertRaises(ValueError):
+			tCode.replaceIntsInBdtFileFormat3([missingObj], bdtFilePath=self.bdtPath)
+
+	def testTempFileRemovedWhenWriteFails(self):
+		with open(self.bdtPath,"rt") as f:
+			expFileStr = f.read()
+		self.intIndex["pairPot",].integrals = np.array(( [0.0,4.0], [1.0,3.0] ))
+		with mock.patch("plato_pylib.plato.parse_tbint_files.os.replace", side_effect=OSError("fake error")):
+			with self.assertRaises(OSError):
+				tCode.replaceIntsInBdtFileFormat3([self.intIndex["pairPot",]])
+		with open(self.bdtPath,"rt") as f:
+			actFileStr = f.read()
+		self.assertEqual(expFileStr, actFileStr)
+		self.assertEqual( list(), [x for x in os.listdir(self.tempDir) if x.endswith(".tmp")] )
+
+	def testRaisesForFormat4File(self):
+		form4Path = os.path.join(self.tempDir, "Xa_Xb.bdt")
+		shutil.move(tData.createFormat4BdtFile_setAData(), form4Path)
+		with self.assertRaises(ValueError):
+			tCode.replaceIntsInBdtFileFormat3([self.intIndex["pairPot",]], bdtFilePath=form4Path)
+
+
 class testGetCombinedTbintObjects(unittest.TestCase):
 
 	def setUp(self):
@@ -314,5 +450,171 @@ class testGetCombinedTbintObjects(unittest.TestCase):
 		actualIntegralSubtraction = tCode.getIntegralsAMinusBIfTheyAreSimilarIntegrals(intSetA,intSetB)
 		self.assertEqual(self.expectedIntegalsSubtraction, actualIntegralSubtraction)
 
+class TestTbintModelDirCache(unittest.TestCase):
+
+	def setUp(self):
+		self.tempDir = tempfile.mkdtemp(prefix="tbint_model_dir")
+		createdPaths = [tData.createTestModelFileA(), tData.createTestBdtFileA(), tData.createTestAdtFileA(),
+		                tData.createFormat4BdtFile_setAData()]
+		for currPath in createdPaths:
+			shutil.move(currPath, os.path.join(self.tempDir, os.path.basename(currPath)))
+		shutil.move(createPartialBasFileA(), os.path.join(self.tempDir, "Mg.bas"))
+		self.cachePrefix = os.path.join(self.tempDir, "test_cache")
+
+	def tearDown(self):
+		shutil.rmtree(self.tempDir)
+
+	def _runTestFunct(self):
+		return tCode.parseTbintModelDirWithCache(self.tempDir, cachePrefix=self.cachePrefix)
+
+	def _checkIntDictsMatch(self, expDict, actDict):
+		self.assertEqual( sorted(expDict.keys()), sorted(actDict.keys()) )
+		for key in expDict:
+			self.assertTrue( expDict[key] == actDict[key] )
+
+	def testModelDirMatchesParsingFilesIndividually(self):
+		actDict = tCode.parseTbintModelDir(self.tempDir)
+		self.assertEqual(["Mg_Mg", "Xa_Xb"], sorted(actDict["integrals"].keys()))
+		for bdtKey in actDict["integrals"]:
+			expInts = tCode.getIntegralsFromBdt( os.path.join(self.tempDir, bdtKey + ".bdt") )
+			self._checkIntDictsMatch(expInts, actDict["integrals"][bdtKey])
+		self.assertEqual({0:0, 1:1}, actDict["adtInfo"]["Mg"]["shellToAngMom"])
+
+	def testCachedValsMatchParsedVals(self):
+		expDict = tCode.parseTbintModelDir(self.tempDir)
+		actDict = self._runTestFunct()
+		self.assertEqual(expDict["modelParams"], actDict["modelParams"])
+		self.assertEqual(expDict["adtInfo"], actDict["adtInfo"])
+		for bdtKey in expDict["integrals"]:
+			self._checkIntDictsMatch(expDict["integrals"][bdtKey], actDict["integrals"][bdtKey])
+		self.assertTrue( isinstance(actDict["integrals"]["Mg_Mg"]["hopping"][0].integrals, np.memmap) )
+
+	def testCacheReusedUntilSourceFileModified(self):
+		self._runTestFunct()
+		with mock.patch("plato_pylib.plato.parse_tbint_files.parseTbintModelDir") as mockedParser:
+			self._runTestFunct()
+			mockedParser.assert_not_called()
+
+		bdtPath = os.path.join(self.tempDir, "Mg_Mg.bdt")
+		fileStats = os.stat(bdtPath)
+		os.utime(bdtPath, ns=(fileStats.st_atime_ns, fileStats.st_mtime_ns+int(1e9)))
+		with mock.patch("plato_pylib.plato.parse_tbint_files.parseTbintModelDir", wraps=tCode.parseTbintModelDir) as mockedParser:
+			self._runTestFunct()
+			mockedParser.assert_called_once()
+
+	def testModifyingLoadedIntsLeavesCacheUnchanged(self):
+		expVals = np.array( self._runTestFunct()["integrals"]["Mg_Mg"]["hopping"][0].integrals )
+		self._runTestFunct()["integrals"]["Mg_Mg"]["hopping"][0].integrals[:,1] += 5
+		actVals = self._runTestFunct()["integrals"]["Mg_Mg"]["hopping"][0].integrals
+		self.assertTrue( np.allclose(expVals, actVals) )
+
+	def _getArrayFileNames(self):
+		return [x for x in os.listdir(self.tempDir) if x.endswith(".npy")]
+
+	def testRewriteUsesNewArrayFileAndRemovesOld(self):
+		modelDict = tCode.parseTbintModelDir(self.tempDir)
+		tCode.writeTbintModelCache(modelDict, self.cachePrefix)
+		origArrayFiles = self._getArrayFileNames()
+		tCode.writeTbintModelCache(modelDict, self.cachePrefix)
+		newArrayFiles = self._getArrayFileNames()
+		self.assertEqual(1, len(origArrayFiles))
+		self.assertEqual(1, len(newArrayFiles))
+		self.assertNotEqual(origArrayFiles, newArrayFiles)
+		self._checkIntDictsMatch(modelDict["integrals"]["Mg_Mg"], tCode.openTbintModelCache(self.cachePrefix)["integrals"]["Mg_Mg"])
+
+	def testFailedRewriteLeavesOldCacheAndNoTempFiles(self):
+		modelDict = tCode.parseTbintModelDir(self.tempDir)
+		tCode.writeTbintModelCache(modelDict, self.cachePrefix)
+		origArrayFiles = self._getArrayFileNames()
+		with mock.patch("plato_pylib.plato.parse_tbint_files.json.dump", side_effect=ValueError("fake error")):
+			with self.assertRaises(ValueError):
+				tCode.writeTbintModelCache(modelDict, self.cachePrefix)
+		self.assertEqual( list(), [x for x in os.listdir(self.tempDir) if x.endswith(".tmp")] )
+		self.assertEqual(origArrayFiles, self._getArrayFileNames())
+		self._checkIntDictsMatch(modelDict["integrals"]["Mg_Mg"], tCode.openTbintModelCache(self.cachePrefix)["integrals"]["Mg_Mg"])
+
+
+class TestTbintIntegralsSplines(unittest.TestCase):
+
+	def setUp(self):
+		self.distsA = np.linspace(0,10,201)
+		self.distsB = np.linspace(0,8,161)
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		self.intObjA = tCode.TbintIntegrals(shellA=0, shellB=0, integrals=np.array([self.distsA, np.sin(self.distsA)]).T)
+		self.intObjB = tCode.TbintIntegrals(shellA=0, shellB=1, integrals=np.array([self.distsA, np.exp(-self.distsA)]).T)
+		self.intObjC = tCode.TbintIntegrals(shellA=1, shellB=1, integrals=np.array([self.distsB, self.distsB**2]).T)
+		self.testDists = np.array([0.3, 2.71, 5.05, 7.9])
+
+	def testValsAndDerivsForSingleTable(self):
+		actVals = self.intObjA.evalAtDists(self.testDists)
+		actDerivs = self.intObjA.evalAtDists(self.testDists, deriv=1)
+		self.assertTrue( np.allclose(np.sin(self.testDists), actVals, atol=1e-5) )
+		self.assertTrue( np.allclose(np.cos(self.testDists), actDerivs, atol=1e-4) )
+
+	def testZeroOutsideTabulatedRange(self):
+		actVals = self.intObjA.evalAtDists([-1.0, 10.5])
+		self.assertTrue( np.allclose([0.0,0.0], actVals) )
+
+	def testSplineUpdatedWhenIntegralsChange(self):
+		self.intObjA.evalAtDists(self.testDists)
+		self.intObjA.integrals[:,1] = 2*self.intObjA.integrals[:,1]
+		actVals = self.intObjA.evalAtDists(self.testDists)
+		self.assertTrue( np.allclose(2*np.sin(self.testDists), actVals, atol=1e-5) )
+
+	def testChannelsOnSharedGrid(self):
+		expVals = np.array( [np.sin(self.testDists), np.exp(-self.testDists)] ).T
+		actVals = tCode.evalIntegralChannelsAtDists([self.intObjA, self.intObjB], self.testDists)
+		self.assertEqual( (len(self.testDists),2), actVals.shape )
+		self.assertTrue( np.allclose(expVals, actVals, atol=1e-5) )
+
+	def testChannelsOnDifferentGrids(self):
+		expDerivs = np.array( [np.cos(self.testDists), 2*self.testDists] ).T
+		actDerivs = tCode.evalIntegralChannelsAtDists([self.intObjA, self.intObjC], self.testDists, deriv=1)
+		self.assertTrue( np.allclose(expDerivs, actDerivs, atol=1e-4) )
+
+
+class TestTbintIntegralsIndex(unittest.TestCase):
+
+	def setUp(self):
+		self.intsDict = tData.loadTestBdtFileAExpectedVals_format4()
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		self.testObjA = tCode.TbintIntegralsIndex.fromIntegralsDict(self.intsDict)
+
+	def testLookupMatchesLinearSearch(self):
+		for shellA, shellB, orbSubIdx in [(0,0,1), (0,1,1), (1,1,1), (1,1,2)]:
+			expObj = tCode._findIntObjInList(shellA, shellB, orbSubIdx, self.intsDict["hopping"])
+			actObj = self.testObjA.getIntegrals("HOPPING", shellA, shellB, orbSubIdx=orbSubIdx)
+			self.assertTrue( expObj is actObj )
+			self.assertTrue( ("hopping",shellA,shellB,orbSubIdx) in self.testObjA )
+
+	def testAtomBasedLookupAndMissingKey(self):
+		self.assertTrue( self.intsDict["pairPot"][0] is self.testObjA["pairPot",] )
+		with self.assertRaises(KeyError):
+			self.testObjA.getIntegrals("hopping", 3, 3)
+
+	def testKeysForIntTypeAreSetLike(self):
+		expKeys = { ("overlap",0,0,1), ("overlap",0,1,1), ("overlap",1,0,1), ("overlap",1,1,1), ("overlap",1,1,2) }
+		actKeys = self.testObjA.keys(intType="overlap")
+		self.assertEqual(expKeys, set(actKeys))
+		self.assertEqual( {("overlap",0,0,1)}, actKeys & {("overlap",0,0,1), ("fake",0,0,1)} )
+
+	def testStackedIntegrals(self):
+		expDists = self.intsDict["hopping"][0].integrals[:,0]
+		expVals = np.array( [x.integrals[:,1] for x in self.intsDict["hopping"]] ).T
+		actDists, actVals, actKeys = self.testObjA.getStackedIntegrals(intType="hopping")
+		self.assertTrue( np.allclose(expDists, actDists) )
+		self.assertTrue( np.allclose(expVals, actVals) )
+		self.assertTrue( actVals.flags["C_CONTIGUOUS"] )
+		self.assertEqual(len(self.intsDict["hopping"]), len(actKeys))
+
+	def testRaisesForDuplicateKey(self):
+		with self.assertRaises(ValueError):
+			self.testObjA.addIntegrals(self.intsDict["hopping"][0], intType="hopping")
+
+
 if __name__ == '__main__':
 	unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/python3
+
+import functools
+import hashlib
+import os
+import pickle
+
+
+class ParsedFileCache():
+	""" On-disk cache for the output of file parsers (e.g. parseCpout, parseCastepOutfile, parsePlatoOutFile, parseXyzFromGeomOpt). Results are pickled, one file per entry, and keyed on the parse function, its arguments and the path/size/modification time (and optionally the contents) of the file parsed. When the total size exceeds maxSizeBytes the least-recently used entries are deleted
+
+	Example:
+		cache = ParsedFileCache("parse_cache_dir")
+		cachedParseCpout = cache.getCachedParseFunct(parseCpout)
+		outDict = cachedParseCpout("file.cpout") #Parses the file the first time, reloads from cache on later calls
+
+	"""
+	_fileExt = ".pkl"
+
+	def __init__(self, cacheDir, maxSizeBytes=int(1e9), useContentHash=False):
+		""" Initializer
+
+		Args:
+			cacheDir: (str) Directory to store cached results in; created if needed
+			maxSizeBytes: (int) Maximum total size of the cached results. Least-recently used entries get deleted to stay below this
+			useContentHash: (Bool) If True the key also includes a hash of the file contents. Guards against files modified without their size/mtime changing, at the cost of reading the whole file on each lookup
+
+		"""
+		self.cacheDir = os.path.abspath(cacheDir)
+		self.maxSizeBytes = maxSizeBytes
+		self.useContentHash = useContentHash
+		os.makedirs(self.cacheDir, exist_ok=True)
+
+	def getCachedParseFunct(self, parseFunct):
+		""" Get a function with the same interface as parseFunct(inpPath, *args, **kwargs) which uses this cache """
+		@functools.wraps(parseFunct)
+		def _cachedParseFunct(inpPath, *args, **kwargs):
+			return self.parseFile(parseFunct, inpPath, *args, **kwargs)
+		return _cachedParseFunct
+
+	def parseFile(self, parseFunct, inpPath, *args, **kwargs):
+		""" Get parseFunct(inpPath, *args, **kwargs); loaded from the cache if present, else parsed and stored """
+		cachePath = self._getCachePath( self.getCacheKey(parseFunct, inpPath, *args, **kwargs) )
+		try:
+			with open(cachePath,"rb") as f:
+				outVal = pickle.load(f)
+		except (OSError, EOFError, pickle.UnpicklingError):
+			pass
+		else:
+			os.utime(cachePath) #Access time is unreliable (e.g. noatime mounts) so we bump mtime to mark as recently used
+			return outVal
+
+		outVal = parseFunct(inpPath, *args, **kwargs)
+		self._writeToCache(cachePath, outVal)
+		self.evictLeastRecentlyUsed()
+		return outVal
+
+	def getCacheKey(self, parseFunct, inpPath, *args, **kwargs):
+		""" Get the (hex str) key for the given parse function and arguments """
+		absPath = os.path.abspath(inpPath)
+		fileStats = os.stat(absPath)
+		keyParts = [ getattr(parseFunct,"__module__",""), getattr(parseFunct,"__qualname__",repr(parseFunct)),
+		             absPath, fileStats.st_size, fileStats.st_mtime_ns, repr(args), repr(sorted(kwargs.items())) ]
+		if self.useContentHash:
+			keyParts.append( _getContentHash(absPath) )
+		return hashlib.sha256( "\n".join([str(x) for x in keyParts]).encode("utf-8") ).hexdigest()
+
+	def evictLeastRecentlyUsed(self):
+		""" Delete least recently used entries until the total size is at most maxSizeBytes """
+		allEntries = list()
+		for fileName in os.listdir(self.cacheDir):
+			if fileName.endswith(self._fileExt):
+				filePath = os.path.join(self.cacheDir, fileName)
+				try:
+					fileStats = os.stat(filePath)
+				except OSError:
+					continue
+				allEntries.append( (fileStats.st_mtime_ns, fileStats.st_size, filePath) )
+
+		totalSize = sum([x[1] for x in allEntries])
+		for unused, fileSize, filePath in sorted(allEntries):
+			if totalSize <= self.maxSizeBytes:
+				break
+			try:
+				os.remove(filePath)
+			except OSError:
+				pass
+			totalSize -= fileSize
+
+	def clear(self):
+		""" Delete all cached results """
+		for fileName in os.listdir(self.cacheDir):
+			if fileName.endswith(self._fileExt):
+				os.remove( os.path.join(self.cacheDir, fileName) )
+
+	def _getCachePath(self, cacheKey):
+		return os.path.join(self.cacheDir, cacheKey + self._fileExt)
+
+	def _writeToCache(self, cachePath, outVal):
+		#Write then rename so other processes never load a partly-written entry
+		tempPath = cachePath + ".{}.tmp".format(os.getpid())
+		try:
+			with open(tempPath,"wb") as f:
+				pickle.dump(outVal, f, protocol=pickle.HIGHEST_PROTOCOL)
+			os.replace(tempPath, cachePath)
+		except BaseException:
+			if os.path.exists(tempPath):
+				os.remove(tempPath)
+			raise
+
+
+def _getContentHash(inpPath, blockSize=2**20):
+	hasher = hashlib.sha256()
+	with open(inpPath,"rb") as f:
+		for block in iter(lambda: f.read(blockSize), b""):
+			hasher.update(block)
+	return hasher.hexdigest()
+
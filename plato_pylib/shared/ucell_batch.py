@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+from . import ucell_class as uCellHelp
+from . import unit_convs as uConv
+
+
+class UnitCellBatch():
+	""" Series of cells sharing the same atoms/element ordering (e.g. strain scans, EOS runs, trajectories) stored as arrays, so operations on every frame can be done at once """
+
+	def __init__(self, lattVects:"nFrames x 3 x 3 iter", fractCoords:"nFrames x nAtoms x 3 iter", elementList:"len nAtoms iter of str"):
+		""" Initializer
+
+		Args:
+			lattVects: (nFrames x 3 x 3 iter) Lattice vectors for each frame; lattVects[frame][i] is the i-th lattice vector
+			fractCoords: (nFrames x nAtoms x 3 iter) Fractional co-ordinates for each frame
+			elementList: (len nAtoms iter of str) Element key for each atom; shared by all frames
+
+		"""
+		self.lattVects = np.array(lattVects, dtype=np.float64).reshape(-1,3,3)
+		self.fractCoords = np.array(fractCoords, dtype=np.float64).reshape(self.lattVects.shape[0],-1,3)
+		self.elementList = list(elementList)
+		if len(self.elementList) != self.fractCoords.shape[1]:
+			raise ValueError("Got {} elements for {} atoms per frame".format(len(self.elementList), self.fractCoords.shape[1]))
+
+	@classmethod
+	def fromCartCoords(cls, lattVects, cartCoords:"nFrames x nAtoms x 3 iter", elementList):
+		lattVects = np.array(lattVects, dtype=np.float64).reshape(-1,3,3)
+		fractCoords = getFractCoordsFromCartCoordsForBatch(lattVects, cartCoords)
+		return cls(lattVects, fractCoords, elementList)
+
+	@classmethod
+	def fromUnitCells(cls, inpCells:"iter of UnitCell objects"):
+		""" Create a batch from a list of UnitCell objects, which must all have the same elements in the same order """
+		inpCells = list(inpCells)
+		if len(inpCells) == 0:
+			raise ValueError("Need at least one UnitCell to create a UnitCellBatch")
+
+		elementList = inpCells[0]._getElementList()
+		for cell in inpCells[1:]:
+			if cell._getElementList() != elementList:
+				raise ValueError("All cells in a UnitCellBatch need the same element list")
+
+		lattVects = np.array([cell.lattVectsArray for cell in inpCells])
+		fractCoords = np.array([cell.fractCoordsArray for cell in inpCells])
+		return cls(lattVects, fractCoords, elementList)
+
+	def toUnitCells(self, useArrayStorage=False):
+		""" Convert into a list of UnitCell objects (one per frame)
+
+		Args:
+			useArrayStorage: (Bool) Passed to the UnitCell initializer
+
+		Returns
+			outCells: (list of UnitCell objects)
+
+		"""
+		outCells = list()
+		allLattParams, allLattAngles = self.lattParams, self.lattAngles
+		for lattParams, lattAngles, fractCoords in zip(allLattParams, allLattAngles, self.fractCoords):
+			currCell = uCellHelp.UnitCell(lattParams=lattParams.tolist(), lattAngles=lattAngles.tolist(), useArrayStorage=useArrayStorage)
+			currCell.setFractCoordsFromArrays(fractCoords, self.elementList)
+			outCells.append(currCell)
+		return outCells
+
+	def __len__(self):
+		return self.lattVects.shape[0]
+
+	def __getitem__(self, key):
+		""" Integer keys give a UnitCell for that frame; slices (or index arrays) give a new UnitCellBatch """
+		if isinstance(key, (int, np.integer)):
+			return UnitCellBatch(self.lattVects[[key]], self.fractCoords[[key]], self.elementList).toUnitCells()[0]
+		return UnitCellBatch(self.lattVects[key], self.fractCoords[key], self.elementList)
+
+	@property
+	def nFrames(self):
+		return self.lattVects.shape[0]
+
+	@property
+	def nAtoms(self):
+		return self.fractCoords.shape[1]
+
+	@property
+	def cartCoords(self):
+		""" (nFrames x nAtoms x 3 np array) Cartesian co-ordinates for every frame """
+		return getCartCoordsFromFractCoordsForBatch(self.lattVects, self.fractCoords)
+
+	@cartCoords.setter
+	def cartCoords(self, value):
+		self.fractCoords = getFractCoordsFromCartCoordsForBatch(self.lattVects, value)
+
+	@property
+	def volumes(self):
+		""" (len nFrames np array) Volume of each frame """
+		return np.abs( np.linalg.det(self.lattVects) )
+
+	@property
+	def lattParams(self):
+		""" (nFrames x 3 np array) [a,b,c] for each frame """
+		return np.linalg.norm(self.lattVects, axis=2)
+
+	@property
+	def lattAngles(self):
+		""" (nFrames x 3 np array) [alpha,beta,gamma] in degrees for each frame """
+		lattParams = self.lattParams
+		vA, vB, vC = self.lattVects[:,0,:], self.lattVects[:,1,:], self.lattVects[:,2,:]
+		cosAlpha = np.sum(vB*vC, axis=1) / (lattParams[:,1]*lattParams[:,2])
+		cosBeta  = np.sum(vA*vC, axis=1) / (lattParams[:,0]*lattParams[:,2])
+		cosGamma = np.sum(vA*vB, axis=1) / (lattParams[:,0]*lattParams[:,1])
+		cosAngles = np.clip( np.stack([cosAlpha, cosBeta, cosGamma], axis=1), -1, 1 )
+		return np.degrees( np.arccos(cosAngles) )
+
+	def getDensities(self, massDict=None, lenConvFactor=1):
+		""" Get the density of each frame; see ucell_class.getDensityFromUCellObj for details on args/units
+
+		Args:
+			massDict: (dict) Keys are capitalized element keys while values are mass per mole (usually g/mol). Default is a dictionary of g/mol
+			lenConvFactor: (float) Multiply the length units by this factor
+
+		Returns
+			densities: (len nFrames np array)
+
+		"""
+		massDict = massDict if massDict is not None else uCellHelp.getEleKeyToMassDictStandard()
+		totalMass = sum( [massDict[eleKey.capitalize()] for eleKey in self.elementList] ) / uConv.AVOGADRO_NUMBER
+		return totalMass / ( self.volumes*(lenConvFactor**3) )
+
+	def foldAtomicPositionsIntoCell(self, tolerance=1e-2):
+		""" Fold fractional co-ordinates of all frames to be between 0 and 1 (to within tolerance). Works in place """
+		uCellHelp.foldFractCoordArrayToValsBetweenZeroAndOne(self.fractCoords, tolerance=tolerance)
+
+
+def getCartCoordsFromFractCoordsForBatch(lattVects:"nFrames x 3 x 3", fractCoords:"nFrames x nAtoms x 3"):
+	""" Vectorised conversion of fractional to cartesian co-ordinates for many frames at once; returns nFrames x nAtoms x 3 np array """
+	return np.matmul( np.asarray(fractCoords, dtype=np.float64), np.asarray(lattVects, dtype=np.float64) )
+
+
+def getFractCoordsFromCartCoordsForBatch(lattVects:"nFrames x 3 x 3", cartCoords:"nFrames x nAtoms x 3"):
+	""" Vectorised conversion of cartesian to fractional co-ordinates for many frames at once; returns nFrames x nAtoms x 3 np array """
+	invLattVects = np.linalg.inv( np.asarray(lattVects, dtype=np.float64) )
+	return np.matmul( np.asarray(cartCoords, dtype=np.float64), invLattVects )
+
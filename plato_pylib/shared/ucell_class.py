@@ -59,18 +59,38 @@ class UnitCell():
 			fractCoords: (iter of nx3 iter) Fractional coordinates for a list of atoms. e.g. [ [0.0,0.0,0.0], [0.5,0.5,0.5]]. Note that setting fractCoords OUTSIDE the initialiser also requires the atom symbols to be passed (e.g. [[0.0,0.0,0.0,"Mg"]]). Also note elementList SHOULD be set alongside fractCoords in the initialiser
 			elementList: (str iter) Each entry contains a string representing the element of one atom in fractCoords. Therefore
 			putCAlongZ: (Bool, default is False) If true then the 3rd lattice vector in self.lattVects will always be [0,0,c]. DEPRECATED/STUPID: PLEASE leave it as False			 
+			useArrayStorage: (Bool, default is False) If true fractional co-ordinates are stored as an (nx3) float64 numpy array and elements as an array of indices into a list of unique element keys. Much faster for large cells, especially when accessed through fractCoordsArray/cartCoordsArray
+			testLattVectInverse: (Bool, default is True) If true, check that lattice vectors convert back into the same lattice parameters/angles whenever they are (re)calculated. Set to False to skip this check
 
 		"""
 		kwargs = {k.lower():v for k,v in kwargs.items()}
+		self._useArrayStorage = kwargs.get("useArrayStorage".lower(), False)
 		self._lattParams = self.listToLattParams( kwargs.get( "lattParams".lower(), None ) )
 		self._lattAngles = self.listToLattAngles( kwargs.get( "lattAngles".lower(), None ) )
-		self._fractCoords = kwargs.get("fractCoords".lower(), None)
-		self._elementList = kwargs.get("elementList".lower(), None)
+		self._fractCoords, self._elementList = None, None
+		self._eleKeys, self._eleIndices = None, None
+		self._setFractCoordsNoElements( kwargs.get("fractCoords".lower(), None) )
+		self._setElementList( kwargs.get("elementList".lower(), None) )
 		self.putCAlongZ = kwargs.get("putCAlongZ".lower(), False)
+		self.testLattVectInverse = kwargs.get("testLattVectInverse".lower(), True)
 		self._eqTolPlaces = 5
+		self._lattCache = None
 
 
 	def __eq__(self,other):
+		return self.isEquivalentTo(other)
+
+	def isEquivalentTo(self, other, periodic=False):
+		""" Check whether two cells are equal to within the tolerance used by __eq__
+		
+		Args:
+			other: (UnitCell object)
+			periodic: (Bool, default False) If True then fractional co-ordinates which differ by an integer (e.g. 0.0 and 1.0) are treated as equal
+				 
+		Returns
+			isEqual: (Bool)
+ 
+		"""
 		outVal = True
 		if self._eqTolPlaces != other._eqTolPlaces:
 			outVal = False
@@ -79,22 +99,19 @@ class UnitCell():
 
 
 		#Purely numberical arrays 
-		relAttrs = ["_fractCoords"]
-		for attr in relAttrs:
-			attA,attB = getattr(self,attr), getattr(other,attr)
-			if (attA is None) and (attB is None):
-				pass
-			elif (attA is None) or (attB is None):
+		fractA, fractB = self.fractCoordsArray, other.fractCoordsArray
+		if (fractA is None) and (fractB is None):
+			pass
+		elif (fractA is None) or (fractB is None):
+			outVal = False
+		elif fractA.shape != fractB.shape:
+			outVal = False
+		else:
+			diffs = fractA - fractB
+			if periodic:
+				diffs = diffs - np.round(diffs)
+			if not np.all( np.abs(diffs) < allowedDiff ):
 				outVal = False
-				break
-			else:
-				if len(attA) != len(attB):
-					outVal = False
-					break
-				for x,y in it.zip_longest(attA,attB):
-					if not all( [abs(a-b) < allowedDiff for a,b in it.zip_longest(x,y)] ):
-						outVal = False
-						break
 
 		#Dictionaries of numeric vals
 		relAttrs = ["lattParams","lattAngles"]
@@ -118,16 +135,46 @@ class UnitCell():
 							break
 
 		#Other
-		if (self._elementList is None) and (other._elementList is None):
-			pass
-		elif (self._elementList is None) or (other._elementList is None):
+		if outVal and not self._elementsMatch(other):
 			outVal = False
-		else:
-			if self._elementList != other._elementList:
-				outVal = False
 
 		return outVal
 
+	def _elementsMatch(self, other):
+		#Comparing interned indices avoids building the full element lists for large cells
+		if self._useArrayStorage and other._useArrayStorage and (self._eleKeys == other._eleKeys):
+			if (self._eleIndices is None) or (other._eleIndices is None):
+				return (self._eleIndices is None) and (other._eleIndices is None)
+			return np.array_equal(self._eleIndices, other._eleIndices)
+
+		eleListA, eleListB = self._getElementList(), other._getElementList()
+		if (eleListA is None) and (eleListB is None):
+			return True
+		elif (eleListA is None) or (eleListB is None):
+			return False
+		return eleListA == eleListB
+
+	def getFingerprint(self, decimals=2):
+		""" Get a cheap, hashable summary of the cell; meant for bucketing large collections of structures before doing full (__eq__) comparisons
+		
+		Args:
+			decimals: (int) Number of decimal places to round lattice parameters/angles to. Cells which only differ near a rounding boundary can get different fingerprints, so keep this coarse relative to the tolerance in __eq__
+				 
+		Returns
+			fingerprint: (tuple) (nAtoms, composition, lattParams, lattAngles). Composition is a sorted tuple of (eleKey, count) pairs while lattParams/lattAngles are rounded tuples (or None if not set)
+ 
+		"""
+		eleKeys, eleIndices = self._getInternedElements()
+		if eleIndices is None:
+			nAtoms, composition = 0 if self._fractCoords is None else len(self._fractCoords), tuple()
+		else:
+			counts = np.bincount(eleIndices, minlength=len(eleKeys)).tolist()
+			nAtoms, composition = len(eleIndices), tuple( sorted(zip(eleKeys,counts)) )
+
+		lattParams = None if self.lattParams is None else tuple( round(x,decimals) for x in self.getLattParamsList() )
+		lattAngles = None if self.lattAngles is None else tuple( round(x,decimals) for x in self.getLattAnglesList() )
+		return (nAtoms, composition, lattParams, lattAngles)
+
 
 	def toDict(self):
 		outDict = dict()
@@ -144,9 +191,9 @@ class UnitCell():
 		return outObj
 
 	@classmethod
-	def fromLattVects(cls, lattVectors:"iterable, len=3", fractCoords = None):
+	def fromLattVects(cls, lattVectors:"iterable, len=3", fractCoords = None, **kwargs):
 		lattParams, lattAngles = lattParamsAndAnglesFromLattVects(lattVectors)
-		outObj = cls(lattParams=lattParams, lattAngles = lattAngles)
+		outObj = cls(lattParams=lattParams, lattAngles = lattAngles, **kwargs)
 		if fractCoords is not None:
 			finalLattVects = outObj.lattVects
 			transFractCoords = _getTransformedFractCoordsWithElements(lattVectors, finalLattVects, fractCoords)
@@ -171,10 +218,13 @@ class UnitCell():
 
 	@property
 	def fractCoords(self):
-		if ( (self._fractCoords is None) or (self._elementList is None) ):
+		eleList = self._getElementList()
+		if ( (self._fractCoords is None) or (eleList is None) ):
 			return None
+		if self._useArrayStorage:
+			return _getCoordListWithElements(self._fractCoords.tolist(), eleList)
 		outList = list()
-		for fCoords, element in it.zip_longest(self._fractCoords, self._elementList):
+		for fCoords, element in it.zip_longest(self._fractCoords, eleList):
 			tempList = list(fCoords)
 			tempList.append(element)
 			outList.append(tempList)
@@ -187,9 +237,110 @@ class UnitCell():
 		for x in list(value):
 			fCoords.append(list(x[:3]))
 			eList.append(x[3])
-		self._elementList = eList
-		self._fractCoords = fCoords
+		self._setElementList(eList)
+		self._setFractCoordsNoElements(fCoords)
+
+	@property
+	def fractCoordsArray(self):
+		""" (nx3 read-only numpy array) Fractional co-ordinates without element symbols. This is a view (no copy) of the stored data when useArrayStorage=True """
+		if self._fractCoords is None:
+			return None
+		outArray = np.asarray(self._fractCoords, dtype=np.float64).reshape(-1,3).view()
+		outArray.flags.writeable = False
+		return outArray
+
+	@property
+	def cartCoordsArray(self):
+		""" (nx3 read-only numpy array) Cartesian co-ordinates without element symbols """
+		fractArray = self.fractCoordsArray
+		if fractArray is None:
+			return None
+		outArray = np.dot(fractArray, self._getLattVectsAndInverse()[0])
+		outArray.flags.writeable = False
+		return outArray
+
+	@property
+	def lattVectsArray(self):
+		""" (3x3 read-only numpy array) Lattice vectors; each row is one vector """
+		outArray = self._getLattVectsAndInverse()[0].view()
+		outArray.flags.writeable = False
+		return outArray
+
+	@property
+	def elementIndicesArray(self):
+		""" (len-n read-only numpy int array) Index of each atoms element in self.elementKeys """
+		eleKeys, eleIndices = self._getInternedElements()
+		if eleIndices is None:
+			return None
+		outArray = eleIndices.view()
+		outArray.flags.writeable = False
+		return outArray
+
+	@property
+	def elementKeys(self):
+		""" (list of str) Unique element keys, in order of first appearance in the geometry """
+		eleKeys, eleIndices = self._getInternedElements()
+		return None if eleKeys is None else list(eleKeys)
+
+	@property
+	def useArrayStorage(self):
+		return self._useArrayStorage
+
+	@useArrayStorage.setter
+	def useArrayStorage(self, value):
+		fractCoords, eleList = self._fractCoords, self._getElementList()
+		self._useArrayStorage = bool(value)
+		self._fractCoords, self._elementList = None, None
+		self._eleKeys, self._eleIndices = None, None
+		if fractCoords is not None:
+			fractCoords = fractCoords if self._useArrayStorage else np.asarray(fractCoords).tolist()
+		self._setFractCoordsNoElements(fractCoords)
+		self._setElementList(eleList)
+
+	def setFractCoordsFromArrays(self, fractCoords:"nx3 array", elementList:"len-n iter of str"):
+		""" Set fractional co-ordinates from a co-ordinate array and separate element list. Avoids building a [x,y,z,Element] list for each atom
+		
+		Args:
+			fractCoords: (nx3 iter) Fractional co-ordinates
+			elementList: (len-n iter of str) Element key for each atom
+				 
+		"""
+		fractCoords = np.asarray(fractCoords, dtype=np.float64).reshape(-1,3)
+		if len(elementList) != fractCoords.shape[0]:
+			raise ValueError("Got {} co-ordinates but {} elements".format(fractCoords.shape[0], len(elementList)))
+		self._setFractCoordsNoElements( fractCoords if self._useArrayStorage else fractCoords.tolist() )
+		self._setElementList(elementList)
+
+	def _setFractCoordsNoElements(self, fractCoords):
+		if (fractCoords is None) or (not self._useArrayStorage):
+			self._fractCoords = fractCoords
+		else:
+			self._fractCoords = np.array(fractCoords, dtype=np.float64).reshape(-1,3)
+
+	def _setElementList(self, eleList):
+		if not self._useArrayStorage:
+			self._elementList = None if eleList is None else list(eleList)
+		elif eleList is None:
+			self._eleKeys, self._eleIndices = None, None
+		else:
+			self._eleKeys, self._eleIndices = _getInternedEleKeysAndIndices(eleList)
+
+	def _getElementList(self):
+		if not self._useArrayStorage:
+			return self._elementList
+		if self._eleIndices is None:
+			return None
+		return [self._eleKeys[idx] for idx in self._eleIndices.tolist()]
 
+	def _getInternedElements(self):
+		if self._useArrayStorage:
+			return self._eleKeys, self._eleIndices
+		if self._elementList is None:
+			return None, None
+		return _getInternedEleKeysAndIndices(self._elementList)
+
+	def _fractCoordsAreSet(self):
+		return (self._fractCoords is not None) and (self._getElementList() is not None)
 
 	@property
 	def cartCoords(self):
@@ -197,8 +348,10 @@ class UnitCell():
 
 	@cartCoords.setter
 	def cartCoords(self, value: "list of [x,y,z,Element]"):
-		fractCoords = getFractCoordsFromCartCoords(self.lattVects,value)
-		self.fractCoords = fractCoords
+		value = list(value)
+		unused, invLattVects = self._getLattVectsAndInverse()
+		cartArray = np.array([x[:3] for x in value], dtype=np.float64).reshape(-1,3)
+		self.setFractCoordsFromArrays( np.dot(cartArray, invLattVects), [x[-1] for x in value] )
 
 	@property
 	def volume(self):
@@ -212,11 +365,14 @@ class UnitCell():
 		scaleFactor = (newVolOverAngular / currVolOverAngular)**(1/3)
 		for key in self.lattParams.keys():
 			self.lattParams[key] *= scaleFactor
+		self._lattCache = None
 
 	#Note that a getter is still exposed for use of keywords (e.g. disabling error checks)
 	@property
 	def lattVects(self):
-		return self.getLattVects(putCAlongZ=self.putCAlongZ)
+		if self.putCAlongZ:
+			return self.getLattVects(putCAlongZ=True)
+		return self._getLattCache()["lattVects"].tolist()
 
 	@lattVects.setter
 	def lattVects(self, value):
@@ -235,10 +391,11 @@ class UnitCell():
 			raise ValueError("Can only set lattParams using a dict")
 		oldLattVects = self.lattVects
 		self._lattParams = dict(value)
+		self._lattCache = None
 		newLattVects = self.lattVects
 
-		if (self.fractCoords is not None) and (self.fractCoords!=list()):
-			self._fractCoords = getTransformedFractCoords(oldLattVects, newLattVects, self._fractCoords)
+		if self._fractCoordsAreSet() and (len(self._fractCoords)>0):
+			self._setFractCoordsNoElements( getTransformedFractCoords(oldLattVects, newLattVects, self._fractCoords) )
 
 	@property
 	def lattAngles(self):
@@ -251,10 +408,11 @@ class UnitCell():
 			raise ValueError("Can only set lattAngles using a dict")
 		oldLattVects = self.lattVects
 		self._lattAngles = dict(value)
+		self._lattCache = None
 		newLattVects = self.lattVects
 
-		if self.fractCoords is not None:
-			self._fractCoords = getTransformedFractCoords(oldLattVects, newLattVects, self._fractCoords)
+		if self._fractCoordsAreSet():
+			self._setFractCoordsNoElements( getTransformedFractCoords(oldLattVects, newLattVects, self._fractCoords) )
 
 
 	#Non-property Setter Functions
@@ -268,7 +426,10 @@ class UnitCell():
 
 
 	def _getCartCoords(self,sort=False):
-		cartCoords = getCartCoordsFromFractCoords(self.lattVects, self.fractCoords)
+		if self._useArrayStorage and self._fractCoordsAreSet():
+			cartCoords = _getCoordListWithElements(self.cartCoordsArray.tolist(), self._getElementList())
+		else:
+			cartCoords = getCartCoordsFromFractCoords(self.lattVects, self.fractCoords)
 		if sort is False:
 			return cartCoords
 
@@ -287,6 +448,24 @@ class UnitCell():
 		return outputCartCoords
 
 
+	def _getLattCache(self):
+		""" Lattice vectors (3x3 array), their inverse and the cell volume. Recalculated only after the cell shape changes """
+		lattParams, lattAngles = self.getLattParamsList(), self.getLattAnglesList()
+		cacheKey = (tuple(lattParams), tuple(lattAngles))
+		#The key check guards against in-place edits of the lattParams/lattAngles dicts
+		if (self._lattCache is None) or (self._lattCache["key"] != cacheKey):
+			lattVects = np.array( lattParamsAndAnglesToLattVects(lattParams, lattAngles, testInverse=self.testLattVectInverse) )
+			self._lattCache = {"key":cacheKey, "lattVects":lattVects, "invLattVects":np.linalg.inv(lattVects),
+			                   "volume":self.calcVolumeFromLattParamsAngles(self.lattParams, self.lattAngles)}
+		return self._lattCache
+
+	def _getLattVectsAndInverse(self):
+		if self.putCAlongZ:
+			lattVects = np.array(self.lattVects)
+			return lattVects, np.linalg.inv(lattVects)
+		lattCache = self._getLattCache()
+		return lattCache["lattVects"], lattCache["invLattVects"]
+
 	#Non-property Getter Functions
 	def getLattParamsList(self):
 		return [self.lattParams["a"], self.lattParams["b"], self.lattParams["c"]]
@@ -317,7 +496,7 @@ class UnitCell():
 
 	def getVolume(self):
 		if (self.lattParams is not None) and (self.lattAngles is not None):
-			return self.calcVolumeFromLattParamsAngles(self.lattParams, self.lattAngles)
+			return self._getLattCache()["volume"]
 		else:
 			raise ValueError("UnitCell.getVolume() failed since either self.lattParams or self.lattAngles"
 			                 "are undefined for current object")
@@ -337,10 +516,12 @@ class UnitCell():
 	def convAngToBohr(self):
 		for key in self.lattParams.keys():
 			self.lattParams[key] *= ANG_TO_BOHR
+		self._lattCache = None
 
 	def convBohrToAng(self):
 		for key in self.lattParams.keys():
 			self.lattParams[key] *= (1/ANG_TO_BOHR)
+		self._lattCache = None
 
 
 	#TODO: Eventually this needs to be removed. It can be accesed through a function in parseCastep at current
@@ -434,6 +615,17 @@ def lattParamsAndAnglesToLattVects(lattParams:"[a,b,c]", lattAngles:"[alpha,beta
 
 	return lattVects
 
+def _getCoordListWithElements(coords:"list of [x,y,z]", eleList):
+	for currCoords, ele in zip(coords,eleList):
+		currCoords.append(ele)
+	return coords
+
+def _getInternedEleKeysAndIndices(eleList):
+	""" Returns a list of unique element keys (in order of first appearance) and a numpy array containing the index of each input element in that list """
+	keyToIdx = dict()
+	eleIndices = np.array([keyToIdx.setdefault(ele, len(keyToIdx)) for ele in eleList], dtype=np.intp)
+	return list(keyToIdx.keys()), eleIndices
+
 def getCartCoordsFromFractCoords(lattVects, fractCoords):
 	coordsOnly = [x[:3] for x in fractCoords]
 	cartCoords = _getCartCoordsFromFract_NoElement(lattVects, coordsOnly)
@@ -580,7 +772,7 @@ def applyTranslationVectorToFractionalCoords(inpCell, tVect, foldInAfter=False):
 	#OPTIMISED VERSION: We directly access _fractCoords and work with that, since access through the property is slow (and means we have to deal with the element symbols). This was about 4x as fast
 	useFractCoords = np.array(inpCell._fractCoords)
 	useFractCoords = np.add(useFractCoords, tVect)
-	inpCell._fractCoords = useFractCoords.tolist()
+	inpCell._setFractCoordsNoElements( useFractCoords if inpCell.useArrayStorage else useFractCoords.tolist() )
 
 	if foldInAfter:
 		foldAtomicPositionsIntoCell(inpCell)
@@ -597,16 +789,10 @@ def applyTranslationVectorToCartCoords(inpCell, tVect, foldInAfter=False):
 		Nothing. Acts in place.
  
 	"""
-	startCartCoords = inpCell.cartCoords
-	outCartCoords = list()
-	for cCoord in startCartCoords:
-		currCoord = [x+t for x,t in it.zip_longest(cCoord[:3],tVect)] + [cCoord[-1]]
-		outCartCoords.append( currCoord )
-	
-	inpCell.cartCoords = outCartCoords
-
-	if foldInAfter:
-		foldAtomicPositionsIntoCell(inpCell)
+	#A cartesian translation is just a fractional translation of tVect*inv(lattVects); avoids converting every atom to cartesian and back
+	unused, invLattVects = inpCell._getLattVectsAndInverse()
+	fractTVect = np.dot( np.array(tVect, dtype=np.float64), invLattVects )
+	applyTranslationVectorToFractionalCoords(inpCell, fractTVect, foldInAfter=foldInAfter)
 
 def getDensityFromUCellObj(uCellObj, massDict=None, lenConvFactor=1):
 	""" Calculate the density in units of g/length**3 for a UnitCell object. If you want different mass units, then passing your own massDict is a way to do it
@@ -624,14 +810,53 @@ def getDensityFromUCellObj(uCellObj, massDict=None, lenConvFactor=1):
 	massDict = massDict if massDict is not None else getEleKeyToMassDictStandard()
 	totalMass = 0
 	volume = uCellObj.volume*(lenConvFactor**3)
-	for cartCoord in uCellObj.cartCoords:
-		eleKey = cartCoord[-1]
+	for eleKey in uCellObj._getElementList():
 		totalMass += massDict[eleKey.capitalize()]/uConv.AVOGADRO_NUMBER
 
 	outDensity = totalMass/volume
 	return outDensity
 
 
+def groupUnitCellsByFingerprint(inpCells, decimals=2):
+	""" Split a collection of UnitCell objects into buckets of (potentially) equal cells, so that full comparisons are only needed within each bucket
+	
+	Args:
+		inpCells: (iter of UnitCell objects)
+		decimals: (int) Passed to UnitCell.getFingerprint
+			 
+	Returns
+		 outDict: (dict) Keys are fingerprints, values are lists of indices into inpCells
+ 
+	"""
+	outDict = dict()
+	for idx,cell in enumerate(inpCells):
+		outDict.setdefault( cell.getFingerprint(decimals=decimals), list() ).append(idx)
+	return outDict
+
+
+def getIndicesOfUniqueUnitCells(inpCells, periodic=False, decimals=2):
+	""" Get indices of the first occurrence of each distinct cell in a collection. Cells are first bucketed by fingerprint, so only cells within the same bucket are compared directly
+	
+	Args:
+		inpCells: (iter of UnitCell objects)
+		periodic: (Bool) Passed to UnitCell.isEquivalentTo
+		decimals: (int) Passed to UnitCell.getFingerprint
+			 
+	Returns
+		 outIndices: (list of ints) Sorted indices of unique cells
+ 
+	"""
+	inpCells = list(inpCells)
+	outIndices = list()
+	for bucketIndices in groupUnitCellsByFingerprint(inpCells, decimals=decimals).values():
+		uniqueInBucket = list()
+		for idx in bucketIndices:
+			if not any( [inpCells[idx].isEquivalentTo(inpCells[x], periodic=periodic) for x in uniqueInBucket] ):
+				uniqueInBucket.append(idx)
+		outIndices.extend(uniqueInBucket)
+	return sorted(outIndices)
+
+
 def moveIndicesToTopOfGeomForUnitCell(inpCell, inpIndices):
 	""" Re-arranges co-ordinates to put certain indices on top. Original use-case is putting all indices involving collective vars at the top of the geometry
 	
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import unittest.mock as mock
+
+import plato_pylib.shared.parse_cache as tCode
+
+
+class TestParsedFileCache(unittest.TestCase):
+
+	def setUp(self):
+		self.workDir = tempfile.mkdtemp(prefix=os.path.basename(__file__))
+		self.cacheDir = os.path.join(self.workDir, "cache")
+		self.maxSizeBytes = int(1e6)
+		self.useContentHash = False
+		self.inpPathA = os.path.join(self.workDir, "file_a.out")
+		self.inpPathB = os.path.join(self.workDir, "file_b.out")
+		for inpPath in [self.inpPathA, self.inpPathB]:
+			self._writeFile(inpPath, "contents of {}".format(os.path.basename(inpPath)))
+		self.parseFunct = mock.Mock(side_effect=lambda inpPath, *args, **kwargs: {"path":inpPath, "args":args, "kwargs":kwargs})
+		self.createTestObjs()
+
+	def tearDown(self):
+		shutil.rmtree(self.workDir)
+
+	def createTestObjs(self):
+		self.testObjA = tCode.ParsedFileCache(self.cacheDir, maxSizeBytes=self.maxSizeBytes, useContentHash=self.useContentHash)
+
+	def _writeFile(self, inpPath, fileStr):
+		with open(inpPath,"wt") as f:
+			f.write(fileStr)
+
+	def testSecondCallLoadedFromCache(self):
+		expDict = {"path":self.inpPathA, "args":tuple(), "kwargs":dict()}
+		cachedFunct = self.testObjA.getCachedParseFunct(self.parseFunct)
+		actDictA = cachedFunct(self.inpPathA)
+		actDictB = cachedFunct(self.inpPathA)
+		self.assertEqual(expDict, actDictA)
+		self.assertEqual(expDict, actDictB)
+		self.parseFunct.assert_called_once_with(self.inpPathA)
+
+	def testCacheSharedBetweenInstances(self):
+		self.testObjA.parseFile(self.parseFunct, self.inpPathA)
+		self.createTestObjs()
+		self.testObjA.parseFile(self.parseFunct, self.inpPathA)
+		self.assertEqual(1, self.parseFunct.call_count)
+
+	def testDifferentKwargsParsedSeparately(self):
+		self.testObjA.parseFile(self.parseFunct, self.inpPathA, startGeomIdx=1)
+		actDict = self.testObjA.parseFile(self.parseFunct, self.inpPathA, startGeomIdx=0)
+		self.assertEqual(2, self.parseFunct.call_count)
+		self.assertEqual({"startGeomIdx":0}, actDict["kwargs"])
+
+	def testModifiedFileReparsed(self):
+		self.testObjA.parseFile(self.parseFunct, self.inpPathA)
+		self._writeFile(self.inpPathA, "new longer contents of the file")
+		self.testObjA.parseFile(self.parseFunct, self.inpPathA)
+		self.assertEqual(2, self.parseFunct.call_count)
+
+	def testContentHashChangesKeyForSameSizeAndMtime(self):
+		self.useContentHash = True
+		self.createTestObjs()
+		origStats = os.stat(self.inpPathA)
+		keyA = self.testObjA.getCacheKey(self.parseFunct, self.inpPathA)
+		self._writeFile(self.inpPathA, "contents of file_A.out")
+		os.utime(self.inpPathA, ns=(origStats.st_atime_ns, origStats.st_mtime_ns))
+		keyB = self.testObjA.getCacheKey(self.parseFunct, self.inpPathA)
+		self.assertNotEqual(keyA, keyB)
+
+	def testLeastRecentlyUsedEvicted(self):
+		self.testObjA.parseFile(self.parseFunct, self.inpPathA)
+		entrySize = sum([os.path.getsize(os.path.join(self.cacheDir,x)) for x in os.listdir(self.cacheDir)])
+		self.testObjA.maxSizeBytes = int(1.5*entrySize)
+
+		#Make A older than B, then make B the newer one; A should be evicted when B is added
+		self._setAllCacheEntryTimes(time.time()-100)
+		self.testObjA.parseFile(self.parseFunct, self.inpPathB)
+		self.assertEqual(1, len(os.listdir(self.cacheDir)))
+		self.testObjA.parseFile(self.parseFunct, self.inpPathB)
+		self.assertEqual(2, self.parseFunct.call_count)
+
+	def _setAllCacheEntryTimes(self, inpTime):
+		for fileName in os.listdir(self.cacheDir):
+			os.utime(os.path.join(self.cacheDir,fileName), (inpTime,inpTime))
+
+	def testErrorsNotCached(self):
+		self.parseFunct.side_effect = ValueError("fake parse error")
+		with self.assertRaises(ValueError):
+			self.testObjA.parseFile(self.parseFunct, self.inpPathA)
+		self.assertEqual(list(), os.listdir(self.cacheDir))
+
+	def testTempFileRemovedWhenWriteFails(self):
+		self.parseFunct.side_effect = lambda inpPath: {"unpicklable":lambda x:x}
+		with self.assertRaises(Exception):
+			self.testObjA.parseFile(self.parseFunct, self.inpPathA)
+		self.assertEqual(list(), os.listdir(self.cacheDir))
+
+	def testClearRemovesEntries(self):
+		self.testObjA.parseFile(self.parseFunct, self.inpPathA)
+		self.testObjA.clear()
+		self.assertEqual(list(), os.listdir(self.cacheDir))
+
+
+if __name__ == '__main__':
+	unittest.main()
+
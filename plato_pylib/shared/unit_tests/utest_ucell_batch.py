@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+
+import copy
+import itertools as it
+import unittest
+
+import numpy as np
+
+import plato_pylib.shared.ucell_class as uCellHelp
+import plato_pylib.shared.ucell_batch as tCode
+
+
+class TestUnitCellBatch(unittest.TestCase):
+
+	def setUp(self):
+		self.lattParamsA, self.lattAnglesA = [3,4,5], [90,90,90]
+		self.lattParamsB, self.lattAnglesB = [3,3,6], [90,90,120]
+		self.fractCoordsA = [ [0.1,0.2,0.3,"Mg"],
+		                      [0.5,0.6,0.7,"O"] ]
+		self.fractCoordsB = [ [0.2,0.2,0.2,"Mg"],
+		                      [1.5,-0.4,0.7,"O"] ]
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		self.cellA = uCellHelp.UnitCell(lattParams=self.lattParamsA, lattAngles=self.lattAnglesA)
+		self.cellA.fractCoords = self.fractCoordsA
+		self.cellB = uCellHelp.UnitCell(lattParams=self.lattParamsB, lattAngles=self.lattAnglesB)
+		self.cellB.fractCoords = self.fractCoordsB
+		self.testObjA = tCode.UnitCellBatch.fromUnitCells([self.cellA, self.cellB])
+
+	def testShapes(self):
+		self.assertEqual(2, len(self.testObjA))
+		self.assertEqual(2, self.testObjA.nAtoms)
+		self.assertEqual((2,3,3), self.testObjA.lattVects.shape)
+		self.assertEqual((2,2,3), self.testObjA.fractCoords.shape)
+
+	def testToAndFromUnitCellsConsistent(self):
+		expCells = [self.cellA, self.cellB]
+		actCells = self.testObjA.toUnitCells()
+		self.assertEqual(expCells, actCells)
+
+	def testGetItem(self):
+		self.assertEqual(self.cellB, self.testObjA[1])
+		self.assertEqual([self.cellB], self.testObjA[1:].toUnitCells())
+
+	def testGetItemNegativeIndex(self):
+		self.assertEqual(self.cellB, self.testObjA[-1])
+		self.assertEqual(self.cellA, self.testObjA[-2])
+
+	def testGetItemRaisesIndexErrorWhenOutOfRange(self):
+		with self.assertRaises(IndexError):
+			self.testObjA[2]
+		with self.assertRaises(IndexError):
+			self.testObjA[-3]
+
+	def testVolumes(self):
+		expVols = [self.cellA.volume, self.cellB.volume]
+		self.assertTrue( np.allclose(np.array(expVols), self.testObjA.volumes) )
+
+	def testDensities(self):
+		expVals = [uCellHelp.getDensityFromUCellObj(x) for x in [self.cellA,self.cellB]]
+		self.assertTrue( np.allclose(np.array(expVals), self.testObjA.getDensities()) )
+
+	def testCartCoords(self):
+		expCoords = [ [x[:3] for x in cell.cartCoords] for cell in [self.cellA,self.cellB] ]
+		self.assertTrue( np.allclose(np.array(expCoords), self.testObjA.cartCoords) )
+
+	def testCartCoordsSetterConsistentWithGetter(self):
+		expFractCoords = copy.deepcopy(self.testObjA.fractCoords)
+		self.testObjA.cartCoords = self.testObjA.cartCoords
+		self.assertTrue( np.allclose(expFractCoords, self.testObjA.fractCoords) )
+
+	def testFoldAtomicPositionsIntoCell(self):
+		uCellHelp.foldAtomicPositionsIntoCell(self.cellB)
+		self.testObjA.foldAtomicPositionsIntoCell()
+		self.assertEqual([self.cellA, self.cellB], self.testObjA.toUnitCells())
+
+	def testFromUnitCellsRaisesForDifferentElements(self):
+		self.cellB.fractCoords = [ x[:3] + ["X"] for x in self.fractCoordsB ]
+		with self.assertRaises(ValueError):
+			tCode.UnitCellBatch.fromUnitCells([self.cellA, self.cellB])
+
+
+if __name__ == '__main__':
+	unittest.main()
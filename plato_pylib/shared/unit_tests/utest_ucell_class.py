@@ -523,6 +523,187 @@ class TestMoveIndicesToTopOfGeom(unittest.TestCase):
 		self.assertEqual(expGeom, actGeom)
 
 
+class TestLattVectCache(unittest.TestCase):
+
+	def setUp(self):
+		self.lattParams, self.lattAngles = [2,3,4], [90,90,120]
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		self.testCellA = tCode.UnitCell(lattParams=self.lattParams, lattAngles=self.lattAngles)
+
+	def _getExpLattVects(self):
+		return tCode.lattParamsAndAnglesToLattVects(self.testCellA.getLattParamsList(), self.testCellA.getLattAnglesList())
+
+	def _checkLattVectsMatch(self, expVects, actVects):
+		self.assertTrue( np.allclose(np.array(expVects), np.array(actVects)) )
+
+	@mock.patch("plato_pylib.shared.ucell_class.lattParamsAndAnglesToLattVects")
+	def testLattVectsOnlyCalculatedOnce(self, mockedGetLattVects):
+		mockedGetLattVects.side_effect = lambda *args,**kwargs: [[1,0,0],[0,1,0],[0,0,1]]
+		self.testCellA.lattVects
+		self.testCellA.lattVects
+		self.testCellA.volume
+		self.assertEqual(1, mockedGetLattVects.call_count)
+
+	@mock.patch("plato_pylib.shared.ucell_class.lattParamsAndAnglesToLattVects")
+	def testInverseTestCanBeDisabled(self, mockedGetLattVects):
+		mockedGetLattVects.side_effect = lambda *args,**kwargs: [[1,0,0],[0,1,0],[0,0,1]]
+		self.testCellA.testLattVectInverse = False
+		self.testCellA.lattVects
+		self.assertFalse( mockedGetLattVects.call_args[1]["testInverse"] )
+
+	def testModifyingReturnedLattVectsDoesntAlterCell(self):
+		expVects = self._getExpLattVects()
+		actVects = self.testCellA.lattVects
+		actVects[0][0] = 200
+		self._checkLattVectsMatch(expVects, self.testCellA.lattVects)
+
+	def testCacheInvalidatedByLattParamSetter(self):
+		self.testCellA.lattVects
+		self.testCellA.setLattParams([4,5,6])
+		self._checkLattVectsMatch(self._getExpLattVects(), self.testCellA.lattVects)
+
+	def testCacheInvalidatedByLattAngleSetter(self):
+		self.testCellA.lattVects
+		self.testCellA.setLattAngles([90,90,90])
+		self._checkLattVectsMatch(self._getExpLattVects(), self.testCellA.lattVects)
+		self.assertAlmostEqual(24, self.testCellA.volume)
+
+	def testCacheInvalidatedByUnitConversion(self):
+		expVolume = self.testCellA.volume*(tCode.ANG_TO_BOHR**3)
+		self.testCellA.convAngToBohr()
+		self.assertAlmostEqual(expVolume, self.testCellA.volume)
+		self._checkLattVectsMatch(self._getExpLattVects(), self.testCellA.lattVects)
+
+	def testCacheInvalidatedByVolumeSetter(self):
+		self.testCellA.volume = 50
+		self.assertAlmostEqual(50, self.testCellA.volume)
+		self._checkLattVectsMatch(self._getExpLattVects(), self.testCellA.lattVects)
+
+	def testCacheInvalidatedByInPlaceDictEdit(self):
+		self.testCellA.lattVects
+		self.testCellA.lattParams["a"] = 7
+		self.assertAlmostEqual(7, self.testCellA.lattVects[0][0])
+
+
+class TestUnitCellEquality(unittest.TestCase):
+
+	def setUp(self):
+		self.lattParams, self.lattAngles = [4,4,4], [90,90,90]
+		self.fractCoordsA = [ [0.0,0.5,0.5,"Mg"],
+		                      [0.5,0.5,0.0,"O" ] ]
+		self.fractCoordsB = [ [1.0,0.5,0.5,"Mg"],
+		                      [0.5,0.5,1.0,"O" ] ]
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		self.cellA = tCode.UnitCell(lattParams=self.lattParams, lattAngles=self.lattAngles)
+		self.cellA.fractCoords = self.fractCoordsA
+		self.cellB = tCode.UnitCell(lattParams=self.lattParams, lattAngles=self.lattAngles)
+		self.cellB.fractCoords = self.fractCoordsB
+
+	def testUnequalForNonPeriodicCompare(self):
+		self.assertNotEqual(self.cellA, self.cellB)
+		self.assertFalse( self.cellA.isEquivalentTo(self.cellB) )
+
+	def testEqualForPeriodicCompare(self):
+		self.assertTrue( self.cellA.isEquivalentTo(self.cellB, periodic=True) )
+
+	def testUnequalWhenElementsDiffer(self):
+		self.fractCoordsB = [ [0.0,0.5,0.5,"Mg"],
+		                      [0.5,0.5,0.0,"Mg"] ]
+		self.createTestObjs()
+		self.assertFalse( self.cellA.isEquivalentTo(self.cellB, periodic=True) )
+
+	def testUnequalWhenNumberAtomsDiffer(self):
+		self.fractCoordsB = self.fractCoordsA[:1]
+		self.createTestObjs()
+		self.assertNotEqual(self.cellA, self.cellB)
+
+	def testEqualBetweenStorageModes(self):
+		self.cellB.fractCoords = self.fractCoordsA
+		self.cellB.useArrayStorage = True
+		self.assertEqual(self.cellA, self.cellB)
+		self.cellA.useArrayStorage = True
+		self.assertEqual(self.cellA, self.cellB)
+
+	def testFingerprintSameForEqualCells(self):
+		self.assertEqual(self.cellA.getFingerprint(), self.cellB.getFingerprint())
+		expFingerprint = (2, (("Mg",1),("O",1)), (4.0,4.0,4.0), (90.0,90.0,90.0))
+		self.assertEqual(expFingerprint, self.cellA.getFingerprint())
+
+	def testFingerprintDiffersForDifferentLattice(self):
+		self.cellB.setLattParams([4,4,5])
+		self.assertNotEqual(self.cellA.getFingerprint(), self.cellB.getFingerprint())
+
+	def testGetIndicesOfUniqueUnitCells(self):
+		cellC = copy.deepcopy(self.cellA)
+		cellC.setLattParams([5,5,5])
+		inpCells = [self.cellA, self.cellB, cellC, copy.deepcopy(self.cellA)]
+		self.assertEqual([0,1,2], tCode.getIndicesOfUniqueUnitCells(inpCells))
+		self.assertEqual([0,2], tCode.getIndicesOfUniqueUnitCells(inpCells, periodic=True))
+
+
+class TestArrayStorage(unittest.TestCase):
+
+	def setUp(self):
+		self.lattParams, self.lattAngles = [10,10,10], [90,90,90]
+		self.fractCoords = [ [0.1,0.2,0.3,"Mg"],
+		                     [0.4,0.5,0.6,"O"],
+		                     [0.7,0.8,0.9,"Mg"] ]
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		currKwargs = {"lattParams":self.lattParams, "lattAngles":self.lattAngles}
+		self.listCell = tCode.UnitCell(**currKwargs)
+		self.listCell.fractCoords = self.fractCoords
+		self.arrayCell = tCode.UnitCell(useArrayStorage=True, **currKwargs)
+		self.arrayCell.fractCoords = self.fractCoords
+
+	def testFractCoordsGetterMatchesListStorage(self):
+		self.assertEqual(self.listCell, self.arrayCell)
+		self.assertEqual(self.listCell.fractCoords, self.arrayCell.fractCoords)
+
+	def testCartCoordsGetterMatchesListStorage(self):
+		expCoords, actCoords = self.listCell.cartCoords, self.arrayCell.cartCoords
+		for exp,act in it.zip_longest(expCoords,actCoords):
+			[self.assertAlmostEqual(e,a) for e,a in it.zip_longest(exp[:3],act[:3])]
+			self.assertEqual(exp[-1],act[-1])
+
+	def testFractCoordsArrayIsReadOnlyView(self):
+		actArray = self.arrayCell.fractCoordsArray
+		self.assertTrue( np.shares_memory(actArray, self.arrayCell._fractCoords) )
+		with self.assertRaises(ValueError):
+			actArray[0,0] = 2.0
+
+	def testCartCoordsArrayExpectedVals(self):
+		expArray = np.array([x[:3] for x in self.fractCoords])*10
+		self.assertTrue( np.allclose(expArray, self.arrayCell.cartCoordsArray) )
+		self.assertTrue( np.allclose(expArray, self.listCell.cartCoordsArray) )
+
+	def testInternedElements(self):
+		self.assertEqual(["Mg","O"], self.arrayCell.elementKeys)
+		self.assertEqual([0,1,0], self.arrayCell.elementIndicesArray.tolist())
+
+	def testSwitchingStorageModeKeepsCell(self):
+		self.listCell.useArrayStorage = True
+		self.assertTrue( isinstance(self.listCell._fractCoords, np.ndarray) )
+		self.assertEqual(self.arrayCell, self.listCell)
+		self.arrayCell.useArrayStorage = False
+		self.assertEqual(self.fractCoords, self.arrayCell.fractCoords)
+
+	def testLattParamSetterKeepsFractCoords(self):
+		self.arrayCell.setLattParams([20,20,20])
+		self.assertTrue( isinstance(self.arrayCell._fractCoords, np.ndarray) )
+		self.assertTrue( np.allclose(np.array([x[:3] for x in self.fractCoords]), self.arrayCell.fractCoordsArray) )
+
+	def testSetFractCoordsFromArrays(self):
+		testCell = tCode.UnitCell(lattParams=self.lattParams, lattAngles=self.lattAngles, useArrayStorage=True)
+		testCell.setFractCoordsFromArrays( np.array([x[:3] for x in self.fractCoords]), [x[-1] for x in self.fractCoords] )
+		self.assertEqual(self.listCell, testCell)
+
+
 if __name__ == '__main__':
 	unittest.main()
 
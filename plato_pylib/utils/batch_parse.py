@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+
+import glob
+import os
+import pickle
+import traceback
+from concurrent import futures
+
+from plato_pylib.shared import custom_errors as errorHelp
+from plato_pylib.parseOther.parse_castep_files import parseCastepOutfile
+from plato_pylib.plato.parse_plato_out_files import parsePlatoOutFile
+from plato_pylib.parseOther.parse_cp2k_files import parseCpout
+
+
+FILE_TYPE_TO_PARSER = { "castep":parseCastepOutfile,
+                        "cp2k": parseCpout,
+                        "plato": parsePlatoOutFile }
+
+FILE_EXT_TO_FILE_TYPE = { ".castep":"castep",
+                          ".cpout":"cp2k",
+                          ".out":"plato" }
+
+
+def getFileTypeFromPath(inpPath):
+	""" Get the file type (key for FILE_TYPE_TO_PARSER) based on the extension of inpPath. Raises ValueError for unrecognised extensions """
+	fileExt = os.path.splitext(inpPath)[1]
+	try:
+		return FILE_EXT_TO_FILE_TYPE[fileExt]
+	except KeyError:
+		raise ValueError("{} does not have a recognised file extension".format(inpPath))
+
+
+def parseOutFilesInParallel(inpPaths, fileType=None, maxWorkers=None, chunkSize=1, parseKwargs=None, raiseErrors=False):
+	""" Parse a set of output files (castep/cp2k/plato) across a pool of processes. Errors in individual files are collected rather than stopping the whole batch
+
+	Args:
+		inpPaths: (iter of str, or str) Paths to the output files. A single str is treated as a glob pattern (matches are sorted)
+		fileType: (Optional, str) Key in FILE_TYPE_TO_PARSER to use for all files. Default is to pick based on each files extension (see FILE_EXT_TO_FILE_TYPE)
+		maxWorkers: (Optional, int) Max number of processes to use. Default of None means use the number of processors. Setting to 1 parses all files in this process (no pool created)
+		chunkSize: (int) Number of files sent to a worker process at once. Larger values reduce overheads when parsing many small files
+		parseKwargs: (Optional, dict) Keyword arguments passed to the parser for every file, e.g. {"ThrowIfTerminateFlagMissing":False} for cp2k
+		raiseErrors: (Bool) If True the error for the first (in order of inpPaths) file which failed to parse is raised, rather than collected. The original exception is raised whether or not a process pool is used (unless it cant be pickled, in which case PlatoPylibParseFileError is raised)
+
+	Returns
+		outDicts: (list) Parsed dict for each file, in the same order as inpPaths. Entries are None for files which failed to parse
+		errors: (dict) Keys are paths of files which failed to parse; values are the traceback strings for the error raised
+
+	"""
+	if isinstance(inpPaths, str):
+		inpPaths = sorted( glob.glob(inpPaths) )
+	inpPaths = list(inpPaths)
+	parseKwargs = dict() if parseKwargs is None else dict(parseKwargs)
+
+	#Figure out the file types in this process so bad extensions are reported per-file
+	parseArgs = list()
+	for currPath in inpPaths:
+		currType = fileType
+		if currType is None:
+			try:
+				currType = getFileTypeFromPath(currPath)
+			except ValueError:
+				currType = None
+		parseArgs.append( (currPath, currType, parseKwargs) )
+
+	if ((maxWorkers == 1) or (len(parseArgs) < 2)) and raiseErrors:
+		allResults = [(_parseSingleOutFile(x), None, None) for x in parseArgs]
+	elif (maxWorkers == 1) or (len(parseArgs) < 2):
+		allResults = [_parseSingleOutFileCatchingErrors(x) for x in parseArgs]
+	else:
+		with futures.ProcessPoolExecutor(maxWorkers) as executor:
+			allResults = list( executor.map(_parseSingleOutFileCatchingErrors, parseArgs, chunksize=chunkSize) )
+
+	outDicts, errors = list(), dict()
+	for currPath, (parsedDict, errorStr, error) in zip(inpPaths, allResults):
+		if (errorStr is not None) and raiseErrors:
+			if error is None:
+				raise errorHelp.PlatoPylibParseFileError("Failed to parse {}:\n{}".format(currPath, errorStr))
+			raise error
+		outDicts.append(parsedDict)
+		if errorStr is not None:
+			errors[currPath] = errorStr
+
+	return outDicts, errors
+
+
+def _parseSingleOutFile(parseArgs):
+	inpPath, fileType, parseKwargs = parseArgs
+	if fileType is None:
+		getFileTypeFromPath(inpPath)
+	return FILE_TYPE_TO_PARSER[fileType](inpPath, **parseKwargs)
+
+
+#Needs to be a module level function so it can be pickled for the process pool
+def _parseSingleOutFileCatchingErrors(parseArgs):
+	try:
+		parsedDict = _parseSingleOutFile(parseArgs)
+	except Exception as e:
+		return None, traceback.format_exc(), _getErrorIfPicklable(e)
+	return parsedDict, None, None
+
+
+#An exception which cant be pickled would break the process pool, so only the traceback string is returned for those
+def _getErrorIfPicklable(error):
+	try:
+		pickle.loads( pickle.dumps(error) )
+	except Exception:
+		return None
+	return error
+
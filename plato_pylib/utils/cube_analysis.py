@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+""" Analysis of volumetric (cube file) data. All functions take cubeData, which can be either the dict from parse_cube_files.parseCubeFile or a parse_cube_files.MemmappedCubeGrid. Lengths are in whatever units the cube file uses (bohr for standard cube files) """
+
+import itertools as it
+
+import numpy as np
+import scipy.ndimage
+
+
+def getGridStepVectors(cubeData):
+	""" (3x3 array) Row i is the vector between neighbouring grid points along axis i """
+	header = _getHeader(cubeData)
+	return np.array( [header["step_x"], header["step_y"], header["step_z"]], dtype=float )
+
+
+def getPlanarAverage(cubeData, axis=2):
+	""" Average the grid over planes perpendicular to axis (e.g. axis=2 gives the average over each xy plane)
+
+	Args:
+		cubeData: (dict or MemmappedCubeGrid) The parsed cube file
+		axis: (int) 0,1,2 for x,y,z
+
+	Returns
+		positions: (len-n array) Distance of each plane from the first, along the axis
+		averages: (len-n array) Average grid value in each plane
+
+	"""
+	grid = _getGrid(cubeData)
+	otherAxes = tuple([x for x in range(3) if x!=axis])
+	averages = np.asarray(grid).mean(axis=otherAxes)
+	stepLength = np.linalg.norm( getGridStepVectors(cubeData)[axis] )
+	return np.arange(len(averages))*stepLength, averages
+
+
+def getMacroscopicAverage(planarAverages, windowLength, stepLength):
+	""" Periodic running average of a planar average over a window (typically one lattice period of the bulk material); commonly used to get band offsets/work functions from electrostatic potentials
+
+	Args:
+		planarAverages: (len-n array) e.g. the output of getPlanarAverage
+		windowLength: (float) Length of the averaging window
+		stepLength: (float) Distance between neighbouring values in planarAverages
+
+	Returns
+		macroAverages: (len-n array) Average over the window centred on each point
+
+	"""
+	planarAverages = np.asarray(planarAverages, dtype=float)
+	nVals = len(planarAverages)
+	nWindow = min( max(1, int(round(windowLength/stepLength))), nVals )
+
+	#Cumulative sums over the periodically-extended data give every window sum at once
+	startOffset = nWindow//2
+	extended = np.concatenate( [planarAverages[-startOffset:] if startOffset>0 else [], planarAverages, planarAverages[:nWindow]] )
+	cumSums = np.concatenate( [[0.0], np.cumsum(extended)] )
+	return (cumSums[nWindow:nWindow+nVals] - cumSums[:nVals]) / nWindow
+
+
+def interpolateGridValues(cubeData, points, method="linear", periodic=True):
+	""" Get values at arbitrary Cartesian points by interpolating the grid; all points are handled in single vectorised operations
+
+	Args:
+		cubeData: (dict or MemmappedCubeGrid) The parsed cube file
+		points: (nx3 array) Cartesian co-ordinates, in the same units/frame as the cube origin/step vectors
+		method: (str) "linear" for trilinear interpolation or "spline" for cubic spline interpolation
+		periodic: (Bool) If True the grid is treated as periodic (grid point n is grid point 0); else values outside the grid are found by extending the edge values
+
+	Returns
+		values: (len-n array) Interpolated values
+
+	"""
+	grid = np.asarray( _getGrid(cubeData), dtype=float )
+	gridCoords = _getGridIndexCoords(cubeData, points)
+
+	if method == "linear":
+		return _interpolateTrilinear(grid, gridCoords, periodic)
+	elif method == "spline":
+		return _interpolateSpline(grid, gridCoords, periodic)
+	else:
+		raise ValueError("method = {} is an invalid option".format(method))
+
+
+def _interpolateSpline(grid, gridCoords, periodic, wrapPad=12):
+	if not periodic:
+		return scipy.ndimage.map_coordinates(grid, gridCoords.T, order=3, mode="nearest", prefilter=True)
+
+	#Periodic images are added by padding (scipy "grid-wrap" mode needs scipy>=1.6). Edge effects in the spline prefilter decay by ~0.27 per grid point, so are negligible once wrapPad points from the edge
+	gridShape = np.array(grid.shape)
+	paddedGrid = np.pad(grid, wrapPad, mode="wrap")
+	paddedCoords = np.mod(gridCoords, gridShape) + wrapPad
+	return scipy.ndimage.map_coordinates(paddedGrid, paddedCoords.T, order=3, mode="nearest", prefilter=True)
+
+
+def integrateSpheres(cubeData, radii, centres=None, periodic=True):
+	""" Integrate the grid within spheres (e.g. to get the charge near each atom). Grid points within each sphere are found from a precomputed block of index offsets, so no loop over grid points is needed
+
+	Args:
+		cubeData: (dict or MemmappedCubeGrid) The parsed cube file
+		radii: (float or len-n iter) Sphere radius; a single value is used for all spheres
+		centres: (Optional, nx3 array) Sphere centres in Cartesian co-ordinates. Default is the atomic_coords of the cube file
+		periodic: (Bool) If True spheres crossing the grid boundary wrap around periodically; else points outside the grid are ignored
+
+	Returns
+		integrals: (len-n array) Sum of grid values within each sphere multiplied by the volume per grid point
+
+	"""
+	header, grid = _getHeader(cubeData), _getGrid(cubeData)
+	centres = np.array( header["atomic_coords"] if centres is None else centres, dtype=float ).reshape(-1,3)
+	radii = np.broadcast_to( np.asarray(radii, dtype=float), (len(centres),) )
+	stepVects = getGridStepVectors(cubeData)
+	gridShape = np.array(grid.shape)
+	volumePerPoint = abs( np.linalg.det(stepVects) )
+
+	outVals = np.zeros(len(centres))
+	offsetIndices, offsetVects = None, None
+	for idx,(centre,radius) in enumerate(zip(centres,radii)):
+		#The offset block only depends on the radius, so is reused between spheres of equal size
+		if (offsetIndices is None) or (radius != radii[idx-1]):
+			offsetIndices, offsetVects = _getGridOffsetsWithinRadius(stepVects, radius)
+
+		gridCoords = _getGridIndexCoords(cubeData, centre.reshape(1,3))[0]
+		baseIdx = np.floor(gridCoords).astype(int)
+		baseVect = (baseIdx - gridCoords) @ stepVects #Vector from centre to grid point baseIdx
+		inSphere = np.linalg.norm(offsetVects + baseVect, axis=1) <= radius
+		pointIndices = offsetIndices[inSphere] + baseIdx
+
+		if periodic:
+			pointIndices = np.mod(pointIndices, gridShape)
+		else:
+			pointIndices = pointIndices[ np.all((pointIndices>=0) & (pointIndices<gridShape), axis=1) ]
+		outVals[idx] = np.asarray(grid)[pointIndices[:,0], pointIndices[:,1], pointIndices[:,2]].sum() * volumePerPoint
+
+	return outVals
+
+
+def _getGridOffsetsWithinRadius(stepVects, radius):
+	""" Integer grid offsets (and their Cartesian vectors) which could be within radius of a point in the grid cell starting at offset (0,0,0) """
+	volume = abs(np.linalg.det(stepVects))
+	perpWidths = [ volume/np.linalg.norm(np.cross(stepVects[idxB],stepVects[idxC])) for idxB,idxC in [(1,2),(0,2),(0,1)] ]
+	maxOffsets = [ int(np.ceil(radius/width)) + 1 for width in perpWidths ]
+	offsetIndices = np.array( list(it.product(*[range(-n,n+1) for n in maxOffsets])), dtype=int )
+	offsetVects = offsetIndices @ stepVects
+
+	#Keep only offsets that could be in range for some centre in the base grid cell
+	maxCellDiag = max( [np.linalg.norm(np.array(x) @ stepVects) for x in it.product([0,1],repeat=3)] )
+	keep = np.linalg.norm(offsetVects, axis=1) <= radius + maxCellDiag
+	return offsetIndices[keep], offsetVects[keep]
+
+
+def _interpolateTrilinear(grid, gridCoords, periodic):
+	gridShape = np.array(grid.shape)
+	if not periodic:
+		gridCoords = np.clip(gridCoords, 0, gridShape-1)
+	baseIdx = np.floor(gridCoords).astype(int)
+	weights = gridCoords - baseIdx
+
+	outVals = np.zeros(len(gridCoords))
+	for corner in it.product([0,1], repeat=3):
+		cornerIndices = baseIdx + np.array(corner)
+		cornerIndices = np.mod(cornerIndices, gridShape) if periodic else np.minimum(cornerIndices, gridShape-1)
+		cornerWeights = np.prod( np.where(np.array(corner)==1, weights, 1-weights), axis=1 )
+		outVals += cornerWeights * grid[cornerIndices[:,0], cornerIndices[:,1], cornerIndices[:,2]]
+	return outVals
+
+
+def _getGridIndexCoords(cubeData, points):
+	""" Convert Cartesian points into (fractional) grid index co-ordinates """
+	header = _getHeader(cubeData)
+	points = np.array(points, dtype=float).reshape(-1,3)
+	return (points - np.array(header["origin"],dtype=float)) @ np.linalg.inv( getGridStepVectors(cubeData) )
+
+
+def _getHeader(cubeData):
+	return cubeData.header if hasattr(cubeData,"header") else cubeData
+
+
+def _getGrid(cubeData):
+	return cubeData.grid if hasattr(cubeData,"grid") else np.asarray(cubeData["data_grid"])
+
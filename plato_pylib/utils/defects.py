@@ -1,6 +1,5 @@
 
-import itertools as it
-import math
+import numpy as np
 
 
 def calcVacancyE(energyNoVac, energyVac, nAtomsOrig, nVacancies=1):
@@ -41,11 +40,6 @@ def _getStructWithVacancyFractCoords_central(coordList):
 
 
 def _getCentralIdxFractCoordList(coordList:"nx3 iter, e.g [[x1,y1,z1],[x2,y2,z2]]"):
-	center = [0.5,0.5,0.5]
-	allDists = [_distanceTwoVects(x,center) for x in coordList]
-	return allDists.index(min(allDists))
-
-
-def _distanceTwoVects(vectA:"1 dim iter", vectB:"1 dim iter"):
-	return math.sqrt(sum( [(a-b)**2 for a,b in it.zip_longest(vectA,vectB)] ))
-
+	center = np.array([0.5,0.5,0.5])
+	allDists = np.linalg.norm( np.array(coordList, dtype=float) - center, axis=1 )
+	return int(np.argmin(allDists))
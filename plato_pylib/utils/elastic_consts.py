@@ -3,6 +3,7 @@ import copy
 import itertools as it
 import numpy as np
 import plato_pylib.shared.ucell_class as UCell
+import plato_pylib.shared.ucell_batch as uCellBatch
 
 from scipy.optimize import minimize 
 #Purpose of these functions are to help calculate elastic constants
@@ -66,6 +67,29 @@ def getStrainedUnitCellStructsForUnitStrainVects(uCell:"UnitCell obj", strainPar
 	return outUCells
 
 
+def getStrainedUnitCellBatchForUnitStrainMatrix(uCell:"UnitCell obj", strainParams:"list", unitStrainMatrix):
+	""" Gets all strained geometries for a single strain matrix as one UnitCellBatch
+	
+	Lattice parameters/angles match those from getStrainedUnitCellStructsForUnitStrainVects. Fractional co-ordinates are always left unchanged (the strain
+	is homogeneous); these differ from the getStrainedUnitCellStructsForUnitStrainVects geometries for shear strains, since that path re-orients the lattice vectors
+	without rotating the strained cartesian co-ordinates along with them.
+	
+	Args:
+		uCell: (plato_pylib UnitCell object) Defines the unstrained geometry
+		strainParams: (iter of floats) The strain parameters to use; the strain matrix will be multiplied by these to get the strain to apply 
+		unitStrainMatrix: (3x3 np array) Represents the strain to apply
+			
+	Returns
+		outBatch: (UnitCellBatch) outBatch[idx] is the cell strained by unitStrainMatrix*strainParams[idx]
+	
+	"""
+	#Same transformation as _applyStrainToMatrix, applied to all strains at once. A homogeneous strain leaves fractional co-ords unchanged
+	strainMatrices = np.array([np.identity(3) + np.array(unitStrainMatrix)*sParam for sParam in strainParams])
+	strainedLattVects = np.matmul( uCell.lattVectsArray, np.transpose(strainMatrices, (0,2,1)) )
+	fractCoords = np.broadcast_to( uCell.fractCoordsArray, (len(strainParams),) + uCell.fractCoordsArray.shape )
+	return uCellBatch.UnitCellBatch(strainedLattVects, fractCoords, uCell._getElementList())
+
+
 #Common function called to apply strains to 
 def getStrainedLattVectsAndCartCoordsFromUnitStrainMatrices(lattVects, strainParams, unitStrainMatrices, cartCoords=None):
 	#TODO: Tidy this code up  (Extract method so each loop replaced with ~1 line of code)
@@ -5,9 +5,7 @@ import functools
 import numpy as np
 
 from plato_pylib.shared.ucell_class import UnitCell
-from plato_pylib.parseOther.parse_castep_files import parseCastepOutfile
-from plato_pylib.plato.parse_plato_out_files import parsePlatoOutFile
-from plato_pylib.parseOther.parse_cp2k_files import parseCpout
+from plato_pylib.utils.batch_parse import getFileTypeFromPath, parseOutFilesInParallel
 
 
 import ase.eos
@@ -37,22 +35,11 @@ def getBulkModFromOutFilesAseWrapper(outFileList, **kwargs):
 def getVolAndEnergiesForASEFromOutFileList(outFileList, **kwargs):
 	fileType = kwargs.get("fileType".lower(),None)
 	eAttr = kwargs.get("energyType".lower(), "any")
+	maxWorkers = kwargs.get("maxWorkers".lower(), 1)
 
-	#Figure out filetype/parser to use
+	#Figure out filetype to use
 	if fileType is None:
-		if outFileList[0].endswith(".castep"):
-			fileType = "castep"
-		elif outFileList[0].endswith(".cpout"):
-			fileType = "cp2k"
-		elif outFileList[0].endswith(".out"):
-			fileType = "plato"
-		else:
-			raise ValueError("{} does not have a recognised file extension".format(outFileList[0]))
-
-	fileTypeToParser = { "castep":parseCastepOutfile,
-	                     "cp2k": parseCpout,
-	                     "plato": parsePlatoOutFile}
-	parser = fileTypeToParser[fileType]
+		fileType = getFileTypeFromPath(outFileList[0])
 
 
 	#Figure out the energy/Volume conversions needed
@@ -69,8 +56,10 @@ def getVolAndEnergiesForASEFromOutFileList(outFileList, **kwargs):
 
 	#Now parse the vol vs energies
 	allEnergies, allVols = list(), list()
-	for currFile in outFileList:
-		parsedFile = parser(currFile)
+	#raiseErrors means the parsers own exception is raised whether or not files are parsed in parallel
+	allParsedFiles, unused = parseOutFilesInParallel(outFileList, fileType=fileType, maxWorkers=maxWorkers, raiseErrors=True)
+
+	for parsedFile in allParsedFiles:
 		nAtoms = parsedFile["numbAtoms"]
 		allVols.append( parsedFile["unitCell"].volume * volConv/nAtoms )
 		if eAttr=="any": 
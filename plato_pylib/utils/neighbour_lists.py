@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+import itertools as it
+import math
+
+import numpy as np
+
+
+class NeighbourList():
+	""" All pairs of atoms (including periodic images) within a cutoff. Each pair is stored both ways, so atom i's neighbours are all entries with indicesA==i. Entries are sorted by indicesA then indicesB
+
+	Attributes:
+		indicesA: (len-nPairs int array) Index of the central atom
+		indicesB: (len-nPairs int array) Index of the neighbour atom
+		shifts: (nPairs x 3 int array) Image of atom B (in units of lattice vectors); the neighbour position is cartCoords[indicesB] + shifts @ lattVects
+		vectors: (nPairs x 3 float array) Cartesian vector from atom A to the neighbour
+		distances: (len-nPairs float array) Length of each vector
+		cutOff: (float) Cutoff used to build the list
+
+	"""
+	def __init__(self, nAtoms, indicesA, indicesB, shifts, vectors, distances, cutOff):
+		self.nAtoms = nAtoms
+		self.indicesA = indicesA
+		self.indicesB = indicesB
+		self.shifts = shifts
+		self.vectors = vectors
+		self.distances = distances
+		self.cutOff = cutOff
+		self._startIndices = np.searchsorted(indicesA, np.arange(nAtoms+1))
+
+	def __len__(self):
+		return len(self.indicesA)
+
+	def getNeighbourIndicesForAtom(self, atomIdx):
+		return self.indicesB[ self._getSliceForAtom(atomIdx) ]
+
+	def getNeighbourShiftsForAtom(self, atomIdx):
+		return self.shifts[ self._getSliceForAtom(atomIdx) ]
+
+	def getNeighbourDistancesForAtom(self, atomIdx):
+		return self.distances[ self._getSliceForAtom(atomIdx) ]
+
+	def getNumbNeighbours(self):
+		""" (len-nAtoms int array) Number of neighbours for each atom """
+		return np.diff(self._startIndices)
+
+	def _getSliceForAtom(self, atomIdx):
+		return slice(self._startIndices[atomIdx], self._startIndices[atomIdx+1])
+
+
+def getNeighbourListFromUnitCell(inpCell, cutOff:float):
+	""" Gets all pairs of atoms within cutOff of each other (taking periodic images into account) using a cell list. Scales as O(n) for fixed density, and image atoms are never explicitly created
+
+	Args:
+		inpCell: (plato_pylib UnitCell object)
+		cutOff: (float) Maximum distance between neighbours (inclusive); same length units as inpCell
+
+	Returns
+		neighList: (NeighbourList object)
+
+	"""
+	if cutOff <= 0:
+		raise ValueError("cutOff must be positive; got {}".format(cutOff))
+
+	lattVects = np.array(inpCell.lattVectsArray)
+	fractCoords = np.array(inpCell.fractCoordsArray)
+	nAtoms = len(fractCoords)
+
+	#Wrap atoms into the cell; we track the integer shift so output shifts refer to the input positions
+	startShifts = np.floor(fractCoords).astype(int)
+	wrappedFract = fractCoords - startShifts
+	wrappedCart = wrappedFract @ lattVects
+
+	#Choose bins so anything within the cutoff is at most nSearch bins away along each lattice vector
+	nBins, nSearch = _getBinDimsAndSearchRange(lattVects, cutOff, nAtoms)
+	binIndices = np.minimum( (wrappedFract*nBins).astype(int), nBins-1 )
+	flatBinIds = _getFlatBinIds(binIndices, nBins)
+	sortOrder = np.argsort(flatBinIds, kind="stable")
+	binCounts = np.bincount(flatBinIds, minlength=int(np.prod(nBins)))
+	binStarts = np.cumsum(binCounts) - binCounts
+
+	allIndicesA, allIndicesB, allShifts, allVectors = list(), list(), list(), list()
+	atomIndices = np.arange(nAtoms)
+	searchRanges = [range(-n,n+1) for n in nSearch]
+	for binOffset in it.product(*searchRanges):
+		#Target bin (and the image it lies in) for every atom at once
+		targetBins = binIndices + np.array(binOffset)
+		imageShifts = np.floor_divide(targetBins, nBins)
+		targetIds = _getFlatBinIds(targetBins - imageShifts*nBins, nBins)
+		counts = binCounts[targetIds]
+		nCandidates = int(counts.sum())
+		if nCandidates == 0:
+			continue
+
+		#Expand to one entry per (atom, atom in target bin) pair
+		indicesA = np.repeat(atomIndices, counts)
+		posInBin = np.arange(nCandidates) - np.repeat(np.cumsum(counts)-counts, counts)
+		indicesB = sortOrder[ np.repeat(binStarts[targetIds], counts) + posInBin ]
+		shifts = np.repeat(imageShifts, counts, axis=0)
+		vectors = wrappedCart[indicesB] + (shifts @ lattVects) - wrappedCart[indicesA]
+		distances = np.linalg.norm(vectors, axis=1)
+
+		keep = (distances <= cutOff) & ~( (indicesA==indicesB) & np.all(shifts==0, axis=1) )
+		allIndicesA.append(indicesA[keep])
+		allIndicesB.append(indicesB[keep])
+		allShifts.append(shifts[keep])
+		allVectors.append(vectors[keep])
+
+	if len(allIndicesA) == 0:
+		emptyInts = np.zeros(0, dtype=int)
+		return NeighbourList(nAtoms, emptyInts, emptyInts, np.zeros((0,3),dtype=int), np.zeros((0,3)), np.zeros(0), cutOff)
+
+	indicesA, indicesB = np.concatenate(allIndicesA), np.concatenate(allIndicesB)
+	shifts, vectors = np.concatenate(allShifts), np.concatenate(allVectors)
+	shifts = shifts - startShifts[indicesB] + startShifts[indicesA]
+	sortOrder = np.lexsort( (indicesB, indicesA) )
+	indicesA, indicesB, shifts, vectors = indicesA[sortOrder], indicesB[sortOrder], shifts[sortOrder], vectors[sortOrder]
+
+	return NeighbourList(nAtoms, indicesA, indicesB, shifts, vectors, np.linalg.norm(vectors,axis=1), cutOff)
+
+
+def getMinimumImageVectors(inpCell, indicesA:"iter of int", indicesB:"iter of int"):
+	""" Gets the shortest vector (over all periodic images) from each atom in indicesA to the corresponding atom in indicesB
+
+	Args:
+		inpCell: (plato_pylib UnitCell object)
+		indicesA: (iter of int) Indices of the start atoms
+		indicesB: (iter of int) Indices of the end atoms; same length as indicesA
+
+	Returns
+		vectors: (nx3 np array) Cartesian vector from atom indicesA[i] to the nearest image of atom indicesB[i]
+		distances: (len-n np array) Lengths of vectors
+
+	"""
+	lattVects, fractCoords = inpCell.lattVectsArray, inpCell.fractCoordsArray
+	fractDiffs = fractCoords[np.array(indicesB,dtype=int)] - fractCoords[np.array(indicesA,dtype=int)]
+	fractDiffs = fractDiffs - np.round(fractDiffs)
+
+	#Rounding alone isnt enough for skewed cells, so also check the neighbouring images
+	images = np.array(list(it.product([-1,0,1],repeat=3)))
+	candidates = (fractDiffs[:,np.newaxis,:] + images[np.newaxis,:,:]) @ lattVects
+	candidateDists = np.linalg.norm(candidates, axis=2)
+	bestIndices = np.argmin(candidateDists, axis=1)
+	rowIndices = np.arange(len(fractDiffs))
+	return candidates[rowIndices,bestIndices], candidateDists[rowIndices,bestIndices]
+
+
+def getMinimumImageDistanceMatrix(inpCell):
+	""" Gets the (nAtoms x nAtoms) matrix of minimum image distances. Scales as O(n^2); use getNeighbourListFromUnitCell when only short distances are needed """
+	nAtoms = len(inpCell.fractCoordsArray)
+	indicesA, indicesB = np.meshgrid(np.arange(nAtoms), np.arange(nAtoms), indexing="ij")
+	unused, distances = getMinimumImageVectors(inpCell, indicesA.flatten(), indicesB.flatten())
+	return distances.reshape(nAtoms,nAtoms)
+
+
+def _getBinDimsAndSearchRange(lattVects, cutOff, nAtoms):
+	volume = abs(np.linalg.det(lattVects))
+	perpWidths = [ volume/np.linalg.norm(np.cross(lattVects[idxB],lattVects[idxC])) for idxB,idxC in [(1,2),(0,2),(0,1)] ]
+
+	#Cap on bins per dimension stops tiny cutoffs in huge cells creating mostly-empty bins
+	maxBins = max(1, int(math.ceil(nAtoms**(1/3))))
+	nBins = np.array([ min(maxBins, max(1, int(width//cutOff))) for width in perpWidths ])
+	nSearch = [ int(math.ceil(cutOff*n/width)) for n,width in zip(nBins,perpWidths) ]
+	return nBins, nSearch
+
+
+def _getFlatBinIds(binIndices, nBins):
+	return (binIndices[:,0]*nBins[1] + binIndices[:,1])*nBins[2] + binIndices[:,2]
+
@@ -2,18 +2,95 @@
 
 import copy
 import itertools as it
-import math
 import numpy as np
 import plato_pylib.shared.ucell_class as UCell
 
 
 def superCellFromUCell(unitCell, dims):
+	""" Creates a supercell by repeating unitCell dims[0], dims[1] and dims[2] times along each lattice vector. Atoms are ordered as if the cell was first expanded along a, then b, then c
+	
+	Args:
+		unitCell: plato_pylib UnitCell object
+		dims: (len 3 int iter) Number of repeats along each lattice vector
+			 
+	Returns
+		outCell: a DIFFERENT plato_pylib UnitCell object representing the supercell
+ 
+	"""
+	dims = [int(x) for x in dims]
+	startFractCoords = unitCell.fractCoordsArray
+	atomIndices, imageOffsets = _getAtomIndicesAndImageOffsetsForDims(len(startFractCoords), dims)
+	outFractCoords = (startFractCoords[atomIndices] + imageOffsets) / np.array(dims)
+
+	lattParams = [x*n for x,n in zip(unitCell.getLattParamsList(), dims)]
+	outCell = UCell.UnitCell(lattParams=lattParams, lattAngles=unitCell.getLattAnglesList(), useArrayStorage=unitCell.useArrayStorage)
+	outCell.putCAlongZ = unitCell.putCAlongZ
+	eleKeys, eleIndices = unitCell.elementKeys, unitCell.elementIndicesArray
+	outCell.setFractCoordsFromArrays(outFractCoords, [eleKeys[idx] for idx in eleIndices[atomIndices].tolist()])
+	return outCell
 
-	xShifted = _getSuperCellOneDim(unitCell,0,dims[0])
-	yShifted = _getSuperCellOneDim(xShifted,1,dims[1])
-	zShifted = _getSuperCellOneDim(yShifted,2,dims[2])
 
-	return zShifted
+def getSuperCellFromTransformMatrix(unitCell, transformMatrix:"3x3 int iter", tolerance=1e-6):
+	""" Creates a supercell whose lattice vectors are transformMatrix @ unitCell.lattVects (i.e. each new lattice vector is an integer combination of the old ones). Allows non-diagonal supercells; for diagonal matrices this gives the same cell as superCellFromUCell, though atom order differs and all atoms are folded into the new cell
+	
+	Args:
+		unitCell: plato_pylib UnitCell object
+		transformMatrix: (3x3 int iter) Row i gives the coefficients of the old lattice vectors making up new lattice vector i
+		tolerance: (float) Fractional co-ordinates in the range [-tolerance,1-tolerance) are taken to be in the new cell
+			 
+	Returns
+		outCell: a DIFFERENT plato_pylib UnitCell object representing the supercell
+ 
+	Raises:
+		ValueError: If the matrix isnt integer/is singular, or if the number of atoms found doesnt match the determinant
+	"""
+	transformMatrix = np.array(transformMatrix)
+	intMatrix = np.rint(transformMatrix).astype(int)
+	if not np.allclose(transformMatrix, intMatrix):
+		raise ValueError("transformMatrix must contain integers only; got {}".format(transformMatrix))
+	nCells = int(round(abs(np.linalg.det(intMatrix))))
+	if nCells == 0:
+		raise ValueError("transformMatrix {} is singular".format(intMatrix))
+
+	#Integer image offsets spanning the bounding box of the supercell (in units of the original lattice vectors)
+	corners = np.array(list(it.product([0,1],repeat=3))) @ intMatrix
+	offsetRanges = [np.arange(lower-1, upper+1) for lower,upper in zip(corners.min(axis=0), corners.max(axis=0))]
+	imageOffsets = np.stack(np.meshgrid(*offsetRanges, indexing="ij"), axis=-1).reshape(-1,3)
+
+	#Fractional co-ords in the new cell of every (image,atom) pair, obtained by broadcasting; keep those inside
+	startFractCoords = unitCell.fractCoordsArray
+	allFractCoords = (imageOffsets[:,np.newaxis,:] + startFractCoords[np.newaxis,:,:]) @ np.linalg.inv(intMatrix)
+	allFractCoords = allFractCoords.reshape(-1,3)
+	allAtomIndices = np.tile(np.arange(len(startFractCoords)), len(imageOffsets))
+	inCell = np.all( (allFractCoords>=-1*tolerance) & (allFractCoords<1-tolerance), axis=1 )
+	outFractCoords, atomIndices = allFractCoords[inCell], allAtomIndices[inCell]
+
+	if len(outFractCoords) != nCells*len(startFractCoords):
+		raise ValueError("Found {} atoms in supercell; expected {}".format(len(outFractCoords), nCells*len(startFractCoords)))
+
+	outFractCoords = np.where( outFractCoords<0, 0.0, outFractCoords )
+	lattParams, lattAngles = UCell.lattParamsAndAnglesFromLattVects( (intMatrix @ unitCell.lattVectsArray).tolist() )
+	outCell = UCell.UnitCell(lattParams=lattParams, lattAngles=lattAngles, useArrayStorage=unitCell.useArrayStorage)
+	outCell.putCAlongZ = unitCell.putCAlongZ
+	eleKeys, eleIndices = unitCell.elementKeys, unitCell.elementIndicesArray
+	outCell.setFractCoordsFromArrays(outFractCoords, [eleKeys[idx] for idx in eleIndices[atomIndices].tolist()])
+	return outCell
+
+
+def _getAtomIndicesAndImageOffsetsForDims(nAtoms, dims):
+	""" Returns indices of the original atom and integer image offsets for each atom in a dims[0] x dims[1] x dims[2] supercell. Order matches expanding the cell along a, then b, then c; with images appended after all the current atoms each time """
+	atomIndices = np.arange(nAtoms)
+	imageOffsets = np.zeros((nAtoms,3), dtype=int)
+	for dimIdx, multiple in enumerate(dims):
+		if multiple < 1:
+			raise ValueError("Supercell dimensions must be positive integers; got {}".format(dims))
+		nCurrent, mults = len(atomIndices), np.arange(1,multiple)
+		newOffsets = np.repeat(imageOffsets, len(mults), axis=0)
+		newOffsets[:,dimIdx] += np.tile(mults, nCurrent)
+		atomIndices = np.concatenate( [atomIndices, np.repeat(atomIndices, len(mults))] )
+		imageOffsets = np.concatenate( [imageOffsets, newOffsets] )
+	return atomIndices, imageOffsets
+
 
 def getUnitCellSurroundedByNCellsInEachDir(unitCell, nAlongA=1, nAlongB=1, nAlongC=1):
 	""" Gets the unit cell surrounded by n-images in each direction. Defaults lead to a total of 27 (3^3) merged into a single cell. Note that the original cells cartesian co-ordinates will be unchanged; meaning that most atoms will have -ve x/y/z co-ordinates
@@ -102,45 +179,3 @@ def _getCellWithImageAddedEachSide(startCell, dimIdx:"0,1,2 for x,y,z", nImages=
 	outCell.cartCoords = newCartCoords
 	return outCell
 
-def _getSuperCellOneDim(unitCell,dimIdx:"0,1,2 for x,y,z", multiple:"int, number of cells in this dimension (1 means do nothing)"):
-
-	#step 1 = get the unit-vectors for the unit-cell
-	startCellVects = copy.deepcopy(unitCell.lattVects)
-	startCellParams = unitCell.getLattParamsList()
-	unitVects = [_getUnitVectorFromVector(x) for x in startCellVects]
-	startCartCoords = unitCell.cartCoords
-
-	#Step 2 = figure out the translation vector required
-	transVector = [startCellParams[dimIdx]*x for x in unitVects[dimIdx]]
-
-	#Step 3 = Get the cartesian co-ordinates for new atoms (translate n-times from the translation vector)
-	endCartCoords = [list(x) for x in startCartCoords]
-
-	for atom in startCartCoords:
-		for mult in range(1,multiple):
-			newAtom = [x + (t*mult) for x,t in it.zip_longest(atom[:3],transVector)]
-			endCartCoords.append(newAtom + [atom[3]])
-
-	#Step 4 = Get new cell vectors
-	newCellVects = list()
-	for idx,(vect,uVect) in enumerate( it.zip_longest(startCellVects,unitVects) ):
-		if idx == dimIdx:
-			currVect = [x+(ux*(multiple-1)*startCellParams[dimIdx]) for x,ux in zip(vect,uVect)]
-		else:
-			currVect = list(vect)
-		newCellVects.append(currVect)
-
-
-	#Step 6 = Create the output object
-	outCell = UCell.UnitCell.fromLattVects( newCellVects)
-	outCell.putCAlongZ = unitCell.putCAlongZ #If this doesnt go BEFORE cart coords we get annoying transformations. Note this is a deprecated and stupid attribute regardless
-	outCell.cartCoords = endCartCoords
-
-	return outCell
-
-def _getUnitVectorFromVector(vector:"iter"):
-	lenVect = math.sqrt( sum([x**2 for x in vector]) )
-	return [x/lenVect for x in vector]
-
-
-
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import os
+import unittest
+import unittest.mock as mock
+
+import plato_pylib.shared.custom_errors as errorHelp
+import plato_pylib.utils.batch_parse as tCode
+
+from utest_parse_cp2k_files import createCP2KFullFile_fccOpt
+
+
+class TestGetFileTypeFromPath(unittest.TestCase):
+
+	def testExpectedForKnownExtensions(self):
+		expTypes = ["castep", "cp2k", "plato"]
+		actTypes = [tCode.getFileTypeFromPath(x) for x in ["a.castep", os.path.join("fake_dir","b.cpout"), "c.out"]]
+		self.assertEqual(expTypes, actTypes)
+
+	def testRaisesForUnknownExtension(self):
+		with self.assertRaises(ValueError):
+			tCode.getFileTypeFromPath("fake_file.xyz")
+
+
+class TestParseOutFilesInParallel(unittest.TestCase):
+
+	def setUp(self):
+		self.maxWorkers = 1
+		self.createTestObjs()
+
+	def tearDown(self):
+		os.remove(self.goodPath)
+
+	def createTestObjs(self):
+		self.goodPath = createCP2KFullFile_fccOpt()
+		self.missingPath = os.path.join(os.getcwd(), "fake_missing_file_batch_parse.cpout")
+		self.badExtPath = "fake_file.xyz"
+		self.inpPaths = [self.missingPath, self.goodPath, self.badExtPath, self.goodPath]
+
+	def _runTestFunct(self):
+		return tCode.parseOutFilesInParallel(self.inpPaths, maxWorkers=self.maxWorkers)
+
+	def _checkExpectedOutputs(self, outDicts, errors):
+		self.assertEqual( len(self.inpPaths), len(outDicts) )
+		self.assertEqual( [None,None], [outDicts[0], outDicts[2]] )
+		self.assertAlmostEqual( -23.943513847584764, outDicts[1]["energy"] )
+		self.assertAlmostEqual( outDicts[1]["energy"], outDicts[3]["energy"] )
+		self.assertEqual( sorted([self.missingPath, self.badExtPath]), sorted(errors.keys()) )
+
+	def testSerialCollectsErrorsInOrder(self):
+		self._checkExpectedOutputs( *self._runTestFunct() )
+
+	def testProcessPoolCollectsErrorsInOrder(self):
+		self.maxWorkers = 2
+		self._checkExpectedOutputs( *self._runTestFunct() )
+
+	def testRaiseErrorsGivesSameErrorTypeSerialAndParallel(self):
+		self.inpPaths = [self.goodPath, self.missingPath, self.goodPath]
+		for maxWorkers in [1,2]:
+			with self.assertRaises(errorHelp.PlatoPylibParseFileError):
+				tCode.parseOutFilesInParallel(self.inpPaths, maxWorkers=maxWorkers, raiseErrors=True)
+
+	def testGlobPatternExpanded(self):
+		globPattern = os.path.join( os.path.dirname(self.goodPath), "full_file_fcc_mg_opt*.cpout" )
+		outDicts, errors = tCode.parseOutFilesInParallel(globPattern, maxWorkers=1)
+		self.assertEqual(1, len(outDicts))
+		self.assertEqual(dict(), errors)
+
+	def testParseKwargsPassedToParser(self):
+		mockedParser = mock.Mock(return_value={"energy":2})
+		expKwargs = {"ThrowIfTerminateFlagMissing":False}
+		with mock.patch.dict(tCode.FILE_TYPE_TO_PARSER, {"cp2k":mockedParser}):
+			outDicts, errors = tCode.parseOutFilesInParallel([self.goodPath], maxWorkers=1, parseKwargs=expKwargs)
+		mockedParser.assert_called_once_with(self.goodPath, **expKwargs)
+		self.assertEqual([{"energy":2}], outDicts)
+
+
+if __name__ == '__main__':
+	unittest.main()
+
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import math
+import unittest
+
+import numpy as np
+
+import plato_pylib.utils.cube_analysis as tCode
+
+
+class TestCubeGridAnalysis(unittest.TestCase):
+
+	def setUp(self):
+		self.gridShape = (20,24,30)
+		self.stepLengths = [0.2, 0.25, 0.3]
+		self.origin = [1.0, 0.0, 0.0]
+		self.gridFunct = self._periodicTestFunct
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		stepVects = np.diag(self.stepLengths)
+		self.gridLengths = np.array(self.gridShape)*np.array(self.stepLengths)
+		gridPoints = np.indices(self.gridShape).reshape(3,-1).T @ stepVects + np.array(self.origin)
+		self.cubeDictA = {"origin":self.origin, "step_x":stepVects[0].tolist(), "step_y":stepVects[1].tolist(),
+		                  "step_z":stepVects[2].tolist(), "atomic_coords":[[3.0,3.0,4.5]],
+		                  "data_grid":self.gridFunct(gridPoints).reshape(self.gridShape)}
+
+	def _periodicTestFunct(self, points):
+		shiftedPoints = points - np.array(self.origin)
+		return np.sin(2*np.pi*shiftedPoints[:,0]/self.gridLengths[0]) + np.cos(2*np.pi*shiftedPoints[:,2]/self.gridLengths[2])
+
+	def _linearTestFunct(self, points):
+		return points[:,0] + 2*points[:,1] + 3*points[:,2]
+
+	def _getRandomPointsInGrid(self, nPoints=40):
+		randState = np.random.RandomState(4)
+		maxLengths = self.gridLengths - np.array(self.stepLengths) #Avoid the wrap-around region for non-periodic checks
+		return randState.rand(nPoints,3)*maxLengths + np.array(self.origin)
+
+	def testPlanarAverageAlongZ(self):
+		expPositions = np.arange(self.gridShape[2])*self.stepLengths[2]
+		expAverages = np.cos(2*np.pi*expPositions/self.gridLengths[2])
+		actPositions, actAverages = tCode.getPlanarAverage(self.cubeDictA, axis=2)
+		self.assertTrue( np.allclose(expPositions, actPositions) )
+		self.assertTrue( np.allclose(expAverages, actAverages) )
+
+	def testMacroscopicAverageSimpleCase(self):
+		expVals = [2.5, 1.5, 2.5, 3.5]
+		actVals = tCode.getMacroscopicAverage([1,2,3,4], windowLength=2, stepLength=1)
+		self.assertTrue( np.allclose(expVals, actVals) )
+
+	def testMacroscopicAverageRemovesPeriodicComponent(self):
+		unused, planarAverages = tCode.getPlanarAverage(self.cubeDictA, axis=2)
+		actVals = tCode.getMacroscopicAverage(planarAverages, self.gridLengths[2], self.stepLengths[2])
+		self.assertTrue( np.allclose(np.zeros(len(actVals)), actVals) )
+
+	def testTrilinearExactForLinearFunction(self):
+		self.gridFunct = self._linearTestFunct
+		self.createTestObjs()
+		testPoints = self._getRandomPointsInGrid()
+		actVals = tCode.interpolateGridValues(self.cubeDictA, testPoints, method="linear", periodic=False)
+		self.assertTrue( np.allclose(self._linearTestFunct(testPoints), actVals) )
+
+	def testPeriodicInterpolationMethods(self):
+		testPoints = self._getRandomPointsInGrid() + self.gridLengths #Periodic images of points inside the grid
+		expVals = self._periodicTestFunct(testPoints)
+		actLinear = tCode.interpolateGridValues(self.cubeDictA, testPoints, method="linear")
+		actSpline = tCode.interpolateGridValues(self.cubeDictA, testPoints, method="spline")
+		self.assertTrue( np.allclose(expVals, actLinear, atol=2e-2) )
+		self.assertTrue( np.allclose(expVals, actSpline, atol=1e-4) )
+
+	def testPeriodicSplineInWrapAroundRegion(self):
+		fractSteps = np.array([[0.3,0.5,0.7], [0.5,0.9,0.1]]) #Points between the last grid point and the periodic image of the first
+		testPoints = np.array(self.origin) + np.concatenate([self.gridLengths - fractSteps*self.stepLengths, -1*fractSteps*self.stepLengths])
+		expVals = self._periodicTestFunct(testPoints)
+		actVals = tCode.interpolateGridValues(self.cubeDictA, testPoints, method="spline")
+		self.assertTrue( np.allclose(expVals, actVals, atol=1e-4) )
+
+	def testInterpolationRaisesForUnknownMethod(self):
+		with self.assertRaises(ValueError):
+			tCode.interpolateGridValues(self.cubeDictA, [[1,1,1]], method="fake_method")
+
+	def testSphereIntegrationOfConstantGrid(self):
+		self.gridFunct = lambda points: np.ones(len(points))
+		self.createTestObjs()
+		radii = [1.5, 2.0]
+		centres = [[3.0,3.0,4.5], [1.05,0.1,0.1]] #The second crosses the periodic boundary
+		expVals = [(4/3)*math.pi*(r**3) for r in radii]
+		actVals = tCode.integrateSpheres(self.cubeDictA, radii, centres=centres)
+		self.assertTrue( np.allclose(expVals, actVals, rtol=3e-2) )
+
+	def testSphereIntegrationNonPeriodicIgnoresOutsidePoints(self):
+		self.gridFunct = lambda points: np.ones(len(points))
+		self.createTestObjs()
+		periodicVal = tCode.integrateSpheres(self.cubeDictA, 1.5, centres=[[1.05,0.1,0.1]])[0]
+		nonPeriodicVal = tCode.integrateSpheres(self.cubeDictA, 1.5, centres=[[1.05,0.1,0.1]], periodic=False)[0]
+		self.assertTrue( nonPeriodicVal < 0.3*periodicVal )
+
+	def testSphereCentresDefaultToAtoms(self):
+		expVals = tCode.integrateSpheres(self.cubeDictA, 1.0, centres=self.cubeDictA["atomic_coords"])
+		actVals = tCode.integrateSpheres(self.cubeDictA, 1.0)
+		self.assertTrue( np.allclose(expVals, actVals) )
+
+
+if __name__ == '__main__':
+	unittest.main()
+
@@ -73,6 +73,20 @@ class TestApplyStrain(unittest.TestCase):
 
 		self.assertTrue(expUCell == actUCell)
 
+	def testStrainedBatchMatchesUnitCellInterface_xxStrain(self):
+		strainMatrix = tCode._STRAIN_MATRIX_DICT[1](1)
+		strainParams = [-0.5, 0.0, self.strainParamA]
+		expUCells = tCode.getStrainedUnitCellStructsForUnitStrainVects(self.uCellB, strainParams, [strainMatrix])[0]
+		actUCells = tCode.getStrainedUnitCellBatchForUnitStrainMatrix(self.uCellB, strainParams, strainMatrix).toUnitCells()
+		self.assertEqual(expUCells, actUCells)
+
+	def testStrainedBatchKeepsFractCoords_xyStrain(self):
+		strainMatrix = tCode._STRAIN_MATRIX_DICT[6](2)
+		actBatch = tCode.getStrainedUnitCellBatchForUnitStrainMatrix(self.uCellB, [self.strainParamA], strainMatrix)
+		expLattVects = np.array(self.uCellB.lattVects) @ (np.identity(3) + strainMatrix*self.strainParamA).transpose()
+		self.assertTrue( np.allclose(expLattVects, actBatch.lattVects[0]) )
+		self.assertTrue( np.allclose(self.uCellB.fractCoordsArray, actBatch.fractCoords[0]) )
+
 
 if __name__ == '__main__':
 	unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import itertools as it
+import unittest
+
+import numpy as np
+
+import plato_pylib.shared.ucell_class as UCell
+import plato_pylib.utils.neighbour_lists as tCode
+
+
+class TestNeighbourListSimpleCubic(unittest.TestCase):
+
+	def setUp(self):
+		self.lattParams, self.lattAngles = [2,2,2], [90,90,90]
+		self.fractCoords = [ [0.5,0.5,0.5,"X"] ]
+		self.cutOff = 2.1
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		self.testCellA = UCell.UnitCell(lattParams=self.lattParams, lattAngles=self.lattAngles)
+		self.testCellA.fractCoords = self.fractCoords
+
+	def _runTestFunct(self):
+		return tCode.getNeighbourListFromUnitCell(self.testCellA, self.cutOff)
+
+	def testSixNearestNeighbours(self):
+		neighList = self._runTestFunct()
+		expShifts = sorted( [list(x) for x in np.vstack([np.identity(3,dtype=int), -1*np.identity(3,dtype=int)])] )
+		actShifts = sorted( neighList.getNeighbourShiftsForAtom(0).tolist() )
+		self.assertEqual(expShifts, actShifts)
+		self.assertTrue( np.allclose(np.ones(6)*2, neighList.distances) )
+
+	def testCutOffLargerThanCell(self):
+		self.cutOff = 3.0
+		neighList = self._runTestFunct()
+		self.assertEqual(18, len(neighList))
+
+	def testShiftsReferToUnfoldedPositions(self):
+		self.fractCoords = [ [1.5,0.5,0.5,"X"], [0.9,0.5,0.5,"X"] ]
+		self.createTestObjs()
+		self.cutOff = 1.0
+		neighList = self._runTestFunct()
+		self.assertEqual([0,1], neighList.indicesA.tolist())
+		self.assertEqual([1,0], neighList.indicesB.tolist())
+		self.assertEqual([[1,0,0],[-1,0,0]], neighList.shifts.tolist())
+		self.assertTrue( np.allclose(np.array([0.8,0.8]), neighList.distances) )
+
+
+class TestNeighbourListVsBruteForce(unittest.TestCase):
+
+	def setUp(self):
+		self.lattParams, self.lattAngles = [4.1,5.3,4.7], [75,95,110]
+		np.random.seed(5)
+		self.fractCoords = [ list(x) + ["X"] for x in np.random.uniform(-0.5,1.5,size=(15,3)) ]
+		self.cutOff = 4.5
+		self.testCellA = UCell.UnitCell(lattParams=self.lattParams, lattAngles=self.lattAngles)
+		self.testCellA.fractCoords = self.fractCoords
+
+	def _getBruteForcePairs(self):
+		lattVects, cartCoords = self.testCellA.lattVectsArray, self.testCellA.cartCoordsArray
+		outPairs = list()
+		for shift in it.product(range(-4,5),repeat=3):
+			shiftVect = np.array(shift) @ lattVects
+			for idxA,idxB in it.product(range(len(cartCoords)),repeat=2):
+				dist = np.linalg.norm(cartCoords[idxB] + shiftVect - cartCoords[idxA])
+				if (dist <= self.cutOff) and ((idxA!=idxB) or any(shift)):
+					outPairs.append( (idxA,idxB) + tuple(shift) )
+		return sorted(outPairs)
+
+	def testMatchesBruteForce(self):
+		neighList = tCode.getNeighbourListFromUnitCell(self.testCellA, self.cutOff)
+		actPairs = sorted( [ (a,b) + tuple(s) for a,b,s in zip(neighList.indicesA.tolist(), neighList.indicesB.tolist(), neighList.shifts.tolist()) ] )
+		self.assertEqual(self._getBruteForcePairs(), actPairs)
+
+	def testVectorsConsistentWithShifts(self):
+		neighList = tCode.getNeighbourListFromUnitCell(self.testCellA, self.cutOff)
+		lattVects, cartCoords = self.testCellA.lattVectsArray, self.testCellA.cartCoordsArray
+		expVectors = cartCoords[neighList.indicesB] + neighList.shifts @ lattVects - cartCoords[neighList.indicesA]
+		self.assertTrue( np.allclose(expVectors, neighList.vectors) )
+
+	def testMinimumImageDistancesMatchNearestNeighbour(self):
+		neighList = tCode.getNeighbourListFromUnitCell(self.testCellA, self.cutOff)
+		distMatrix = tCode.getMinimumImageDistanceMatrix(self.testCellA)
+		for idxA,idxB,dist in zip(neighList.indicesA, neighList.indicesB, neighList.distances):
+			self.assertTrue( distMatrix[idxA,idxB] <= dist+1e-8 )
+		self.assertTrue( np.allclose(np.zeros(15), np.diag(distMatrix)) )
+
+
+if __name__ == '__main__':
+	unittest.main()
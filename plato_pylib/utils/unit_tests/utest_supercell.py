@@ -65,6 +65,46 @@ class testCreateSuperCells(unittest.TestCase):
 
 		self.assertTrue(expectedUCell==supCell)
 
+	def testCellA_3x1x2_arrayStorage(self):
+		expCell = tCode.superCellFromUCell( self.startUCellA , [3,1,2])
+		self.startUCellA.useArrayStorage = True
+		actCell = tCode.superCellFromUCell( self.startUCellA , [3,1,2])
+		self.assertTrue(actCell.useArrayStorage)
+		self.assertEqual(expCell, actCell)
+
+
+class testSuperCellFromTransformMatrix(unittest.TestCase):
+
+	def setUp(self):
+		self.lattParams, self.lattAngles = [2,2,3], [90,90,90]
+		self.fractCoords = [ [0.0,0.0,0.0,"Mg"], [0.5,0.5,0.5,"O"] ]
+		self.createTestObjs()
+
+	def createTestObjs(self):
+		self.testCellA = UCell.UnitCell(lattParams=self.lattParams, lattAngles=self.lattAngles)
+		self.testCellA.fractCoords = self.fractCoords
+
+	def _getSortedFractCoords(self, inpCell):
+		return sorted( [ [round(x,6) for x in coords[:3]] + [coords[-1]] for coords in inpCell.fractCoords] )
+
+	def testDiagonalMatchesSuperCellFromUCell(self):
+		expCell = tCode.superCellFromUCell(self.testCellA, [2,1,3])
+		actCell = tCode.getSuperCellFromTransformMatrix(self.testCellA, [[2,0,0],[0,1,0],[0,0,3]])
+		for attr in ["lattParams","lattAngles"]:
+			[self.assertAlmostEqual(getattr(expCell,attr)[k], getattr(actCell,attr)[k]) for k in getattr(expCell,attr).keys()]
+		self.assertEqual( self._getSortedFractCoords(expCell), self._getSortedFractCoords(actCell) )
+
+	def testNonDiagonalRotatedCell(self):
+		actCell = tCode.getSuperCellFromTransformMatrix(self.testCellA, [[1,1,0],[-1,1,0],[0,0,1]])
+		expCell = UCell.UnitCell(lattParams=[8**0.5,8**0.5,3], lattAngles=[90,90,90])
+		expCell.fractCoords = [ [0.0,0.0,0.0,"Mg"], [0.5,0.5,0.0,"Mg"], [0.5,0.0,0.5,"O"], [0.0,0.5,0.5,"O"] ]
+		self.assertEqual(4, len(actCell.fractCoords))
+		self.assertAlmostEqual(2*self.testCellA.volume, actCell.volume)
+		self.assertEqual( self._getSortedFractCoords(expCell), self._getSortedFractCoords(actCell) )
+
+	def testRaisesForSingularMatrix(self):
+		with self.assertRaises(ValueError):
+			tCode.getSuperCellFromTransformMatrix(self.testCellA, [[1,0,0],[1,0,0],[0,0,1]])
 
 
 class testSurroundCell(unittest.TestCase):